@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Import-time benchmark for the prediction path
+
+Runs each import in a fresh interpreter and reports wall time and peak RSS.
+Compares the inference entry point against the set of libraries the
+pipeline used to import at module level.
+
+    python benchmarks/bench_import.py [--repeat 5] [--output import_times.json]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Module-level imports of multibagger_prediction before they were made lazy
+LEGACY_IMPORTS = [
+    'pandas', 'numpy', 'matplotlib.pyplot', 'seaborn', 'sklearn.model_selection',
+    'sklearn.preprocessing', 'sklearn.linear_model', 'sklearn.tree', 'sklearn.ensemble',
+    'sklearn.metrics', 'xgboost', 'tensorflow', 'shap'
+]
+
+CASES = {
+    'inference_entry_point': ['multibagger_inference'],
+    'training_pipeline_module': ['multibagger_prediction'],
+    'legacy_eager_imports': LEGACY_IMPORTS
+}
+
+PROBE = """
+import importlib, json, resource, sys, time
+start = time.perf_counter()
+missing = []
+for name in sys.argv[1:]:
+    try:
+        importlib.import_module(name)
+    except ImportError:
+        missing.append(name)
+elapsed = time.perf_counter() - start
+peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({'seconds': elapsed, 'peak_rss_mb': peak_kb / 1024, 'missing': missing}))
+"""
+
+
+def time_imports(modules, repeat):
+    """Best-of-`repeat` import time for `modules` in fresh interpreters"""
+    runs = []
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, '-c', PROBE] + modules, cwd=REPO_ROOT,
+                             capture_output=True, text=True, check=True)
+        runs.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    best = min(runs, key=lambda run: run['seconds'])
+    return {
+        'seconds': best['seconds'],
+        'peak_rss_mb': best['peak_rss_mb'],
+        'missing': best['missing']
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', help='write results as JSON to this file')
+    args = parser.parse_args()
+
+    results = {name: time_imports(modules, args.repeat) for name, modules in CASES.items()}
+
+    for name, result in results.items():
+        note = f" (not installed: {', '.join(result['missing'])})" if result['missing'] else ''
+        print(f"{name:28s} {result['seconds'] * 1000:8.1f} ms  {result['peak_rss_mb']:7.1f} MB{note}")
+
+    legacy = results['legacy_eager_imports']['seconds']
+    entry = results['inference_entry_point']['seconds']
+    print(f"\nInference entry point imports {legacy / entry:.1f}x faster than the eager imports")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Training and inference benchmark for the multibagger pipeline
+
+Generates synthetic universes with `load_data` at each requested size and
+times every hot path:
+    load_data, preprocess_data, compute_ev_l_scores, filter_candidates,
+    fitting each candidate model, and per model: single-row
+    predict_new_stock latency, batch predict_batch over the whole universe,
+    and load_model of the saved artifact.
+
+Results are written as JSON and can be compared against a stored baseline;
+any stage slower than the baseline by more than `--threshold` (and above
+the `--min-seconds` noise floor) is reported and makes the run exit 1.
+
+    python benchmarks/bench_pipeline.py --sizes 2000 20000 200000 --output bench.json
+    python benchmarks/bench_pipeline.py --baseline benchmarks/baseline.json --threshold 0.2
+    python benchmarks/bench_pipeline.py --sizes 10000000 --models XGBoost --max-train-rows 500000
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from multibagger_prediction import MultibaggerPredictor, MODEL_NAMES, BASE_FEATURE_COLS, _fit_model
+
+DEFAULT_SIZES = [2000, 20000, 200000]
+VERSIONED_PACKAGES = ['numpy', 'pandas', 'sklearn', 'xgboost', 'tensorflow', 'joblib']
+
+
+def best_of(fn, repeat):
+    """Smallest wall time of `repeat` calls, and the last result"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def quiet(fn):
+    """Call `fn` with the pipeline's progress prints suppressed"""
+    def wrapper(*args, **kwargs):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return fn(*args, **kwargs)
+    return wrapper
+
+
+def environment():
+    """Interpreter, library versions and hardware the numbers were taken on"""
+    import importlib
+    versions = {}
+    for name in VERSIONED_PACKAGES:
+        try:
+            versions[name] = importlib.import_module(name).__version__
+        except ImportError:
+            versions[name] = None
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'packages': versions
+    }
+
+
+def bench_size(n_samples, models, repeat, max_train_rows, single_calls, tmp_dir):
+    """Time every stage on one synthetic universe of `n_samples` rows"""
+    results = {}
+
+    def record(stage, seconds, rows):
+        results[stage] = {'seconds': seconds, 'rows': int(rows)}
+        print(f"  {stage:36s} {seconds * 1000:10.2f} ms  ({rows} rows)")
+
+    predictor = MultibaggerPredictor()
+    seconds, df = best_of(lambda: predictor.load_data(n_samples=n_samples), repeat)
+    record('load_data', seconds, n_samples)
+
+    seconds, df = best_of(lambda: predictor.preprocess_data(df), repeat)
+    record('preprocess_data', seconds, predictor.preprocess_report['rows_in'])
+
+    seconds, scored = best_of(lambda: predictor.compute_ev_l_scores(df, fit=True), repeat)
+    record('compute_ev_l_scores', seconds, len(df))
+
+    filter_candidates = quiet(predictor.filter_candidates)
+    seconds, filtered = best_of(lambda: filter_candidates(scored), repeat)
+    record('filter_candidates', seconds, len(scored))
+
+    X, y = predictor.prepare_features(filtered)
+    X, y = X.iloc[:max_train_rows], y.iloc[:max_train_rows]
+    split_idx = int(0.8 * len(X))
+    if split_idx < 10 or y.iloc[:split_idx].nunique() < 2:
+        print(f"  skipping training: only {len(X)} candidate rows")
+        return results
+    X_train = predictor.scaler.fit_transform(X.iloc[:split_idx])
+    X_val = predictor.scaler.transform(X.iloc[split_idx:])
+    y_train, y_val = y.iloc[:split_idx], y.iloc[split_idx:]
+    predictor.set_background(X.iloc[:split_idx])
+
+    universe = scored[BASE_FEATURE_COLS]
+    single_rows = universe.head(single_calls).to_dict('records')
+    for name in models:
+        fit = lambda: _fit_model(name, X_train, y_train, X_val, y_val, n_threads=os.cpu_count())[0]
+        try:
+            # Best of `repeat` also keeps the backend's first import out of the timing
+            seconds, model = best_of(fit, repeat)
+        except ImportError as e:
+            print(f"  skipping {name}: {e}")
+            continue
+        record(f'train/{name}', seconds, len(X_train))
+
+        predictor.best_model, predictor.best_model_name = model, name
+        start = time.perf_counter()
+        for row in single_rows:
+            predictor.predict_new_stock(row)
+        record(f'predict_single/{name}', (time.perf_counter() - start) / len(single_rows), 1)
+
+        seconds, _ = best_of(lambda: predictor.predict_batch(universe, use_cache=False), repeat)
+        record(f'predict_batch/{name}', seconds, len(universe))
+
+        path = os.path.join(tmp_dir, f'model-{n_samples}')
+        quiet(predictor.save_model)(path)
+        seconds, _ = best_of(lambda: MultibaggerPredictor.load_model(path), repeat)
+        record(f'load_model/{name}', seconds, 1)
+
+    return results
+
+
+def compare(results, baseline, threshold, min_seconds):
+    """Stages slower than the baseline by more than `threshold` (a fraction)"""
+    regressions = []
+    for size, stages in results.items():
+        for stage, current in stages.items():
+            reference = baseline.get(size, {}).get(stage)
+            if reference is None or reference['seconds'] < min_seconds:
+                continue
+            ratio = current['seconds'] / reference['seconds']
+            if ratio > 1 + threshold:
+                regressions.append({'size': size, 'stage': stage, 'baseline': reference['seconds'],
+                                    'current': current['seconds'], 'ratio': ratio})
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+                        help='synthetic universe sizes (rows), 2k to 10M')
+    parser.add_argument('--models', nargs='+', default=MODEL_NAMES, choices=MODEL_NAMES)
+    parser.add_argument('--repeat', type=int, default=3, help='best-of repeats per stage')
+    parser.add_argument('--max-train-rows', type=int, default=200000,
+                        help='cap on candidate rows used for model fitting')
+    parser.add_argument('--single-calls', type=int, default=200,
+                        help='single-row predictions averaged for latency')
+    parser.add_argument('--output', help='write results as JSON to this file')
+    parser.add_argument('--baseline', help='JSON results to compare against')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='allowed slowdown vs the baseline (0.2 = 20%%)')
+    parser.add_argument('--min-seconds', type=float, default=0.001,
+                        help='ignore baseline stages faster than this (timer noise)')
+    args = parser.parse_args()
+
+    results = {}
+    tmp_dir = tempfile.mkdtemp(prefix='bench-pipeline-')
+    try:
+        for n_samples in args.sizes:
+            print(f"\n{n_samples} rows")
+            results[str(n_samples)] = bench_size(n_samples, args.models, args.repeat,
+                                                 args.max_train_rows, args.single_calls, tmp_dir)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    report = {'environment': environment(), 'config': vars(args), 'results': results}
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get('environment', {}).get('packages') != report['environment']['packages']:
+            print("\nNote: library versions differ from the baseline")
+        regressions = compare(results, baseline['results'], args.threshold, args.min_seconds)
+        print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%} of {args.baseline}")
+        for r in regressions:
+            print(f"  {r['stage']:36s} @ {r['size']:>8s} rows: {r['baseline'] * 1000:9.2f} ms -> "
+                  f"{r['current'] * 1000:9.2f} ms ({r['ratio']:.2f}x)")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,210 @@
+"""
+Versioned model artifact bundle for the multibagger pipeline
+
+A bundle is a directory containing:
+    manifest.json   format/model version, backend, feature names, EV/L bounds
+    arrays.npz      StandardScaler statistics as raw arrays and the optional
+                    SHAP background sample
+    model.*         the estimator in its native format
+                    (XGBoost UBJSON, Keras .keras, sklearn via joblib,
+                    NumPy runtime or stacked ensemble .npz)
+
+Loading imports only the backend the stored model needs, so serving a
+tree or linear model never pulls in TensorFlow.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+
+ARTIFACT_FORMAT_VERSION = 1
+MANIFEST_FILE = 'manifest.json'
+ARRAYS_FILE = 'arrays.npz'
+MODEL_FILES = {
+    'xgboost': 'model.ubj',
+    'keras': 'model.keras',
+    'sklearn': 'model.joblib',
+    'numpy': 'model.npz',
+    'ensemble': 'model.npz'
+}
+
+
+class ArrayScaler:
+    """Minimal StandardScaler replacement rebuilt from stored arrays"""
+
+    def __init__(self, mean, scale, var=None, n_samples_seen=None):
+        self.mean_ = np.asarray(mean, dtype=np.float64)
+        self.scale_ = np.asarray(scale, dtype=np.float64)
+        self.var_ = None if var is None else np.asarray(var, dtype=np.float64)
+        self.n_samples_seen_ = n_samples_seen
+        self.n_features_in_ = len(self.mean_)
+
+    def transform(self, X):
+        return (np.asarray(X, dtype=np.float64) - self.mean_) / self.scale_
+
+
+def model_backend(model):
+    """Name of the library a fitted model belongs to"""
+    module = type(model).__module__
+    if module == 'multibagger_runtime':
+        return 'numpy'
+    if module == 'multibagger_ensemble':
+        return 'ensemble'
+    if module.startswith('xgboost'):
+        return 'xgboost'
+    if module.startswith(('keras', 'tensorflow', 'tf_keras')):
+        return 'keras'
+    return 'sklearn'
+
+
+def _file_digest(paths, fields=None):
+    """Short content hash used as the model version
+
+    `fields` (manifest entries that change predictions) are hashed as
+    canonical JSON after the files.
+    """
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+    if fields is not None:
+        digest.update(json.dumps(fields, sort_keys=True, separators=(',', ':')).encode())
+    return digest.hexdigest()[:16]
+
+
+def save_artifact(path, model, scaler, feature_names, ev_l_bounds=None, model_name=None,
+                  background=None, parent_version=None):
+    """Write a model bundle to the directory `path` and return its manifest
+
+    `parent_version` records the model version an incremental refresh
+    started from.
+
+    The bundle is assembled in a temporary directory and swapped into place,
+    so readers never observe a half-written artifact.
+    """
+    backend = model_backend(model)
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    if os.path.exists(tmp_path):
+        shutil.rmtree(tmp_path)
+    os.makedirs(tmp_path)
+
+    # Scaler statistics as raw arrays
+    arrays = {
+        'scaler_mean': np.asarray(scaler.mean_, dtype=np.float64),
+        'scaler_scale': np.asarray(scaler.scale_, dtype=np.float64)
+    }
+    if getattr(scaler, 'var_', None) is not None:
+        arrays['scaler_var'] = np.asarray(scaler.var_, dtype=np.float64)
+    if getattr(scaler, 'n_samples_seen_', None) is not None:
+        arrays['scaler_n_samples_seen'] = np.asarray(scaler.n_samples_seen_)
+    if background is not None:
+        arrays['background'] = np.asarray(background, dtype=np.float64)
+    np.savez(os.path.join(tmp_path, ARRAYS_FILE), **arrays)
+
+    # Model in its native format
+    model_file = MODEL_FILES[backend]
+    model_path = os.path.join(tmp_path, model_file)
+    if backend == 'xgboost':
+        model.save_model(model_path)
+    elif backend in ('keras', 'numpy', 'ensemble'):
+        model.save(model_path)
+    else:
+        import joblib
+        joblib.dump(model, model_path)
+
+    # Everything besides the files that changes what the bundle predicts
+    scoring = {
+        'model_name': model_name,
+        'backend': backend,
+        'feature_names': list(feature_names),
+        'ev_l_bounds': None if ev_l_bounds is None else
+                       {col: [float(bound) for bound in bounds] for col, bounds in ev_l_bounds.items()}
+    }
+    manifest = {
+        'format_version': ARTIFACT_FORMAT_VERSION,
+        'model_version': _file_digest([os.path.join(tmp_path, ARRAYS_FILE), model_path], scoring),
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'model_name': model_name,
+        'parent_version': parent_version,
+        'backend': backend,
+        'model_class': f"{type(model).__module__}.{type(model).__name__}",
+        'model_file': model_file,
+        'feature_names': scoring['feature_names'],
+        'ev_l_bounds': scoring['ev_l_bounds']
+    }
+    with open(os.path.join(tmp_path, MANIFEST_FILE), 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    # Swap the finished bundle into place
+    old_path = f"{path}.old-{os.getpid()}"
+    if os.path.exists(path):
+        os.rename(path, old_path)
+    os.rename(tmp_path, path)
+    if os.path.exists(old_path):
+        shutil.rmtree(old_path)
+
+    return manifest
+
+
+def read_manifest(path):
+    """Read a bundle's manifest without loading the model"""
+    with open(os.path.join(path, MANIFEST_FILE)) as f:
+        manifest = json.load(f)
+    if manifest.get('format_version', 0) > ARTIFACT_FORMAT_VERSION:
+        raise ValueError(f"Artifact format {manifest['format_version']} is newer than "
+                         f"supported version {ARTIFACT_FORMAT_VERSION}")
+    return manifest
+
+
+def _load_model(path, manifest, mmap=True):
+    """Load the stored model, importing only its backend"""
+    model_path = os.path.join(path, manifest['model_file'])
+    backend = manifest['backend']
+    if backend == 'xgboost':
+        import xgboost as xgb
+        model = xgb.XGBClassifier()
+        model.load_model(model_path)
+        return model
+    if backend == 'keras':
+        from tensorflow import keras
+        return keras.models.load_model(model_path, compile=False)
+    if backend == 'numpy':
+        from multibagger_runtime import NumpyModel
+        return NumpyModel.load(model_path)
+    if backend == 'ensemble':
+        from multibagger_ensemble import StackedEnsemble
+        return StackedEnsemble.load(model_path)
+    import joblib
+    return joblib.load(model_path, mmap_mode='r' if mmap else None)
+
+
+def load_artifact(path, mmap=True):
+    """Load a model bundle
+
+    Returns a dict with the model, an ArrayScaler, the EV/L bounds, the
+    SHAP background sample (or None), the feature names and the manifest.
+    """
+    manifest = read_manifest(path)
+
+    with np.load(os.path.join(path, ARRAYS_FILE)) as arrays:
+        n_samples_seen = arrays['scaler_n_samples_seen'] if 'scaler_n_samples_seen' in arrays else None
+        scaler = ArrayScaler(arrays['scaler_mean'], arrays['scaler_scale'],
+                             var=arrays['scaler_var'] if 'scaler_var' in arrays else None,
+                             n_samples_seen=n_samples_seen)
+        background = arrays['background'] if 'background' in arrays else None
+
+    bounds = manifest.get('ev_l_bounds')
+    return {
+        'model': _load_model(path, manifest, mmap=mmap),
+        'scaler': scaler,
+        'ev_l_bounds': None if bounds is None else
+                       {col: tuple(values) for col, values in bounds.items()},
+        'background': background,
+        'feature_names': manifest['feature_names'],
+        'manifest': manifest
+    }
@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""
+Walk-forward backtesting for the multibagger model
+
+At every rebalance date the chosen model is retrained on the history
+before that date and scores the stocks of the following window. Folds
+run in parallel worker processes. The raw, time-ordered fundamentals
+(BASE_FEATURE_COLS and the label only, never outcome columns such as
+Price_3yr_Return) are written once to a FeatureStore cached on disk
+(keyed by a hash of the input data and the date column), and every fold
+maps it read-only instead of receiving its own copy.
+
+No fold sees its own future:
+    - preprocessing statistics, EV/L bounds, the scaler and the model
+      are fitted on the training window only
+    - test rows are scored like live inference: filled with the training
+      medians and screened with the EV × L rule, never dropped as
+      outliers
+    - training rows must be at least LABEL_HORIZON (the 3-year label
+      window) older than the test window, so no training label is still
+      unresolved when the test window starts
+
+    python multibagger_backtest.py --model "Random Forest" --years 10 --n-jobs 8
+"""
+
+import argparse
+import hashlib
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from multibagger_prediction import (MultibaggerPredictor, MODEL_NAMES, BASE_FEATURE_COLS, FEATURE_COLS,
+                                    EV_THRESHOLD, L_THRESHOLD, _fit_model)
+from multibagger_metrics import configure_from_env
+from multibagger_store import FeatureStore, HEADER_FILE
+
+# Bumped whenever the cached store's contents change meaning
+STORE_LAYOUT = 'raw-v3'
+
+# Labels look 3 years ahead (Price_3yr_Return), so training rows must end this long before a test window
+LABEL_HORIZON = pd.DateOffset(years=3)
+
+
+def _fold_metrics(y_true, probability):
+    """Classification metrics for one scored window"""
+    from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, roc_auc_score
+    y_pred = (probability > 0.5).astype(int)
+    return {
+        'Accuracy': accuracy_score(y_true, y_pred),
+        'Precision': precision_score(y_true, y_pred, zero_division=0),
+        'Recall': recall_score(y_true, y_pred, zero_division=0),
+        'F1': f1_score(y_true, y_pred, zero_division=0),
+        'AUC': roc_auc_score(y_true, probability) if len(np.unique(y_true)) > 1 else np.nan,
+        'Mean_Probability': float(probability.mean()),
+        'Multibagger_Rate': float(np.mean(y_true))
+    }
+
+
+def _store_frame(store, start, stop):
+    """Raw fundamentals and labels of a row range as a DataFrame"""
+    df = pd.DataFrame(np.asarray(store.X[start:stop], dtype=np.float64), columns=store.feature_names)
+    df['multibagger'] = np.asarray(store.y[start:stop])
+    return df
+
+
+def _prepare_fold(train, test, ev_threshold, l_threshold):
+    """Feature matrices and labels of both windows, with everything fitted on `train` only
+
+    Training rows are cleaned like the training pipeline does (filled, 3σ
+    outliers dropped). Test rows are only filled with the training medians
+    and clipped, as inference does, so whether a test row is scored never
+    depends on the test window itself. Both are then screened with the
+    EV × L rule using bounds fitted on the training rows.
+    """
+    predictor = MultibaggerPredictor()
+    # Sample every row so the fill medians are exact
+    stats = predictor.fit_chunk_stats(lambda: [train], sample_size=max(len(train), 1))
+    train = pd.concat(list(predictor.preprocess_chunks(lambda: [train], stats=stats)))
+    train = predictor.compute_ev_l_scores(train, fit=True)
+    test = predictor.compute_ev_l_scores(predictor._clip_ratios(test.fillna(stats['fill_values'])))
+    frames = []
+    for window in (train, test):
+        keep = (window['EV_Score'] >= ev_threshold) & (window['L_Score'] >= l_threshold)
+        frames.append(window[keep])
+    return [(df[FEATURE_COLS].to_numpy(dtype=np.float64), df['multibagger'].to_numpy())
+            for df in frames]
+
+
+def _run_fold(store_path, model_name, fold, n_threads=1, ev_threshold=EV_THRESHOLD,
+              l_threshold=L_THRESHOLD):
+    """Fit on the fold's training rows and score its test rows"""
+    from sklearn.preprocessing import StandardScaler
+    start = time.perf_counter()
+    store = FeatureStore.open(store_path)
+    train_start, train_stop, test_start, test_stop = fold['rows']
+
+    (X_train, y_train), (X_test, y_test) = _prepare_fold(
+        _store_frame(store, train_start, train_stop), _store_frame(store, test_start, test_stop),
+        ev_threshold, l_threshold)
+    result = {
+        'Fold': fold['label'],
+        'Train_Rows': len(X_train),
+        'Test_Rows': len(X_test)
+    }
+    if len(X_test) == 0 or len(np.unique(y_train)) < 2:
+        # Nothing to score, or nothing to learn, after the EV × L filter
+        result['Seconds'] = time.perf_counter() - start
+        return result
+
+    scaler = StandardScaler()
+    X_train = scaler.fit_transform(X_train)
+    X_test = scaler.transform(X_test)
+
+    # The last 15% of the training window doubles as the Keras validation set
+    val_start = int(0.85 * len(X_train))
+    model, _ = _fit_model(model_name, X_train, y_train, X_train[val_start:], y_train[val_start:],
+                          n_threads=n_threads)
+    if hasattr(model, 'predict_proba'):
+        probability = model.predict_proba(X_test)[:, 1]
+    else:
+        probability = np.asarray(model.predict(X_test, verbose=0)).reshape(-1)
+
+    result.update(_fold_metrics(y_test, probability))
+    result['Seconds'] = time.perf_counter() - start
+    return result
+
+
+class WalkForwardBacktest:
+    """Walk-forward (or TimeSeriesSplit) backtest over dated fundamentals"""
+
+    def __init__(self, model_name='Random Forest', rebalance_freq='MS', train_periods=None,
+                 min_train_rows=200, n_jobs=-1, threads_per_fold=1,
+                 cache_dir='.backtest_cache', ev_threshold=EV_THRESHOLD, l_threshold=L_THRESHOLD,
+                 label_horizon=LABEL_HORIZON):
+        if model_name not in MODEL_NAMES:
+            raise ValueError(f"Unknown model: {model_name} (choose from {MODEL_NAMES})")
+        self.model_name = model_name
+        self.rebalance_freq = rebalance_freq
+        self.train_periods = train_periods  # None = expanding window
+        self.min_train_rows = min_train_rows
+        self.n_jobs = n_jobs
+        self.threads_per_fold = threads_per_fold
+        self.cache_dir = cache_dir
+        self.ev_threshold = ev_threshold
+        self.l_threshold = l_threshold
+        self.label_horizon = label_horizon  # embargo between train and test; None disables it
+
+    @staticmethod
+    def _data_hash(df):
+        """Content hash of the input frame, used as the feature store cache key"""
+        digest = hashlib.sha256(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+        digest.update(','.join(map(str, df.columns)).encode())
+        return digest.hexdigest()[:16]
+
+    def store_key(self, df, date_col=None):
+        """Cache key of the FeatureStore built from `df` (everything that shapes its layout)"""
+        return f"{self._data_hash(df)}-{date_col or 'undated'}-{STORE_LAYOUT}"
+
+    def build_store(self, df, date_col=None):
+        """Write the time-ordered raw fundamentals of `df` once into a cached FeatureStore
+
+        Only BASE_FEATURE_COLS and the label are stored, so outcome columns
+        can never reach preprocessing or a filter.
+        """
+        store_path = os.path.join(self.cache_dir, self.store_key(df, date_col))
+        if os.path.exists(os.path.join(store_path, HEADER_FILE)):
+            print(f"Reusing cached feature store {store_path}")
+            return FeatureStore.open(store_path)
+
+        if date_col is not None:
+            df = df.sort_values(date_col, kind='stable')
+        return FeatureStore.from_frame(store_path, df, date_col=date_col,
+                                       feature_names=BASE_FEATURE_COLS)
+
+    def _train_rows(self, dates, test_start_date):
+        """(train_start, train_stop) rows for a test window starting at `test_start_date`
+
+        Training ends LABEL_HORIZON before the test window, and a rolling
+        window keeps the `train_periods` rebalance periods before that.
+        """
+        cutoff = pd.Timestamp(test_start_date)
+        if self.label_horizon is not None:
+            cutoff = cutoff - self.label_horizon
+        train_stop = np.searchsorted(dates, cutoff.to_datetime64(), side='left')
+        train_start = 0
+        if self.train_periods is not None:
+            offset = pd.tseries.frequencies.to_offset(self.rebalance_freq)
+            start_date = cutoff - offset * self.train_periods
+            train_start = np.searchsorted(dates, start_date.to_datetime64(), side='left')
+        return int(train_start), int(train_stop)
+
+    def walk_forward_folds(self, store):
+        """Row ranges (train_start, train_stop, test_start, test_stop) per rebalance date"""
+        dates = np.asarray(store.dates)
+        rebalances = pd.date_range(dates.min(), dates.max(), freq=self.rebalance_freq)
+        boundaries = np.searchsorted(dates, rebalances.to_numpy(), side='left')
+        boundaries = np.append(boundaries, len(dates))
+
+        folds = []
+        for i, rebalance in enumerate(rebalances):
+            test_start, test_stop = boundaries[i], boundaries[i + 1]
+            train_start, train_stop = self._train_rows(dates, rebalance)
+            if test_stop > test_start and train_stop - train_start >= self.min_train_rows:
+                folds.append({'label': rebalance.date().isoformat(),
+                              'rows': (train_start, train_stop, int(test_start), int(test_stop))})
+        return folds
+
+    def time_series_folds(self, store, n_splits=5):
+        """TimeSeriesSplit folds over row order (data already in time order)
+
+        With dates in the store, `train_periods` and the label-horizon
+        embargo are converted to row ranges from the dates. Undated data
+        can only use an expanding window and no embargo.
+        """
+        from sklearn.model_selection import TimeSeriesSplit
+        dates = None if store.dates is None else np.asarray(store.dates)
+        if dates is None and self.train_periods is not None:
+            raise ValueError("train_periods needs dated data; pass date_col")
+        splitter = TimeSeriesSplit(n_splits=n_splits)
+        folds = []
+        for i, (train_idx, test_idx) in enumerate(splitter.split(np.arange(len(store)))):
+            test_start, test_stop = int(test_idx[0]), int(test_idx[-1]) + 1
+            if dates is None:
+                train_start, train_stop = 0, test_start
+            else:
+                train_start, train_stop = self._train_rows(dates, dates[test_start])
+            if train_stop - train_start >= self.min_train_rows:
+                folds.append({'label': f"split {i + 1}",
+                              'rows': (train_start, train_stop, test_start, test_stop)})
+        return folds
+
+    def run(self, df, date_col=None, n_splits=5):
+        """Run the backtest and return one row of metrics per fold
+
+        With `date_col` the model is retrained at every rebalance date;
+        without it, `n_splits` TimeSeriesSplit folds over row order are used.
+        """
+        from joblib import Parallel, delayed
+        store = self.build_store(df, date_col)
+        folds = self.walk_forward_folds(store) if date_col is not None else \
+            self.time_series_folds(store, n_splits)
+        if not folds:
+            raise ValueError("No folds with enough training rows; lower min_train_rows or "
+                             "use a longer history than the label horizon")
+
+        print(f"Backtesting {self.model_name} over {len(folds)} folds...")
+        start = time.perf_counter()
+        results = Parallel(n_jobs=self.n_jobs, backend='loky')(
+            delayed(_run_fold)(store.path, self.model_name, fold, self.threads_per_fold,
+                               self.ev_threshold, self.l_threshold)
+            for fold in folds)
+        print(f"Backtest finished in {time.perf_counter() - start:.1f}s")
+
+        return pd.DataFrame(results)
+
+
+def add_synthetic_dates(df, years=10, freq='MS', seed=42):
+    """Assign each synthetic stock a random observation date over `years`"""
+    rng = np.random.default_rng(seed)
+    periods = pd.date_range(end=pd.Timestamp.today().normalize(), periods=years * 12, freq=freq)
+    df = df.copy()
+    df['Date'] = periods[rng.integers(0, len(periods), len(df))]
+    return df
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Walk-forward multibagger backtest")
+    parser.add_argument('--model', default='Random Forest', choices=MODEL_NAMES)
+    parser.add_argument('--years', type=int, default=10)
+    parser.add_argument('--samples', type=int, default=20000)
+    parser.add_argument('--train-periods', type=int, help='rolling window length (default: expanding)')
+    parser.add_argument('--n-jobs', type=int, default=-1)
+    args = parser.parse_args()
+    configure_from_env()
+
+    predictor = MultibaggerPredictor()
+    df = add_synthetic_dates(predictor.load_data(n_samples=args.samples), years=args.years)
+    backtest = WalkForwardBacktest(args.model, train_periods=args.train_periods, n_jobs=args.n_jobs)
+    results = backtest.run(df, date_col='Date')
+    print(results.round(4).to_string(index=False))
+    print("\nMean over folds:")
+    print(results.drop(columns=['Fold']).mean().round(4))
+
+
+if __name__ == '__main__':
+    main()
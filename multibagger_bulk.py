@@ -0,0 +1,212 @@
+"""
+Background bulk scoring of uploaded fundamentals files
+
+A BulkScoringJob takes the bytes of a CSV or Parquet upload, checks that
+every column in BASE_FEATURE_COLS is present, then scores the file chunk
+by chunk with `predict_batch` on a daemon thread. Callers (the Streamlit
+app) poll `progress`, `summary()` and `top()` while it runs, so the UI
+never blocks on a large file:
+    - other columns (tickers, names) are passed through unchanged
+    - values that are not numbers or not finite make a row invalid; it is
+      kept with empty scores and counted in `invalid_rows`
+    - scoring bypasses the prediction cache so a bulk upload cannot evict
+      interactive entries
+    - polling is incremental: the worker merges each chunk into a running
+      top-`top_rows` table, and summary counts only visit new chunks;
+      the fully sorted `results()` is built once the job is done
+"""
+
+import io
+import threading
+
+import numpy as np
+import pandas as pd
+
+from multibagger_prediction import BASE_FEATURE_COLS
+
+SCORE_COLS = ['EV_Score', 'L_Score', 'probability']
+BULK_FORMATS = ('csv', 'parquet')
+
+
+def upload_format(name):
+    """'csv' or 'parquet' from an uploaded file name"""
+    extension = name.rsplit('.', 1)[-1].lower()
+    if extension in ('parquet', 'pq'):
+        return 'parquet'
+    if extension == 'csv':
+        return 'csv'
+    raise ValueError(f"Unsupported file type '.{extension}' (upload CSV or Parquet)")
+
+
+def missing_columns(columns):
+    """Required fundamentals absent from `columns`"""
+    present = {str(col).strip() for col in columns}
+    return [col for col in BASE_FEATURE_COLS if col not in present]
+
+
+class BulkScoringJob:
+    """Score an uploaded fundamentals file in chunks on a background thread"""
+
+    def __init__(self, predictor, data, name, chunk_size=10000, top_rows=1000):
+        self.predictor = predictor
+        self.data = bytes(data)
+        self.name = name
+        self.format = upload_format(name)
+        self.chunk_size = chunk_size
+        self.top_rows = top_rows
+        self.rows_done = 0
+        self.invalid_rows = 0
+        self.error = None
+        self._chunks = []
+        self._top = pd.DataFrame(columns=SCORE_COLS)
+        self._summaries = {}  # thresholds -> (chunks counted, counts)
+        self._results = {}  # finished results per sort order
+        self._lock = threading.Lock()
+        self._cancel = threading.Event()
+        self._thread = None
+        self._csv = None
+
+        # Validate the header up front so problems are reported before any work starts
+        if self.format == 'parquet':
+            import pyarrow.parquet as pq
+            parquet_file = pq.ParquetFile(io.BytesIO(self.data))
+            columns = parquet_file.schema_arrow.names
+            self.total_rows = parquet_file.metadata.num_rows
+        else:
+            columns = pd.read_csv(io.BytesIO(self.data), nrows=0).columns
+            # Line count is exact unless quoted fields contain newlines
+            self.total_rows = max(self.data.count(b'\n') - 1 + (not self.data.endswith(b'\n')), 0)
+        missing = missing_columns(columns)
+        if missing:
+            raise ValueError(f"Missing required columns: {', '.join(missing)}")
+
+    def start(self):
+        """Start scoring (idempotent); returns self"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='bulk-scoring', daemon=True)
+            self._thread.start()
+        return self
+
+    def cancel(self):
+        """Stop after the chunk currently being scored"""
+        self._cancel.set()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    @property
+    def done(self):
+        return self._thread is not None and not self._thread.is_alive()
+
+    @property
+    def progress(self):
+        """Fraction of rows scored so far (1.0 once finished)"""
+        if self.done:
+            return 1.0
+        return min(self.rows_done / self.total_rows, 1.0) if self.total_rows else 0.0
+
+    def top(self):
+        """Highest-probability `top_rows` rows scored so far"""
+        with self._lock:
+            return self._top
+
+    def summary(self, ev_threshold, l_threshold, high_probability=0.7):
+        """Counts of scored rows, EV × L candidates and rows at or above `high_probability`
+
+        Counts are kept per set of thresholds, so each poll only visits the
+        chunks scored since the previous one.
+        """
+        with self._lock:
+            chunks = list(self._chunks)
+        key = (ev_threshold, l_threshold, high_probability)
+        counted, counts = self._summaries.get(key, (0, np.zeros(3, dtype=np.int64)))
+        for chunk in chunks[counted:]:
+            ev_score, l_score, probability = chunk[SCORE_COLS].to_numpy().T
+            counts = counts + [np.count_nonzero(~np.isnan(probability)),
+                               np.count_nonzero((ev_score >= ev_threshold) & (l_score >= l_threshold)),
+                               np.count_nonzero(probability >= high_probability)]
+        self._summaries[key] = (len(chunks), counts)
+        return dict(zip(('scored', 'candidates', 'high_potential'), counts.tolist()))
+
+    def results(self, sort_by='probability', ascending=False):
+        """Rows scored so far with the score columns appended
+
+        Concatenates (and sorts) every chunk, so poll `top` and `summary`
+        while the job runs; once it is done the result is built only once.
+        """
+        key = (sort_by, ascending)
+        if key in self._results:
+            return self._results[key]
+        done = self.done
+        with self._lock:
+            chunks = list(self._chunks)
+        if not chunks:
+            return pd.DataFrame(columns=SCORE_COLS)
+        df = pd.concat(chunks, ignore_index=True)
+        if sort_by is not None:
+            df = df.sort_values(sort_by, ascending=ascending, na_position='last', kind='stable')
+        if done:
+            self._results[key] = df
+        return df
+
+    def to_csv(self):
+        """Finished results (in file order) as CSV bytes; built once"""
+        if not self.done:
+            raise RuntimeError("Scoring has not finished")
+        if self._csv is None:
+            self._csv = self.results(sort_by=None).to_csv(index=False).encode()
+        return self._csv
+
+    def _read_chunks(self):
+        if self.format == 'parquet':
+            import pyarrow.parquet as pq
+            parquet_file = pq.ParquetFile(io.BytesIO(self.data))
+            for batch in parquet_file.iter_batches(batch_size=self.chunk_size):
+                yield batch.to_pandas()
+        else:
+            yield from pd.read_csv(io.BytesIO(self.data), chunksize=self.chunk_size)
+
+    def _score_chunk(self, chunk):
+        chunk = chunk.rename(columns=lambda col: str(col).strip()).reset_index(drop=True)
+        features = chunk[BASE_FEATURE_COLS].apply(pd.to_numeric, errors='coerce')
+        values = features.to_numpy(dtype=np.float64)
+        valid = np.isfinite(values).all(axis=1)
+
+        scores = np.full((len(chunk), len(SCORE_COLS)), np.nan)
+        if valid.any():
+            scores[valid] = self.predictor.predict_batch(values[valid], use_cache=False)[SCORE_COLS].to_numpy()
+        chunk[BASE_FEATURE_COLS] = features
+        chunk[SCORE_COLS] = scores
+        return chunk, int(len(chunk) - np.count_nonzero(valid))
+
+    def _run(self):
+        try:
+            for chunk in self._read_chunks():
+                if self._cancel.is_set():
+                    break
+                scored, invalid = self._score_chunk(chunk)
+                top = _top_rows(pd.concat([self._top, scored], ignore_index=True)
+                                if len(self._top) else scored, self.top_rows)
+                with self._lock:
+                    self._chunks.append(scored)
+                    self._top = top
+                    self.rows_done += len(scored)
+                    self.invalid_rows += invalid
+            if not self._cancel.is_set():
+                # The CSV line count is only an estimate
+                self.total_rows = self.rows_done
+        except Exception as e:
+            self.error = e
+        finally:
+            # Uploaded bytes are no longer needed
+            self.data = b''
+
+
+def _top_rows(df, n):
+    """The `n` highest-probability rows (file order among ties, unscored rows last)"""
+    return df.sort_values('probability', ascending=False, na_position='last', kind='stable').head(n)
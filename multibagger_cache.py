@@ -0,0 +1,178 @@
+"""
+Prediction cache for the multibagger model
+
+Entries are keyed by the model artifact version and a canonicalized
+feature vector (the raw fundamentals in BASE_FEATURE_COLS order, rounded
+to `decimals`), so resubmitting the same fundamentals skips scoring and a
+new artifact can never serve stale results. Eviction is LRU by size plus
+an optional TTL; the cache can be persisted to disk between runs.
+
+Keys and values are plain bytes (the version followed by the row's
+float64 bytes, and the result row's float64 bytes), so a whole batch is
+encoded and decoded with NumPy and the entries add no work for Python's
+cyclic garbage collector.
+"""
+
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from multibagger_prediction import BASE_FEATURE_COLS
+
+
+class PredictionCache:
+    """Thread-safe LRU/TTL cache of per-stock prediction results"""
+
+    def __init__(self, maxsize=10000, ttl=None, path=None, decimals=6):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.path = path
+        self.decimals = decimals
+        self.model_version = None
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        if path is not None and os.path.exists(path):
+            self.load()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def make_key(self, model_version, input_data):
+        """Cache key for one stock given as a dict, Series or 1-D array"""
+        if isinstance(input_data, (np.ndarray, list, tuple)):
+            values = input_data
+        else:
+            values = [input_data[col] for col in BASE_FEATURE_COLS]
+        return self.make_keys(model_version, np.asarray(values, dtype=np.float64).reshape(1, -1))[0]
+
+    def make_keys(self, model_version, X):
+        """Cache keys for every row of a 2-D array of raw fundamentals"""
+        X = np.round(np.asarray(X, dtype=np.float64), self.decimals) + 0.0  # -0.0 -> 0.0
+        X[np.isnan(X)] = np.nan  # one NaN bit pattern
+        X = np.ascontiguousarray(X)  # frames give column-major arrays
+        prefix = np.frombuffer(_prefix(model_version), dtype=np.uint8)
+        keys = np.empty((len(X), len(prefix) + X.shape[1] * X.itemsize), dtype=np.uint8)
+        keys[:, :len(prefix)] = prefix
+        keys[:, len(prefix):] = X.view(np.uint8).reshape(len(X), -1)
+        return _rows_as_bytes(keys)
+
+    def bind(self, model_version):
+        """Attach to a model version, dropping entries of any other version"""
+        with self._lock:
+            if model_version != self.model_version:
+                self.model_version = model_version
+                prefix = _prefix(model_version)
+                for key in [key for key in self._entries if not key.startswith(prefix)]:
+                    del self._entries[key]
+
+    def get(self, key):
+        """Cached result row (1-D float array) for `key`, or None on a miss or expired entry"""
+        values, hit = self.get_many([key], None)
+        return values[0] if hit[0] else None
+
+    def get_many(self, keys, width):
+        """Cached result rows for `keys` as (values, hit)
+
+        `values` has one row of `width` floats per key (NaN for misses and
+        expired entries) and `hit` marks the rows that were found.
+        """
+        now = time.time()
+        found = []
+        hit = np.zeros(len(keys), dtype=bool)
+        with self._lock:
+            for i, key in enumerate(keys):
+                entry = self._entries.get(key)
+                if entry is None:
+                    continue
+                if entry[0] is not None and entry[0] <= now:
+                    del self._entries[key]
+                    continue
+                self._entries.move_to_end(key)
+                found.append(entry[1])
+                hit[i] = True
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        if width is None:
+            width = len(found[0]) // 8 if found else 0
+        values = np.full((len(keys), width), np.nan)
+        if found:
+            values[hit] = np.frombuffer(b''.join(found), dtype=np.float64).reshape(len(found), width)
+        return values, hit
+
+    def put(self, key, value):
+        """Store one result row, evicting the least recently used entries beyond maxsize"""
+        self.put_many([key], np.asarray(value, dtype=np.float64).reshape(1, -1))
+
+    def put_many(self, keys, values):
+        """Store a 2-D array of result rows, one per key"""
+        values = _rows_as_bytes(np.ascontiguousarray(values, dtype=np.float64))
+        expires_at = None if self.ttl is None else time.time() + self.ttl
+        with self._lock:
+            for key in keys:
+                # Re-inserted keys must move to the most recent end
+                self._entries.pop(key, None)
+            self._entries.update(zip(keys, ((expires_at, value) for value in values)))
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Hit/miss counters and current size"""
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+            'size': len(self._entries),
+            'maxsize': self.maxsize,
+            'model_version': self.model_version
+        }
+
+    def save(self, path=None):
+        """Write unexpired entries to disk (atomically)"""
+        path = path or self.path
+        now = time.time()
+        with self._lock:
+            entries = [(key, entry) for key, entry in self._entries.items()
+                       if entry[0] is None or entry[0] > now]
+        tmp_path = f"{path}.tmp-{os.getpid()}"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump({'model_version': self.model_version, 'entries': entries}, f)
+        os.replace(tmp_path, path)
+
+    def load(self, path=None):
+        """Merge unexpired entries from a file written by save()"""
+        path = path or self.path
+        with open(path, 'rb') as f:
+            data = pickle.load(f)
+        now = time.time()
+        with self._lock:
+            for key, entry in data['entries']:
+                # Skip entries written in an older key format
+                if not isinstance(key, bytes):
+                    continue
+                if entry[0] is None or entry[0] > now:
+                    self._entries[key] = entry
+            self.model_version = data['model_version']
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+
+def _prefix(model_version):
+    return f"{model_version}\0".encode()
+
+
+def _rows_as_bytes(rows):
+    """One bytes object per row of a C-contiguous 2-D array"""
+    if not rows.size:
+        return [b''] * len(rows)
+    return rows.view(np.dtype((np.void, rows.shape[1] * rows.itemsize))).ravel().tolist()
@@ -0,0 +1,75 @@
+"""
+Chunked loading of stock fundamentals from CSV and Parquet files
+
+Readers project only the needed columns and apply explicit dtypes, so a
+chunk costs a fixed amount of memory regardless of how large the history is.
+"""
+
+import glob
+import os
+
+import numpy as np
+import pandas as pd
+
+from multibagger_prediction import BASE_FEATURE_COLS
+
+# Columns read by the training pipeline and their on-load dtypes
+FUNDAMENTAL_DTYPES = dict({col: np.float32 for col in BASE_FEATURE_COLS},
+                          Price_3yr_Return=np.float32,
+                          multibagger=np.int8)
+
+PARQUET_EXTENSIONS = ('.parquet', '.pq')
+
+
+def expand_paths(paths):
+    """Expand a path, glob pattern or list of them into sorted file paths"""
+    if isinstance(paths, (str, os.PathLike)):
+        paths = [paths]
+    files = []
+    for path in paths:
+        path = os.fspath(path)
+        if os.path.isdir(path):
+            files.extend(sorted(os.path.join(path, name) for name in os.listdir(path)
+                                if name.endswith(PARQUET_EXTENSIONS + ('.csv',))))
+        elif glob.has_magic(path):
+            files.extend(sorted(glob.glob(path)))
+        else:
+            files.append(path)
+    return files
+
+
+def iter_fundamentals(path, chunksize=250000, columns=None, dtypes=None):
+    """Yield DataFrame chunks of at most `chunksize` rows from one file
+
+    Only `columns` are read (default: every column in FUNDAMENTAL_DTYPES)
+    and they are cast to `dtypes` (default FUNDAMENTAL_DTYPES) as they load.
+    """
+    dtypes = dict(FUNDAMENTAL_DTYPES if dtypes is None else dtypes)
+    columns = list(dtypes) if columns is None else list(columns)
+    dtypes = {col: dtype for col, dtype in dtypes.items() if col in columns}
+
+    if os.fspath(path).endswith(PARQUET_EXTENSIONS):
+        import pyarrow.parquet as pq
+        parquet_file = pq.ParquetFile(path)
+        for batch in parquet_file.iter_batches(batch_size=chunksize, columns=columns):
+            yield batch.to_pandas().astype(dtypes, copy=False)
+    else:
+        for chunk in pd.read_csv(path, usecols=columns, dtype=dtypes, chunksize=chunksize):
+            yield chunk
+
+
+def fundamentals_source(paths, chunksize=250000, columns=None, dtypes=None):
+    """Callable that re-reads all `paths` chunk by chunk on every call
+
+    Multi-pass consumers (statistics, then training epochs) call it once
+    per pass; nothing is held in memory between passes.
+    """
+    files = expand_paths(paths)
+    if not files:
+        raise FileNotFoundError(f"No fundamentals files match {paths}")
+
+    def chunks():
+        for path in files:
+            yield from iter_fundamentals(path, chunksize=chunksize, columns=columns, dtypes=dtypes)
+
+    return chunks
@@ -0,0 +1,202 @@
+"""
+Calibrated stacking / soft-voting ensemble of the candidate models
+
+build_ensemble compiles every member with the NumPy runtime exporters
+(multibagger_runtime) into one StackedEnsemble:
+    - all tree members (Decision Tree, Random Forest, XGBoost) share one
+      flattened forest, walked one tree at a time over all rows
+    - linear members become one matrix product
+    - Keras members become their dense matmul chains
+Each member contributes a logit, and the logits are combined by a meta
+model fitted on held-out validation data:
+    'stack'  logistic regression over the member logits
+    'vote'   mean of the members' Platt-calibrated probabilities
+Both are calibrated by construction (they minimise log-loss on the
+validation set). Inference is NumPy only and costs about the sum of its
+compiled members; memory stays a few arrays of n_rows per member.
+
+The ensemble takes the same scaled features as the individual models, so
+MultibaggerPredictor can evaluate, save and serve it like any of them.
+"""
+
+import json
+
+import numpy as np
+
+from multibagger_runtime import ACTIVATIONS, compile_trees, walk_trees, _sigmoid
+
+ENSEMBLE_METHODS = ('stack', 'vote')
+# Member probabilities are clipped to [EPS, 1 - EPS] before taking logits
+EPS = 1e-4
+
+
+def _clip(p):
+    return np.clip(p, EPS, 1.0 - EPS)
+
+
+def _logit(p):
+    p = _clip(p)
+    return np.log(p / (1.0 - p))
+
+
+class StackedEnsemble:
+    """NumPy-only ensemble of compiled member models over scaled features"""
+
+    def __init__(self, arrays, meta):
+        self.arrays = arrays
+        self.meta = meta
+        self._walker = None
+
+    @property
+    def member_names(self):
+        return [member['name'] for member in self.meta['members']]
+
+    def member_logits(self, X):
+        """Logit of every member for every row, shape (n_rows, n_members)"""
+        X = np.asarray(X, dtype=np.float64)
+        a = self.arrays
+        members = self.meta['members']
+        logits = np.empty((len(X), len(members)))
+
+        tree_members = [member for member in members if member['kind'] == 'trees']
+        if tree_members:
+            if self._walker is None:
+                trees = {key[5:]: value for key, value in a.items() if key.startswith('tree_')}
+                self._walker = compile_trees(trees, trees['strict'])
+            # Trees compare in float32 like sklearn and XGBoost do
+            leaf_sums = walk_trees(self._walker, X.astype(np.float32),
+                                   [member['trees'] for member in tree_members])
+        linear = X @ a['linear_coef'] + a['linear_intercept'] if 'linear_coef' in a else None
+
+        for j, member in enumerate(members):
+            if member['kind'] == 'linear':
+                logits[:, j] = linear[:, member['column']]
+            elif member['kind'] == 'trees':
+                total = leaf_sums[:, tree_members.index(member)]
+                if member['aggregation'] == 'mean':
+                    logits[:, j] = _logit(total / (member['trees'][1] - member['trees'][0]))
+                else:
+                    logits[:, j] = member['base_margin'] + total
+            else:
+                z = X
+                for i, activation in enumerate(member['activations']):
+                    z = ACTIVATIONS[activation](z @ a[f"dense{j}_W{i}"] + a[f"dense{j}_b{i}"])
+                logits[:, j] = _logit(z.reshape(-1))
+        return logits
+
+    def predict_proba(self, X):
+        logits = self.member_logits(X)
+        a = self.arrays
+        if self.meta['method'] == 'stack':
+            p = _sigmoid(logits @ a['stack_coef'] + a['stack_intercept'])
+        else:
+            p = _sigmoid(logits * a['vote_scale'] + a['vote_shift']).mean(axis=1)
+        return np.column_stack([1.0 - p, p])
+
+    def predict(self, X):
+        return (self.predict_proba(X)[:, 1] > 0.5).astype(int)
+
+    def fit_meta(self, X_val, y_val, C=1.0):
+        """Fit the stacking / voting weights on held-out data"""
+        from sklearn.linear_model import LogisticRegression
+        logits = self.member_logits(X_val)
+        y_val = np.asarray(y_val)
+        if self.meta['method'] == 'stack':
+            meta_model = LogisticRegression(C=C).fit(logits, y_val)
+            self.arrays['stack_coef'] = meta_model.coef_.reshape(-1).astype(np.float64)
+            self.arrays['stack_intercept'] = np.array(float(meta_model.intercept_[0]))
+        else:
+            scale, shift = np.empty(logits.shape[1]), np.empty(logits.shape[1])
+            for j in range(logits.shape[1]):
+                platt = LogisticRegression(C=C).fit(logits[:, [j]], y_val)
+                scale[j], shift[j] = platt.coef_[0, 0], platt.intercept_[0]
+            self.arrays['vote_scale'], self.arrays['vote_shift'] = scale, shift
+        return self
+
+    def save(self, path):
+        """Write the ensemble as a single .npz file"""
+        np.savez(path, __meta__=np.array(json.dumps(self.meta)), **self.arrays)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            arrays = {key: data[key] for key in data.files if not key.startswith('__')}
+            return cls(arrays, json.loads(str(data['__meta__'])))
+
+
+def _combine(runtimes):
+    """Merge compiled member runtimes into StackedEnsemble arrays and member specs"""
+    arrays, members = {}, []
+    tree_parts, strict, roots, tree_offset, n_trees = [], [], [], 0, 0
+    linear_coef, linear_intercept = [], []
+
+    for j, (name, runtime) in enumerate(runtimes.items()):
+        a = runtime.arrays
+        if runtime.kind == 'linear':
+            members.append({'name': name, 'kind': 'linear', 'column': len(linear_coef)})
+            linear_coef.append(a['coef'])
+            linear_intercept.append(float(a['intercept']))
+        elif runtime.kind == 'trees':
+            n_nodes = len(a['left'])
+            part = {key: a[key] for key in ('feature', 'threshold', 'default_left', 'leaf_value')}
+            for key in ('left', 'right'):
+                part[key] = np.where(a[key] >= 0, a[key] + tree_offset, -1)
+            tree_parts.append(part)
+            strict.append(np.full(n_nodes, runtime.meta['comparison'] == 'lt'))
+            roots.append(a['roots'] + tree_offset)
+            members.append({'name': name, 'kind': 'trees',
+                            'trees': [n_trees, n_trees + len(a['roots'])],
+                            'aggregation': runtime.meta['aggregation'],
+                            'base_margin': runtime.meta.get('base_margin', 0.0)})
+            tree_offset += n_nodes
+            n_trees += len(a['roots'])
+        else:
+            members.append({'name': name, 'kind': 'dense',
+                            'activations': runtime.meta['activations']})
+            for key, value in a.items():
+                arrays[f"dense{j}_{key}"] = value
+
+    if tree_parts:
+        for key in tree_parts[0]:
+            arrays[f"tree_{key}"] = np.concatenate([part[key] for part in tree_parts])
+        arrays['tree_strict'] = np.concatenate(strict)
+        arrays['tree_roots'] = np.concatenate(roots)
+    if linear_coef:
+        arrays['linear_coef'] = np.column_stack(linear_coef)
+        arrays['linear_intercept'] = np.asarray(linear_intercept)
+    return arrays, members
+
+
+def build_ensemble(models, X_val, y_val, method='stack', C=1.0, atol=1e-5):
+    """Compile fitted `models` ({name: model}) into a calibrated StackedEnsemble
+
+    `X_val` / `y_val` are scaled features and labels the members were not
+    trained on; they fit the meta model. Each compiled member is checked
+    against its original model on `X_val` within `atol` first.
+    """
+    from multibagger_artifact import ArrayScaler
+    from multibagger_runtime import export_model
+
+    if method not in ENSEMBLE_METHODS:
+        raise ValueError(f"Unknown ensemble method: {method}")
+    if not models:
+        raise ValueError("An ensemble needs at least one member model")
+    X_val = np.asarray(X_val, dtype=np.float64)
+    n_features = X_val.shape[1]
+
+    # Members see already-scaled features, so compile them with an identity scaler
+    identity = ArrayScaler(np.zeros(n_features), np.ones(n_features))
+    runtimes = {name: export_model(model, identity) for name, model in models.items()}
+    arrays, members = _combine(runtimes)
+    ensemble = StackedEnsemble(arrays, {'method': method, 'members': members})
+
+    expected = np.column_stack([
+        model.predict_proba(X_val)[:, 1] if hasattr(model, 'predict_proba')
+        else np.asarray(model.predict(X_val, verbose=0)).reshape(-1)
+        for model in models.values()])
+    max_diff = float(np.max(np.abs(_sigmoid(ensemble.member_logits(X_val)) - _clip(expected))))
+    if max_diff > atol:
+        raise ValueError(f"Compiled ensemble members differ from the originals by {max_diff:.3g} (> {atol})")
+
+    ensemble.meta['parity_max_diff'] = max_diff
+    return ensemble.fit_meta(X_val, y_val, C=C)
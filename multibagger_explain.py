@@ -0,0 +1,205 @@
+"""
+SHAP feature attributions for multibagger predictions
+
+The explainer depends on the type of the best model:
+    - Decision Tree, Random Forest and XGBoost use shap.TreeExplainer. It
+      needs no background data. Values are in probability units for the
+      sklearn trees and in log-odds for XGBoost.
+    - Logistic Regression uses shap.LinearExplainer over the background
+      sample. Values are in log-odds.
+    - Other models (the Keras network, NumPy runtimes and the
+      stacked ensemble) use
+      shap.KernelExplainer over a k-means summary of the background
+      sample. Values are in probability units.
+
+One explainer is built per model artifact (keyed by model_version) and
+shared by every caller in the process; the few most recently used are
+kept. Each explainer keeps an LRU cache
+of per-stock attributions. Large batches are explained in chunks:
+linear explanations are a single matrix product and always run serially,
+tree chunks share the explainer across threads, and only kernel chunks
+(thousands of model evaluations each) are worth sending to worker
+processes, unless the model is a Keras network, which stays in-process.
+"""
+
+import threading
+import weakref
+from collections import OrderedDict
+from functools import partial
+
+import numpy as np
+import pandas as pd
+
+from multibagger_prediction import FEATURE_COLS, _positive_proba
+
+TREE_MODELS = ('DecisionTreeClassifier', 'RandomForestClassifier', 'XGBClassifier')
+LINEAR_MODELS = ('LogisticRegression', 'SGDClassifier')
+
+# Explainers of the most recently used models: key -> (weakref to an unsaved model or None, explainer)
+MAX_EXPLAINERS = 4
+_explainers = OrderedDict()
+_explainers_lock = threading.Lock()
+
+
+def _positive_class(values):
+    """SHAP values / expected value of the positive class"""
+    if isinstance(values, list):
+        values = values[-1]
+    values = np.asarray(values, dtype=np.float64)
+    return values[..., -1] if values.ndim == 3 else values
+
+
+def _shap_values(explainer, X, nsamples):
+    """Positive-class SHAP values for one chunk of model inputs"""
+    if nsamples is not None:
+        values = explainer.shap_values(X, nsamples=nsamples, silent=True)
+    else:
+        values = explainer.shap_values(X)
+    return _positive_class(values).reshape(len(X), -1)
+
+
+def _kernel_shap_values(model_fn, background, X, nsamples):
+    """Kernel SHAP values for one chunk with its own explainer
+
+    KernelExplainer keeps per-call state, so parallel chunks cannot share one.
+    """
+    import shap
+    return _shap_values(shap.KernelExplainer(model_fn, background), X, nsamples)
+
+
+class ModelExplainer:
+    """SHAP explainer for one model artifact, with a per-stock cache"""
+
+    def __init__(self, predictor, background=None, max_background=100, kmeans=20,
+                 nsamples=500, cache_size=10000):
+        import shap
+        from multibagger_cache import PredictionCache
+
+        model = predictor.best_model
+        if model is None:
+            raise ValueError("No trained model available. Train models first.")
+        self.model_version = predictor.model_version
+        self.nsamples = None
+        self.in_process = type(model).__module__.startswith(('keras', 'tensorflow', 'tf_keras'))
+        name = type(model).__name__
+
+        if background is None:
+            background = predictor.background
+        if background is not None:
+            # The background is stored as raw features; explainers see model inputs
+            background = predictor._model_input(np.asarray(background, dtype=np.float64))
+            if len(background) > max_background:
+                rng = np.random.default_rng(0)
+                background = background[rng.choice(len(background), max_background, replace=False)]
+
+        if name in TREE_MODELS:
+            self.explainer = shap.TreeExplainer(model)
+            self.method = 'tree'
+            self.output = 'log-odds' if name == 'XGBClassifier' else 'probability'
+        else:
+            if background is None:
+                raise ValueError(f"Explaining {name} needs a background sample; "
+                                 f"train or save the model with one, or pass `background`")
+            if name in LINEAR_MODELS:
+                self.explainer = shap.LinearExplainer(model, background)
+                self.method = 'linear'
+                self.output = 'log-odds'
+            else:
+                if len(background) > kmeans:
+                    background = shap.kmeans(background, kmeans)
+                # Wrap only the model (not the predictor) so chunks can be pickled to workers
+                self._kernel_args = (partial(_positive_proba, model), background)
+                self.explainer = shap.KernelExplainer(*self._kernel_args)
+                self.method = 'kernel'
+                self.output = 'probability'
+                self.nsamples = nsamples
+
+        self.base_value = float(_positive_class(np.atleast_1d(self.explainer.expected_value))[-1])
+        self.cache = PredictionCache(maxsize=cache_size)
+        self.cache.bind(self.model_version)
+
+    def shap_values(self, X, chunk_size=1000, n_jobs=1):
+        """SHAP values for a matrix of model inputs, in parallel chunks"""
+        X = np.asarray(X, dtype=np.float64)
+        chunks = [X[start:start + chunk_size] for start in range(0, len(X), chunk_size)]
+        if n_jobs == 1 or len(chunks) <= 1 or self.method == 'linear':
+            parts = [_shap_values(self.explainer, chunk, self.nsamples) for chunk in chunks]
+        else:
+            from joblib import Parallel, delayed
+            if self.method == 'tree':
+                parts = Parallel(n_jobs=n_jobs, prefer='threads')(
+                    delayed(_shap_values)(self.explainer, chunk, self.nsamples) for chunk in chunks)
+            else:
+                # Copying the model into processes only pays off for kernel chunks
+                prefer = 'threads' if self.in_process else 'processes'
+                parts = Parallel(n_jobs=n_jobs, prefer=prefer)(
+                    delayed(_kernel_shap_values)(*self._kernel_args, chunk, self.nsamples)
+                    for chunk in chunks)
+        return np.concatenate(parts) if parts else np.empty((0, X.shape[1]))
+
+
+def get_explainer(predictor, **kwargs):
+    """Process-wide explainer for the predictor's current model artifact
+
+    Built on first use and reused until the predictor's model changes. An
+    unsaved model is keyed by identity and held by weak reference, since
+    CPython reuses the id() of collected objects.
+    """
+    model, ref = predictor.best_model, None
+    key = predictor.model_version
+    if key is None:
+        try:
+            ref = weakref.ref(model)
+        except TypeError:
+            return ModelExplainer(predictor, **kwargs)
+        key = ('unsaved', id(model))
+
+    with _explainers_lock:
+        entry = _explainers.get(key)
+        if entry is not None and (ref is None or entry[0]() is model):
+            _explainers.move_to_end(key)
+            return entry[1]
+        explainer = ModelExplainer(predictor, **kwargs)
+        _explainers[key] = (ref, explainer)
+        _explainers.move_to_end(key)
+        while len(_explainers) > MAX_EXPLAINERS:
+            _explainers.popitem(last=False)
+    return explainer
+
+
+def explain_batch(predictor, base, index=None, chunk_size=1000, n_jobs=1, use_cache=True):
+    """SHAP attributions for raw fundamentals (rows in BASE_FEATURE_COLS order)
+
+    Returns a DataFrame with one contribution column per model feature plus
+    base_value and output (the units of base_value + contributions).
+    Cached attributions are only reused for saved models with frozen EV/L bounds.
+    """
+    explainer = get_explainer(predictor)
+    cache = explainer.cache
+    use_cache = use_cache and predictor.model_version is not None \
+        and predictor.ev_l_bounds is not None
+
+    values = np.full((len(base), len(FEATURE_COLS)), np.nan)
+    missing = np.arange(len(base))
+    if use_cache:
+        keys = cache.make_keys(predictor.model_version, base)
+        values, hit = cache.get_many(keys, len(FEATURE_COLS))
+        missing = np.flatnonzero(~hit)
+
+    if len(missing):
+        X = predictor._model_input(predictor._raw_features(base[missing]))
+        values[missing] = explainer.shap_values(X, chunk_size=chunk_size, n_jobs=n_jobs)
+        if use_cache:
+            cache.put_many([keys[i] for i in missing], values[missing])
+
+    frame = pd.DataFrame(values, columns=FEATURE_COLS, index=index)
+    frame['base_value'] = explainer.base_value
+    frame['output'] = explainer.output
+    return frame
+
+
+def top_contributions(explanation, n=5):
+    """The `n` features with the largest absolute contribution, largest first"""
+    contributions = explanation[FEATURE_COLS].astype(float)
+    return contributions.reindex(contributions.abs().sort_values(ascending=False).index[:n])
+
@@ -0,0 +1,34 @@
+"""
+Inference-only entry point for the multibagger model
+
+Imports nothing beyond pandas/NumPy until a model is loaded, and then only
+the backend that model needs. Use this from serving code instead of the
+training pipeline:
+
+    from multibagger_inference import load_predictor
+    predictor = load_predictor()
+    scores = predictor.predict_batch(universe_df)
+"""
+
+from multibagger_prediction import MultibaggerPredictor
+
+DEFAULT_MODEL_PATH = 'best_multibagger_model'
+
+_predictors = {}
+
+
+def load_predictor(path=DEFAULT_MODEL_PATH, reload=False):
+    """Load (once per process) a predictor from a saved model"""
+    if reload or path not in _predictors:
+        _predictors[path] = MultibaggerPredictor.load_model(path)
+    return _predictors[path]
+
+
+def predict(input_data, path=DEFAULT_MODEL_PATH):
+    """Multibagger probability for one stock (dict) using the saved model"""
+    return load_predictor(path).predict_new_stock(input_data)
+
+
+def predict_batch(data, path=DEFAULT_MODEL_PATH, chunk_size=100000):
+    """EV_Score, L_Score and probability for many stocks using the saved model"""
+    return load_predictor(path).predict_batch(data, chunk_size=chunk_size)
@@ -0,0 +1,324 @@
+"""
+Stage-level instrumentation for the multibagger pipeline
+
+Pipeline stages and predict calls run inside `stage(...)`, which records
+one dict per call:
+    stage, model, rows, seconds, process_peak_rss_mb (the process's RSS
+    high-water mark so far, not a per-stage value), timestamp, plus
+    peak_traced_mb (the stage's own peak of Python allocations) / profile
+    when profiling is on.
+Records go to every registered sink:
+    LogSink         one line per record on the 'multibagger.metrics' logger
+    JSONLinesSink   one JSON object per line appended to a file
+    PrometheusSink  aggregated counters rendered in the Prometheus text
+                    format, optionally served on /metrics
+With no sinks registered and no profiling enabled a stage costs two dict
+lookups, so instrumented code paths stay fast by default.
+
+cProfile and tracemalloc can be switched on per stage:
+
+    from multibagger_metrics import add_sink, LogSink, enable_profiling
+    add_sink(LogSink())
+    enable_profiling(['train_model'], profile_dir='profiles')
+
+or without touching code through environment variables, which the
+command-line entry points read in main() via configure_from_env (never at
+import, so worker processes do not start sinks or bind the metrics port):
+    MULTIBAGGER_METRICS=log,json:metrics.jsonl,prometheus:9108
+    MULTIBAGGER_PROFILE=train_model,predict   (or *)
+"""
+
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+_sinks = []
+_profiled = set()
+_profile_options = {'cprofile': True, 'tracemalloc': True, 'profile_dir': None}
+_lock = threading.Lock()
+_env_configured = False
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far, in MB"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    return peak / (1024 * 1024) if os.uname().sysname == 'Darwin' else peak / 1024
+
+
+class LogSink:
+    """Write each record as one line to a logger"""
+
+    def __init__(self, logger='multibagger.metrics', level=logging.INFO):
+        self.logger = logging.getLogger(logger) if isinstance(logger, str) else logger
+        self.level = level
+
+    def emit(self, record):
+        extras = ' '.join(f"{key}={value}" for key, value in record.items()
+                          if key not in ('stage', 'seconds', 'timestamp', 'profile') and value is not None)
+        self.logger.log(self.level, f"{record['stage']} {record['seconds'] * 1000:.2f}ms {extras}")
+        if record.get('profile'):
+            self.logger.log(self.level, f"{record['stage']} profile:\n{record['profile']}")
+
+
+class JSONLinesSink:
+    """Append each record as a JSON line to `path`"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def emit(self, record):
+        line = json.dumps(record, default=str)
+        with self._lock, open(self.path, 'a') as f:
+            f.write(line + '\n')
+
+
+class PrometheusSink:
+    """Aggregate records per (stage, model) and render the Prometheus text format"""
+
+    def __init__(self, namespace='multibagger'):
+        self.namespace = namespace
+        self._series = {}
+        self._lock = threading.Lock()
+        self._server = None
+
+    def emit(self, record):
+        key = (record['stage'], record.get('model') or '')
+        with self._lock:
+            series = self._series.setdefault(key, {'count': 0, 'seconds': 0.0, 'rows': 0,
+                                                   'max_seconds': 0.0, 'process_peak_rss_mb': 0.0})
+            series['count'] += 1
+            series['seconds'] += record['seconds']
+            series['rows'] += record.get('rows') or 0
+            series['max_seconds'] = max(series['max_seconds'], record['seconds'])
+            series['process_peak_rss_mb'] = max(series['process_peak_rss_mb'],
+                                                record.get('process_peak_rss_mb') or 0.0)
+
+    def render(self):
+        """Current metrics as Prometheus exposition text"""
+        ns = self.namespace
+        metrics = [
+            ('stage_seconds_count', 'counter', 'Calls per pipeline stage', 'count', 1),
+            ('stage_seconds_sum', 'counter', 'Total wall seconds per pipeline stage', 'seconds', 1),
+            ('stage_seconds_max', 'gauge', 'Slowest call per pipeline stage', 'max_seconds', 1),
+            ('stage_rows_total', 'counter', 'Rows processed per pipeline stage', 'rows', 1),
+            ('stage_process_peak_rss_bytes', 'gauge',
+             'Process RSS high-water mark seen after the stage (not per stage)',
+             'process_peak_rss_mb', 1024 * 1024)
+        ]
+        with self._lock:
+            series = sorted(self._series.items())
+        lines = []
+        for name, kind, help_text, field, factor in metrics:
+            lines.append(f"# HELP {ns}_{name} {help_text}")
+            lines.append(f"# TYPE {ns}_{name} {kind}")
+            for (stage_name, model), values in series:
+                labels = f'stage="{stage_name}",model="{model}"'
+                lines.append(f"{ns}_{name}{{{labels}}} {values[field] * factor:g}")
+        return '\n'.join(lines) + '\n'
+
+    def serve(self, port=9108, host='0.0.0.0'):
+        """Serve render() on http://host:port/metrics from a daemon thread"""
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        sink = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = sink.render().encode()
+                self.send_response(200 if self.path.split('?')[0] == '/metrics' else 404)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self._server.serve_forever, name='metrics-http', daemon=True).start()
+        return self._server.server_address[1]
+
+
+def add_sink(sink):
+    """Register a sink (anything with an `emit(record)` method); returns it"""
+    with _lock:
+        _sinks.append(sink)
+    return sink
+
+
+def remove_sink(sink):
+    with _lock:
+        _sinks.remove(sink)
+
+
+def clear_sinks():
+    with _lock:
+        _sinks.clear()
+
+
+def enable_profiling(stages='*', cprofile=True, tracemalloc=True, profile_dir=None):
+    """Profile the named stages ('*' for all) with cProfile and/or tracemalloc
+
+    cProfile stats are dumped to `profile_dir` (one .prof file per call)
+    when given, otherwise the top functions are attached to the record.
+    """
+    _profiled.update([stages] if isinstance(stages, str) else stages)
+    _profile_options.update(cprofile=cprofile, tracemalloc=tracemalloc, profile_dir=profile_dir)
+
+
+def disable_profiling():
+    _profiled.clear()
+
+
+def emit(record):
+    """Send a finished record to every sink"""
+    for sink in list(_sinks):
+        try:
+            sink.emit(record)
+        except Exception as e:
+            logging.getLogger('multibagger.metrics').warning(f"Metrics sink {sink!r} failed: {e}")
+
+
+@contextmanager
+def stage(name, rows=None, model=None, **extra):
+    """Time a block and emit its record; the yielded dict can be updated
+
+    Set `record['rows']` (or any other field) inside the block when it is
+    only known at the end.
+    """
+    record = {'stage': name, 'model': model, 'rows': rows}
+    record.update(extra)
+    profiled = name in _profiled or '*' in _profiled
+    if not _sinks and not profiled:
+        yield record
+        return
+
+    profiler = None
+    traced = False
+    if profiled and _profile_options['tracemalloc']:
+        import tracemalloc
+        traced = not tracemalloc.is_tracing()
+        if traced:
+            tracemalloc.start()
+        else:
+            tracemalloc.reset_peak()
+    if profiled and _profile_options['cprofile']:
+        import cProfile
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:  # another profiler is active (nested profiled stage)
+            profiler = None
+
+    start = time.perf_counter()
+    try:
+        yield record
+    finally:
+        record['seconds'] = time.perf_counter() - start
+        if profiler is not None:
+            profiler.disable()
+            record['profile'] = _profile_summary(profiler, name)
+        if profiled and _profile_options['tracemalloc']:
+            import tracemalloc
+            record['peak_traced_mb'] = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+            if traced:
+                tracemalloc.stop()
+        record['process_peak_rss_mb'] = peak_rss_mb()
+        record['timestamp'] = time.time()
+        emit(record)
+
+
+def _profile_summary(profiler, name):
+    """Dump cProfile stats to profile_dir, or return the top functions by cumulative time"""
+    import io
+    import pstats
+    profile_dir = _profile_options['profile_dir']
+    if profile_dir:
+        os.makedirs(profile_dir, exist_ok=True)
+        path = os.path.join(profile_dir, f"{name}-{os.getpid()}-{time.time_ns()}.prof")
+        profiler.dump_stats(path)
+        return path
+    out = io.StringIO()
+    pstats.Stats(profiler, stream=out).sort_stats('cumulative').print_stats(10)
+    return out.getvalue()
+
+
+def instrument(name=None, model=None):
+    """Decorator running a function inside `stage`
+
+    `rows` is the length of the first array/DataFrame argument and
+    `rows_out` the length of the result, when they have one. Without
+    `model`, the `best_model_name` of the predictor the method is called
+    on (or returns) is used.
+    """
+    def decorator(fn):
+        stage_name = name or fn.__name__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            rows = next((len(arg) for arg in args if hasattr(arg, 'shape')), None)
+            with stage(stage_name, rows=rows, model=model) as record:
+                result = fn(*args, **kwargs)
+                if hasattr(result, 'shape'):
+                    record['rows_out'] = len(result)
+                if model is None:
+                    owner = result if hasattr(result, 'best_model_name') else args[0] if args else None
+                    record['model'] = getattr(owner, 'best_model_name', None)
+                return result
+        return wrapper
+    return decorator
+
+
+def record_stage(name, seconds, rows=None, model=None, **extra):
+    """Emit a record for work timed elsewhere (e.g. in a worker process)"""
+    if _sinks:
+        record = {'stage': name, 'model': model, 'rows': rows, 'seconds': seconds}
+        record.update(extra, process_peak_rss_mb=peak_rss_mb(), timestamp=time.time())
+        emit(record)
+
+
+def configure_from_env(environ=os.environ):
+    """Register sinks and profiling from MULTIBAGGER_METRICS / MULTIBAGGER_PROFILE
+
+    Call it from an entry point's main(), once per process; repeated calls
+    are ignored. A Prometheus port that is already taken is reported and
+    skipped instead of failing the run.
+    """
+    global _env_configured
+    with _lock:
+        if _env_configured:
+            return
+        _env_configured = True
+    for spec in filter(None, environ.get('MULTIBAGGER_METRICS', '').split(',')):
+        kind, _, arg = spec.strip().partition(':')
+        if kind == 'log':
+            logging.basicConfig(level=logging.INFO)
+            add_sink(LogSink())
+        elif kind == 'json':
+            add_sink(JSONLinesSink(arg or 'multibagger_metrics.jsonl'))
+        elif kind == 'prometheus':
+            sink = PrometheusSink()
+            try:
+                sink.serve(int(arg or 9108))
+            except OSError as e:
+                logging.getLogger('multibagger.metrics').warning(
+                    f"Metrics port {arg or 9108} unavailable ({e}); Prometheus sink not started")
+                continue
+            add_sink(sink)
+        else:
+            raise ValueError(f"Unknown metrics sink: {kind}")
+    profile = environ.get('MULTIBAGGER_PROFILE')
+    if profile:
+        enable_profiling(profile.split(','), profile_dir=environ.get('MULTIBAGGER_PROFILE_DIR'))
@@ -2,36 +2,229 @@
 """
 Multibagger Stock Prediction Pipeline using EV × L Framework
 Predicts stocks with 2x+ returns in 3 years using fundamental analysis + ML
+
+Only pandas/NumPy are imported at module level. Training, plotting and
+model backends (sklearn, xgboost, TensorFlow, matplotlib) are imported
+inside the methods that use them, so prediction-only processes stay light.
 """
 
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
-from sklearn.model_selection import train_test_split, GridSearchCV, TimeSeriesSplit
-from sklearn.preprocessing import StandardScaler
-from sklearn.linear_model import LogisticRegression
-from sklearn.tree import DecisionTreeClassifier
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, roc_auc_score, confusion_matrix, roc_curve
-import xgboost as xgb
-from tensorflow import keras
-import shap
+import os
 import pickle
+import time
 import warnings
+from multibagger_artifact import save_artifact, load_artifact
+from multibagger_metrics import configure_from_env, instrument, record_stage, stage
 warnings.filterwarnings('ignore')
 
+# Raw fundamentals expected as model input (in this column order for arrays)
+BASE_FEATURE_COLS = ['PE_Ratio', 'EPS', 'ROE', 'ROA', 'Market_Cap',
+                     'Revenue_Growth', 'Profit_Margin', 'Debt_Equity',
+                     'Volatility', 'SectorGrowth']
+
+# Full feature vector seen by the models: fundamentals + EV/L framework scores
+FEATURE_COLS = BASE_FEATURE_COLS + ['EV_Score', 'L_Score']
+
+# Fundamentals that are normalized into the EV and L scores
+EV_L_COLS = ['Revenue_Growth', 'Volatility', 'SectorGrowth',
+             'ROE', 'Profit_Margin', 'Debt_Equity']
+
+# Default EV × L screening thresholds (candidates need EV >= 0.6 and L >= 0.5)
+EV_THRESHOLD = 0.6
+L_THRESHOLD = 0.5
+
+# Candidate models fitted by train_models, in reporting order
+MODEL_NAMES = ['Logistic Regression', 'Decision Tree', 'Random Forest',
+               'XGBoost', 'Neural Network']
+
+# Models whose fit can use more than one core
+MULTITHREADED_MODELS = {'Random Forest', 'XGBoost', 'Neural Network'}
+
+# Name under which build_ensemble adds the stacked ensemble to `models`
+ENSEMBLE_NAME = 'Ensemble'
+
+# Hyperparameters used when train_models is not given tuned ones
+DEFAULT_MODEL_PARAMS = {
+    'Logistic Regression': {},
+    'Decision Tree': {'max_depth': 10},
+    'Random Forest': {'n_estimators': 100},
+    'XGBoost': {},
+    'Neural Network': {'units': (64, 32), 'dropout': 0.3, 'learning_rate': 0.001,
+                       'epochs': 50, 'batch_size': 32}
+}
+
+def _model_params(name, params=None):
+    """Default hyperparameters for `name` updated with `params`"""
+    return dict(DEFAULT_MODEL_PARAMS[name], **(params or {}))
+
+def _build_model(name, n_features, n_threads=1, params=None):
+    """Create an unfitted candidate model limited to `n_threads` cores"""
+    if name not in DEFAULT_MODEL_PARAMS:
+        raise ValueError(f"Unknown model: {name}")
+    params = _model_params(name, params)
+    if name == 'Logistic Regression':
+        from sklearn.linear_model import LogisticRegression
+        return LogisticRegression(random_state=42, **params)
+    if name == 'Decision Tree':
+        from sklearn.tree import DecisionTreeClassifier
+        return DecisionTreeClassifier(random_state=42, **params)
+    if name == 'Random Forest':
+        from sklearn.ensemble import RandomForestClassifier
+        return RandomForestClassifier(random_state=42, n_jobs=n_threads, **params)
+    if name == 'XGBoost':
+        import xgboost as xgb
+        return xgb.XGBClassifier(random_state=42, eval_metric='logloss', n_jobs=n_threads, **params)
+    
+    # Neural Network
+    import tensorflow as tf
+    from tensorflow import keras
+    try:
+        tf.config.threading.set_intra_op_parallelism_threads(n_threads)
+        tf.config.threading.set_inter_op_parallelism_threads(1)
+    except RuntimeError:
+        pass  # TF already initialized in this process; keep its thread pools
+    keras.utils.set_random_seed(42)
+    layers = []
+    for i, units in enumerate(params['units']):
+        kwargs = {'input_shape': (n_features,)} if i == 0 else {}
+        layers.append(keras.layers.Dense(units, activation='relu', **kwargs))
+        layers.append(keras.layers.Dropout(params['dropout']))
+    layers.append(keras.layers.Dense(1, activation='sigmoid'))
+    nn_model = keras.Sequential(layers)
+    nn_model.compile(optimizer=keras.optimizers.Adam(learning_rate=params['learning_rate']),
+                     loss='binary_crossentropy', metrics=['accuracy'])
+    return nn_model
+
+def _fit_model(name, X_train, y_train, X_val, y_val, n_threads=1, portable=False, params=None):
+    """Fit one candidate model and return (model, wall seconds)
+    
+    With `portable=True` a Keras model is returned as its weight list so it
+    can be sent back from a worker process.
+    """
+    start = time.perf_counter()
+    model = _build_model(name, X_train.shape[1], n_threads, params)
+    if name == 'Neural Network':
+        params = _model_params(name, params)
+        model.fit(X_train, y_train, epochs=params['epochs'], batch_size=params['batch_size'],
+                  validation_data=(X_val, y_val), verbose=0)
+        if portable:
+            model = model.get_weights()
+    else:
+        model.fit(X_train, y_train)
+    return model, time.perf_counter() - start
+
+def _positive_proba(model, X):
+    """Positive-class probabilities of a fitted candidate model as a 1-D array"""
+    if hasattr(model, 'predict_proba'):
+        return model.predict_proba(X)[:, 1]
+    # Neural Network
+    return np.asarray(model.predict(X, verbose=0)).reshape(-1)
+
+def _array_key(X):
+    """Content fingerprint of a feature matrix, used to key cached test predictions"""
+    import hashlib
+    X = np.ascontiguousarray(X)
+    return X.shape, hashlib.blake2b(X.view(np.uint8), digest_size=16).hexdigest()
+
+def _render_analysis(plot_data, path, dpi):
+    """Draw the 2x2 analysis figure from precomputed arrays and save it
+    
+    Uses matplotlib's object API with the Agg canvas, so it never opens a
+    window or touches pyplot state and can run in a worker process.
+    """
+    from matplotlib.figure import Figure
+    import seaborn as sns
+    
+    fig = Figure(figsize=(15, 12))
+    axes = fig.subplots(2, 2)
+    
+    # 1. Correlation Heatmap
+    sns.heatmap(plot_data['corr'], annot=True, cmap='coolwarm', center=0, ax=axes[0,0])
+    axes[0,0].set_title('Feature Correlation Heatmap')
+    
+    # 2. EV vs L Score Distribution
+    scatter = axes[0,1].scatter(plot_data['ev_score'], plot_data['l_score'], 
+                               c=plot_data['multibagger'], cmap='viridis', alpha=0.6)
+    axes[0,1].set_xlabel('EV Score')
+    axes[0,1].set_ylabel('L Score')
+    axes[0,1].set_title('EV vs L Score Distribution')
+    fig.colorbar(scatter, ax=axes[0,1])
+    
+    # 3. Feature Importance (Random Forest)
+    importances = plot_data['importances']
+    if importances is not None:
+        indices = np.argsort(importances)[::-1][:10]
+        
+        axes[1,0].bar(range(10), importances[indices])
+        axes[1,0].set_xticks(range(10))
+        axes[1,0].set_xticklabels([FEATURE_COLS[i] for i in indices], rotation=45)
+        axes[1,0].set_title('Top 10 Feature Importances (Random Forest)')
+    
+    # 4. ROC Curve
+    for name, (fpr, tpr, auc_score) in plot_data['roc_curves'].items():
+        axes[1,1].plot(fpr, tpr, label=f'{name} (AUC = {auc_score:.3f})')
+    
+    axes[1,1].plot([0, 1], [0, 1], 'k--')
+    axes[1,1].set_xlabel('False Positive Rate')
+    axes[1,1].set_ylabel('True Positive Rate')
+    axes[1,1].set_title('ROC Curves')
+    axes[1,1].legend()
+    
+    fig.tight_layout()
+    fig.savefig(path, dpi=dpi, bbox_inches='tight')
+    return fig
+
+def _render_analysis_file(plot_data, path, dpi):
+    """Background-process entry point: render and return only the output path"""
+    _render_analysis(plot_data, path, dpi)
+    return path
+
 class MultibaggerPredictor:
     def __init__(self):
-        self.scaler = StandardScaler()
+        self._scaler = None
         self.models = {}
         self.best_model = None
+        self.best_model_name = None
+        self.model_version = None
+        self.ev_l_bounds = None
+        self.training_times = {}
+        self.test_probabilities = {}
+        self.roc_curves = {}
+        self._test_key = None
+        self.preprocess_report = None
+        self.prediction_cache = None
+        self.background = None
+        self.parent_version = None
+        
+    @property
+    def scaler(self):
+        """Feature scaler (an unfitted StandardScaler until trained or loaded)"""
+        if self._scaler is None:
+            from sklearn.preprocessing import StandardScaler
+            self._scaler = StandardScaler()
+        return self._scaler
+    
+    @scaler.setter
+    def scaler(self, value):
+        self._scaler = value
+        
+    @instrument('load_data')
+    def load_data(self, generate_synthetic=True, path=None, chunksize=250000, n_samples=2000, seed=42):
+        """Load or generate synthetic stock data (`n_samples` rows)
+        
+        With `path` (CSV/Parquet file, directory or glob) the fundamentals are
+        read chunk by chunk with explicit dtypes; see multibagger_streaming
+        for training on data that does not fit in memory. For synthetic
+        universes too large for one frame use multibagger_synthetic.
+        """
+        if path is not None:
+            from multibagger_data import fundamentals_source
+            chunks = fundamentals_source(path, chunksize=chunksize)
+            return pd.concat(list(chunks()), ignore_index=True)
         
-    def load_data(self, generate_synthetic=True):
-        """Load or generate synthetic stock data"""
         if generate_synthetic:
-            np.random.seed(42)
-            n_samples = 2000
+            np.random.seed(seed)
             
             data = {
                 'PE_Ratio': np.random.normal(15, 8, n_samples),
@@ -51,136 +244,421 @@ class MultibaggerPredictor:
             df['multibagger'] = (df['Price_3yr_Return'] >= 2.0).astype(int)
             
             # Add some realistic correlations
-            df.loc[df['ROE'] > 20, 'multibagger'] = np.random.choice([0, 1], 
-                                                                   size=sum(df['ROE'] > 20), 
-                                                                   p=[0.3, 0.7])
-            df.loc[df['Revenue_Growth'] > 25, 'multibagger'] = np.random.choice([0, 1], 
-                                                                              size=sum(df['Revenue_Growth'] > 25), 
-                                                                              p=[0.4, 0.6])
+            high_roe = (df['ROE'] > 20).to_numpy()
+            df.loc[high_roe, 'multibagger'] = np.random.choice([0, 1], 
+                                                               size=np.count_nonzero(high_roe), 
+                                                               p=[0.3, 0.7])
+            high_growth = (df['Revenue_Growth'] > 25).to_numpy()
+            df.loc[high_growth, 'multibagger'] = np.random.choice([0, 1], 
+                                                                  size=np.count_nonzero(high_growth), 
+                                                                  p=[0.4, 0.6])
             
             return df
         
-    def preprocess_data(self, df):
-        """Clean and preprocess the data"""
+    @instrument('preprocess_data')
+    def preprocess_data(self, df, outlier_mode='joint', n_sigma=3):
+        """Clean and preprocess the data
+        
+        Missing values are filled with column medians and rows outside
+        mean ± `n_sigma`·std in any numeric column are dropped, using one
+        combined mask applied once. With `outlier_mode='joint'` every
+        column's statistics come from the same rows, so the result does not
+        depend on column order; `'sequential'` reproduces the original
+        behaviour where each column is judged on the rows kept so far.
+        Rows dropped per column are kept in `self.preprocess_report`.
+        """
+        if outlier_mode not in ('joint', 'sequential'):
+            raise ValueError(f"Unknown outlier_mode: {outlier_mode}")
+        
         # Handle missing values
-        df = df.fillna(df.median())
+        numeric_cols = df.select_dtypes(include=[np.number]).columns
+        values = df[numeric_cols].to_numpy(dtype=np.float64)
+        missing = np.isnan(values)
+        if missing.any():
+            medians = np.nanmedian(values, axis=0)
+            values[missing] = np.take(medians, np.nonzero(missing)[1])
+            df = df.fillna(dict(zip(numeric_cols, medians)))
         
         # Remove outliers (3 sigma rule)
-        numeric_cols = df.select_dtypes(include=[np.number]).columns
-        for col in numeric_cols:
-            if col != 'multibagger':
-                mean, std = df[col].mean(), df[col].std()
-                df = df[(df[col] >= mean - 3*std) & (df[col] <= mean + 3*std)]
+        outlier_cols = [i for i, col in enumerate(numeric_cols) if col != 'multibagger']
+        values = values[:, outlier_cols]
+        if outlier_mode == 'joint':
+            within = self._within_sigma(values, values.mean(axis=0), values.std(axis=0, ddof=1), n_sigma)
+            keep = within.all(axis=1)
+            dropped = (~within).sum(axis=0)
+        else:
+            keep = np.ones(len(values), dtype=bool)
+            dropped = np.zeros(len(outlier_cols), dtype=np.int64)
+            for j in range(len(outlier_cols)):
+                kept = values[keep, j]
+                within = self._within_sigma(values[:, j], kept.mean(), kept.std(ddof=1), n_sigma)
+                dropped[j] = np.count_nonzero(keep & ~within)
+                keep &= within
+        
+        self.preprocess_report = {
+            'mode': outlier_mode,
+            'rows_in': len(df),
+            'rows_out': int(keep.sum()),
+            'dropped_per_column': {numeric_cols[i]: int(n) for i, n in zip(outlier_cols, dropped)}
+        }
+        
+        return self._clip_ratios(df[keep])
+    
+    def preprocess_chunks(self, chunks, n_sigma=3, stats=None):
+        """Preprocess a dataset too large for memory, one chunk at a time
+        
+        `chunks` is a callable returning a fresh iterable of DataFrames.
+        Column statistics come from `stats` (see `fit_chunk_stats`), or an
+        extra pass over `chunks` when not given. Yields each chunk filled,
+        filtered with the joint outlier rule and clipped, matching
+        `preprocess_data` in 'joint' mode.
+        """
+        if stats is None:
+            stats = self.fit_chunk_stats(chunks)
+        if stats is None:
+            return
+        
+        numeric_cols = stats['numeric_cols']
+        outlier_cols = [i for i, col in enumerate(numeric_cols) if col != 'multibagger']
+        mean, std = stats['mean'][outlier_cols], stats['std'][outlier_cols]
+        
+        self.preprocess_report = {
+            'mode': 'joint',
+            'rows_in': 0,
+            'rows_out': 0,
+            'dropped_per_column': {numeric_cols[i]: 0 for i in outlier_cols}
+        }
+        
+        for chunk in chunks():
+            chunk = chunk.fillna(stats['fill_values'])
+            values = chunk[numeric_cols].to_numpy(dtype=np.float64)[:, outlier_cols]
+            within = self._within_sigma(values, mean, std, n_sigma)
+            keep = within.all(axis=1)
+            
+            report = self.preprocess_report
+            report['rows_in'] += len(chunk)
+            report['rows_out'] += int(keep.sum())
+            for i, n in zip(outlier_cols, (~within).sum(axis=0)):
+                report['dropped_per_column'][numeric_cols[i]] += int(n)
+            
+            yield self._clip_ratios(chunk[keep])
+    
+    def fit_chunk_stats(self, chunks, sample_size=100000, seed=0):
+        """One pass over `chunks` collecting the statistics preprocessing needs
         
-        # Ensure positive values for ratios
+        Accumulates per-column counts, means and variances, plus a uniform
+        row sample of up to `sample_size` rows for the fill medians (exact
+        when the data fits in the sample). Returns None for an empty source.
+        """
+        rng = np.random.default_rng(seed)
+        numeric_cols = None
+        count = total_mean = total_m2 = n_missing = None
+        sample = sample_keys = None
+        
+        # Chan et al. parallel mean/variance
+        for chunk in chunks():
+            if numeric_cols is None:
+                numeric_cols = chunk.select_dtypes(include=[np.number]).columns
+                n_cols = len(numeric_cols)
+                count, total_mean, total_m2 = np.zeros(n_cols), np.zeros(n_cols), np.zeros(n_cols)
+                n_missing = np.zeros(n_cols)
+                sample = np.empty((0, n_cols))
+                sample_keys = np.empty(0)
+            values = chunk[numeric_cols].to_numpy(dtype=np.float64)
+            chunk_count = np.count_nonzero(~np.isnan(values), axis=0).astype(np.float64)
+            chunk_mean = np.nanmean(values, axis=0) if len(values) else np.zeros_like(count)
+            chunk_m2 = np.nansum((values - chunk_mean) ** 2, axis=0)
+            count, total_mean, total_m2 = self._combine_moments(count, total_mean, total_m2,
+                                                                chunk_count, chunk_mean, chunk_m2)
+            n_missing += len(values) - chunk_count
+            
+            # Keep the rows with the smallest random keys: a uniform sample
+            keys = np.concatenate([sample_keys, rng.random(len(values))])
+            rows = np.concatenate([sample, values])
+            if len(keys) > sample_size:
+                top = np.argpartition(keys, sample_size)[:sample_size]
+                keys, rows = keys[top], rows[top]
+            sample_keys, sample = keys, rows
+        
+        if numeric_cols is None:
+            return None
+        
+        # Filled values take the median, so fold them into the moments
+        medians = np.nanmedian(sample, axis=0)
+        count, total_mean, total_m2 = self._combine_moments(count, total_mean, total_m2,
+                                                            n_missing, medians, np.zeros_like(medians))
+        return {
+            'numeric_cols': list(numeric_cols),
+            'fill_values': dict(zip(numeric_cols, medians)),
+            'mean': total_mean,
+            'std': np.sqrt(total_m2 / np.maximum(count - 1, 1)),
+            'n_rows': int(count[0])
+        }
+    
+    @staticmethod
+    def _within_sigma(values, mean, std, n_sigma):
+        """Boolean mask of values inside mean ± n_sigma·std"""
+        return (values >= mean - n_sigma*std) & (values <= mean + n_sigma*std)
+    
+    @staticmethod
+    def _combine_moments(n_a, mean_a, m2_a, n_b, mean_b, m2_b):
+        """Merge (count, mean, sum of squared deviations) of two row sets"""
+        n = n_a + n_b
+        safe_n = np.where(n > 0, n, 1)
+        delta = mean_b - mean_a
+        mean = mean_a + delta * n_b / safe_n
+        m2 = m2_a + m2_b + delta ** 2 * n_a * n_b / safe_n
+        return n, mean, m2
+    
+    @staticmethod
+    def _clip_ratios(df):
+        """Ensure positive values for ratios"""
+        df = df.copy()
         df['PE_Ratio'] = np.abs(df['PE_Ratio'])
         df['Debt_Equity'] = np.abs(df['Debt_Equity'])
         df['Volatility'] = np.abs(df['Volatility'])
         
         return df
     
-    def compute_ev_l_scores(self, df):
-        """Compute Earnings Visibility (EV) and Longevity (L) scores"""
-        # Normalize features to 0-1 scale
-        def normalize(series):
-            return (series - series.min()) / (series.max() - series.min())
+    def fit_ev_l_bounds(self, df, quantiles=None):
+        """Learn the normalization bounds used by the EV and L scores
+        
+        By default the bounds are each column's min/max; pass e.g.
+        `quantiles=(0.01, 0.99)` to use robust quantile bounds instead.
+        The bounds are stored on the predictor (and in the saved model) so
+        inference does not depend on which rows are scored together.
+        """
+        self.ev_l_bounds = self._compute_ev_l_bounds(df, quantiles)
+        return self.ev_l_bounds
+    
+    @staticmethod
+    def _compute_ev_l_bounds(df, quantiles=None):
+        """(low, high) bounds for every EV/L input column"""
+        bounds = {}
+        for col in EV_L_COLS:
+            values = np.asarray(df[col], dtype=np.float64)
+            if quantiles is None:
+                low, high = values.min(), values.max()
+            else:
+                low, high = np.quantile(values, quantiles)
+            bounds[col] = (float(low), float(high))
+        return bounds
+    
+    @instrument('compute_ev_l_scores')
+    def compute_ev_l_scores(self, df, fit=False):
+        """Compute Earnings Visibility (EV) and Longevity (L) scores
+        
+        Normalization bounds are learned from `df` only when `fit=True`
+        (training data); otherwise the frozen bounds are reused.
+        """
+        if fit:
+            self.fit_ev_l_bounds(df)
+        elif self.ev_l_bounds is None:
+            raise ValueError("EV/L bounds are not fitted; call compute_ev_l_scores(df, fit=True) "
+                             "on training data or load a model saved with bounds")
+        
+        ev_score, l_score = self._ev_l_arrays(df, self.ev_l_bounds)
+        df['EV_Score'] = ev_score
+        df['L_Score'] = l_score
+        
+        return df
+    
+    @staticmethod
+    def _ev_l_arrays(df, bounds):
+        """Vectorized EV and L scores as NumPy arrays"""
+        # Normalize features to 0-1 scale using the frozen bounds
+        def normalize(col):
+            low, high = bounds[col]
+            values = np.asarray(df[col], dtype=np.float64)
+            if high <= low:
+                return np.zeros_like(values)
+            return np.clip((values - low) / (high - low), 0.0, 1.0)
         
         # EV Score: Revenue Growth + Low Volatility + Sector Growth
         ev_components = {
-            'revenue_norm': normalize(df['Revenue_Growth']),
-            'volatility_norm': 1 - normalize(df['Volatility']),  # Lower volatility is better
-            'sector_norm': normalize(df['SectorGrowth'])
+            'revenue_norm': normalize('Revenue_Growth'),
+            'volatility_norm': 1 - normalize('Volatility'),  # Lower volatility is better
+            'sector_norm': normalize('SectorGrowth')
         }
         
         # Weights for EV components
         w1, w2, w3 = 0.4, 0.3, 0.3
-        df['EV_Score'] = (w1 * ev_components['revenue_norm'] + 
-                         w2 * ev_components['volatility_norm'] + 
-                         w3 * ev_components['sector_norm'])
+        ev_score = (w1 * ev_components['revenue_norm'] + 
+                    w2 * ev_components['volatility_norm'] + 
+                    w3 * ev_components['sector_norm'])
         
         # L Score: ROE + Profit Margin + Low Debt
         l_components = {
-            'roe_norm': normalize(df['ROE']),
-            'margin_norm': normalize(df['Profit_Margin']),
-            'debt_norm': 1 - normalize(df['Debt_Equity'])  # Lower debt is better
+            'roe_norm': normalize('ROE'),
+            'margin_norm': normalize('Profit_Margin'),
+            'debt_norm': 1 - normalize('Debt_Equity')  # Lower debt is better
         }
         
         # Weights for L components
         w4, w5, w6 = 0.4, 0.3, 0.3
-        df['L_Score'] = (w4 * l_components['roe_norm'] + 
-                        w5 * l_components['margin_norm'] + 
-                        w6 * l_components['debt_norm'])
+        l_score = (w4 * l_components['roe_norm'] + 
+                   w5 * l_components['margin_norm'] + 
+                   w6 * l_components['debt_norm'])
         
-        return df
+        return ev_score, l_score
     
-    def filter_candidates(self, df, ev_threshold=0.6, l_threshold=0.5):
-        """Filter stocks based on EV and L scores"""
+    @instrument('filter_candidates')
+    def filter_candidates(self, df, ev_threshold=EV_THRESHOLD, l_threshold=L_THRESHOLD):
+        """Filter stocks based on EV and L scores
+        
+        For repeated threshold sweeps over one universe use
+        multibagger_screener.UniverseScreener, which indexes the scores once.
+        """
         filtered_df = df[(df['EV_Score'] >= ev_threshold) & (df['L_Score'] >= l_threshold)]
         print(f"Filtered from {len(df)} to {len(filtered_df)} stocks ({len(filtered_df)/len(df)*100:.1f}%)")
         return filtered_df
     
     def prepare_features(self, df):
-        """Prepare feature matrix for ML models"""
-        feature_cols = ['PE_Ratio', 'EPS', 'ROE', 'ROA', 'Market_Cap', 
-                       'Revenue_Growth', 'Profit_Margin', 'Debt_Equity', 
-                       'Volatility', 'SectorGrowth', 'EV_Score', 'L_Score']
-        
-        X = df[feature_cols]
+        """Prepare feature matrix for ML models (the FEATURE_COLS columns)"""
+        X = df[FEATURE_COLS]
         y = df['multibagger']
         
         return X, y
     
-    def train_models(self, X_train, y_train, X_val, y_val):
-        """Train multiple ML models"""
-        models = {
-            'Logistic Regression': LogisticRegression(random_state=42),
-            'Decision Tree': DecisionTreeClassifier(random_state=42, max_depth=10),
-            'Random Forest': RandomForestClassifier(n_estimators=100, random_state=42),
-            'XGBoost': xgb.XGBClassifier(random_state=42, eval_metric='logloss')
-        }
+    @instrument('train_models')
+    def train_models(self, X_train, y_train, X_val, y_val, n_jobs=1, threads_per_model=None,
+                     model_params=None):
+        """Train multiple ML models
+        
+        `n_jobs` > 1 fits the candidate models concurrently in worker
+        processes. `threads_per_model` sets the core budget of each model
+        (RF n_jobs, XGBoost nthread, TF intra-op threads) as an int or a
+        {model name: threads} dict; by default the cores are shared between
+        the concurrently running models. Every model is seeded, so the
+        fitted models match a sequential run. Wall time per model is kept
+        in `self.training_times`. `model_params` maps model names to
+        hyperparameters (e.g. from multibagger_tuning) overriding the defaults.
+        """
+        model_params = model_params or {}
+        n_jobs = max(1, min(n_jobs, len(MODEL_NAMES)))
+        if threads_per_model is None:
+            threads_per_model = max(1, (os.cpu_count() or 1) // n_jobs)
+        if not isinstance(threads_per_model, dict):
+            threads_per_model = {name: threads_per_model for name in MULTITHREADED_MODELS}
+        threads = {name: threads_per_model.get(name, 1) for name in MODEL_NAMES}
+        
+        if n_jobs == 1:
+            fitted = {}
+            for name in MODEL_NAMES:
+                print(f"Training {name}...")
+                fitted[name] = _fit_model(name, X_train, y_train, X_val, y_val, threads[name],
+                                          params=model_params.get(name))
+        else:
+            from joblib import Parallel, delayed
+            print(f"Training {len(MODEL_NAMES)} models on {n_jobs} workers...")
+            # Longest fits first so they do not end up as stragglers
+            order = sorted(MODEL_NAMES, key=lambda name: name not in MULTITHREADED_MODELS)
+            results = Parallel(n_jobs=n_jobs, backend='loky')(
+                delayed(_fit_model)(name, X_train, y_train, X_val, y_val, threads[name],
+                                    portable=True, params=model_params.get(name))
+                for name in order)
+            fitted = dict(zip(order, results))
+            
+            # Rebuild the Keras model in this process from its weights
+            if 'Neural Network' in fitted:
+                weights, seconds = fitted['Neural Network']
+                nn_model = _build_model('Neural Network', X_train.shape[1], threads['Neural Network'],
+                                        model_params.get('Neural Network'))
+                nn_model.set_weights(weights)
+                fitted['Neural Network'] = (nn_model, seconds)
         
-        # Train models
-        for name, model in models.items():
-            print(f"Training {name}...")
-            model.fit(X_train, y_train)
+        self.training_times = {}
+        self.test_probabilities, self.roc_curves = {}, {}
+        for name in MODEL_NAMES:
+            model, seconds = fitted[name]
             self.models[name] = model
+            self.training_times[name] = seconds
+            record_stage('train_model', seconds, rows=len(X_train), model=name)
+            print(f"  {name}: {seconds:.2f}s")
         
-        # Simple Neural Network
-        print("Training Neural Network...")
-        nn_model = keras.Sequential([
-            keras.layers.Dense(64, activation='relu', input_shape=(X_train.shape[1],)),
-            keras.layers.Dropout(0.3),
-            keras.layers.Dense(32, activation='relu'),
-            keras.layers.Dropout(0.3),
-            keras.layers.Dense(1, activation='sigmoid')
-        ])
+        return self.models
+    
+    @instrument('build_ensemble')
+    def build_ensemble(self, X_val, y_val, method='stack', members=None):
+        """Combine trained models into one calibrated ensemble (see multibagger_ensemble)
         
-        nn_model.compile(optimizer='adam', loss='binary_crossentropy', metrics=['accuracy'])
-        nn_model.fit(X_train, y_train, epochs=50, batch_size=32, 
-                    validation_data=(X_val, y_val), verbose=0)
+        `method` is 'stack' (logistic regression over member logits) or
+        'vote' (mean of Platt-calibrated member probabilities), fitted on the
+        scaled validation set. The ensemble is added to `models` as
+        ENSEMBLE_NAME, so evaluate_models compares it with its members and
+        selects it when it scores best.
+        """
+        from multibagger_ensemble import build_ensemble
+        if members is None:
+            members = [name for name in MODEL_NAMES if name in self.models]
+        start = time.perf_counter()
+        ensemble = build_ensemble({name: self.models[name] for name in members}, X_val, y_val,
+                                  method=method)
+        self.training_times[ENSEMBLE_NAME] = time.perf_counter() - start
+        self.models[ENSEMBLE_NAME] = ensemble
+        # Drop any cached test predictions of a previous ensemble
+        self.test_probabilities.pop(ENSEMBLE_NAME, None)
+        self.roc_curves.pop(ENSEMBLE_NAME, None)
+        return ensemble
+    
+    def predict_test_probabilities(self, X_test, n_jobs=1):
+        """Positive-class test probabilities of every trained model, computed once
         
-        self.models['Neural Network'] = nn_model
+        Results are cached per model for this test set (keyed by its
+        content) until the models are retrained, so metrics and plots reuse
+        them. Models still missing are scored concurrently on `n_jobs`
+        threads (sklearn, XGBoost and TensorFlow release the GIL while
+        predicting).
+        """
+        key = _array_key(X_test)
+        if key != self._test_key:
+            self.test_probabilities, self.roc_curves = {}, {}
+            self._test_key = key
         
-        return self.models
+        missing = [name for name in self.models if name not in self.test_probabilities]
+        if len(missing) > 1 and n_jobs != 1:
+            from joblib import Parallel, delayed
+            probabilities = Parallel(n_jobs=min(n_jobs, len(missing)) if n_jobs > 0 else n_jobs,
+                                     prefer='threads')(
+                delayed(_positive_proba)(self.models[name], X_test) for name in missing)
+        else:
+            probabilities = [_positive_proba(self.models[name], X_test) for name in missing]
+        self.test_probabilities.update(zip(missing, probabilities))
+        return {name: self.test_probabilities[name] for name in self.models}
+    
+    def _roc_curves(self, y_test):
+        """(fpr, tpr, auc) per model from the cached test probabilities"""
+        from sklearn.metrics import auc, roc_curve
+        for name, y_pred_proba in self.test_probabilities.items():
+            if name not in self.roc_curves:
+                fpr, tpr, _ = roc_curve(y_test, y_pred_proba)
+                self.roc_curves[name] = (fpr, tpr, auc(fpr, tpr))
+        return {name: self.roc_curves[name] for name in self.models}
     
-    def evaluate_models(self, X_test, y_test):
-        """Evaluate all trained models"""
+    @instrument('evaluate_models')
+    def evaluate_models(self, X_test, y_test, n_jobs=1):
+        """Evaluate all trained models
+        
+        Each model predicts the test set once (see predict_test_probabilities);
+        labels, metrics and ROC curves are all derived from those probabilities.
+        """
+        y_test = np.asarray(y_test)
+        probabilities = self.predict_test_probabilities(X_test, n_jobs=n_jobs)
+        roc_curves = self._roc_curves(y_test)
+        
         results = []
         
-        for name, model in self.models.items():
-            if name == 'Neural Network':
-                y_pred_proba = model.predict(X_test).flatten()
-                y_pred = (y_pred_proba > 0.5).astype(int)
-            else:
-                y_pred = model.predict(X_test)
-                y_pred_proba = model.predict_proba(X_test)[:, 1]
+        for name, y_pred_proba in probabilities.items():
+            y_pred = (y_pred_proba > 0.5).astype(int)
             
-            # Calculate metrics
-            accuracy = accuracy_score(y_test, y_pred)
-            precision = precision_score(y_test, y_pred)
-            recall = recall_score(y_test, y_pred)
-            f1 = f1_score(y_test, y_pred)
-            auc = roc_auc_score(y_test, y_pred_proba)
+            # Calculate metrics from one confusion matrix
+            tp = int(np.count_nonzero((y_pred == 1) & (y_test == 1)))
+            fp = int(np.count_nonzero((y_pred == 1) & (y_test == 0)))
+            fn = int(np.count_nonzero((y_pred == 0) & (y_test == 1)))
+            accuracy = float(np.mean(y_pred == y_test))
+            precision = tp / (tp + fp) if tp + fp else 0.0
+            recall = tp / (tp + fn) if tp + fn else 0.0
+            f1 = 2 * tp / (2 * tp + fp + fn) if tp + fp + fn else 0.0
             
             results.append({
                 'Model': name,
@@ -188,7 +666,7 @@ class MultibaggerPredictor:
                 'Precision': precision,
                 'Recall': recall,
                 'F1': f1,
-                'AUC': auc
+                'AUC': roc_curves[name][2]
             })
         
         results_df = pd.DataFrame(results)
@@ -199,107 +677,273 @@ class MultibaggerPredictor:
         best_idx = results_df['F1'].idxmax()
         best_model_name = results_df.loc[best_idx, 'Model']
         self.best_model = self.models[best_model_name]
+        self.best_model_name = best_model_name
+        self.model_version = None  # not saved yet
         print(f"\nBest Model: {best_model_name}")
         
         return results_df
     
-    def plot_results(self, df, X_test, y_test):
-        """Generate visualization plots"""
-        fig, axes = plt.subplots(2, 2, figsize=(15, 12))
-        
-        # 1. Correlation Heatmap
-        corr_matrix = df.select_dtypes(include=[np.number]).corr()
-        sns.heatmap(corr_matrix, annot=True, cmap='coolwarm', center=0, ax=axes[0,0])
-        axes[0,0].set_title('Feature Correlation Heatmap')
-        
-        # 2. EV vs L Score Distribution
-        scatter = axes[0,1].scatter(df['EV_Score'], df['L_Score'], 
-                                   c=df['multibagger'], cmap='viridis', alpha=0.6)
-        axes[0,1].set_xlabel('EV Score')
-        axes[0,1].set_ylabel('L Score')
-        axes[0,1].set_title('EV vs L Score Distribution')
-        plt.colorbar(scatter, ax=axes[0,1])
-        
-        # 3. Feature Importance (Random Forest)
-        if 'Random Forest' in self.models:
-            rf_model = self.models['Random Forest']
-            feature_names = ['PE_Ratio', 'EPS', 'ROE', 'ROA', 'Market_Cap', 
-                           'Revenue_Growth', 'Profit_Margin', 'Debt_Equity', 
-                           'Volatility', 'SectorGrowth', 'EV_Score', 'L_Score']
-            
-            importances = rf_model.feature_importances_
-            indices = np.argsort(importances)[::-1][:10]
-            
-            axes[1,0].bar(range(10), importances[indices])
-            axes[1,0].set_xticks(range(10))
-            axes[1,0].set_xticklabels([feature_names[i] for i in indices], rotation=45)
-            axes[1,0].set_title('Top 10 Feature Importances (Random Forest)')
-        
-        # 4. ROC Curve
-        for name, model in self.models.items():
-            if name == 'Neural Network':
-                y_pred_proba = model.predict(X_test).flatten()
-            else:
-                y_pred_proba = model.predict_proba(X_test)[:, 1]
-            
-            fpr, tpr, _ = roc_curve(y_test, y_pred_proba)
-            auc_score = roc_auc_score(y_test, y_pred_proba)
-            axes[1,1].plot(fpr, tpr, label=f'{name} (AUC = {auc_score:.3f})')
-        
-        axes[1,1].plot([0, 1], [0, 1], 'k--')
-        axes[1,1].set_xlabel('False Positive Rate')
-        axes[1,1].set_ylabel('True Positive Rate')
-        axes[1,1].set_title('ROC Curves')
-        axes[1,1].legend()
-        
-        plt.tight_layout()
-        plt.savefig('multibagger_analysis.png', dpi=300, bbox_inches='tight')
-        plt.show()
-    
-    def save_model(self, filename='best_multibagger_model.pkl'):
-        """Save the best trained model"""
-        with open(filename, 'wb') as f:
-            pickle.dump({
-                'model': self.best_model,
-                'scaler': self.scaler,
-                'feature_names': ['PE_Ratio', 'EPS', 'ROE', 'ROA', 'Market_Cap', 
-                                'Revenue_Growth', 'Profit_Margin', 'Debt_Equity', 
-                                'Volatility', 'SectorGrowth', 'EV_Score', 'L_Score']
-            }, f)
+    @instrument('plot_results')
+    def plot_results(self, df, X_test, y_test, path='multibagger_analysis.png', dpi=300,
+                     background=False):
+        """Generate visualization plots
+        
+        ROC curves come from the cached test probabilities, so no model
+        predicts again. The figure is rendered headless and saved to `path`;
+        the Figure is returned (displayed inline in notebooks). With
+        `background=True` rendering runs in a separate process and a Future
+        resolving to `path` is returned immediately.
+        """
+        self.predict_test_probabilities(X_test)
+        rf_model = self.models.get('Random Forest')
+        plot_data = {
+            'corr': df.select_dtypes(include=[np.number]).corr(),
+            'ev_score': df['EV_Score'].to_numpy(),
+            'l_score': df['L_Score'].to_numpy(),
+            'multibagger': df['multibagger'].to_numpy(),
+            'importances': None if rf_model is None else rf_model.feature_importances_,
+            'roc_curves': self._roc_curves(np.asarray(y_test))
+        }
+        
+        if not background:
+            return _render_analysis(plot_data, path, dpi)
+        
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+        # spawn: never fork a process that may hold XGBoost/TensorFlow thread pools
+        executor = ProcessPoolExecutor(1, mp_context=multiprocessing.get_context('spawn'))
+        future = executor.submit(_render_analysis_file, plot_data, path, dpi)
+        executor.shutdown(wait=False)
+        return future
+    
+    @instrument('save_model')
+    def save_model(self, filename='best_multibagger_model'):
+        """Save the best trained model
+        
+        Writes a versioned artifact bundle directory (see multibagger_artifact).
+        A filename ending in .pkl writes the legacy single-pickle format.
+        """
+        if filename.endswith('.pkl'):
+            with open(filename, 'wb') as f:
+                pickle.dump({
+                    'model': self.best_model,
+                    'scaler': self.scaler,
+                    'ev_l_bounds': self.ev_l_bounds,
+                    'background': self.background,
+                    'feature_names': FEATURE_COLS
+                }, f)
+        else:
+            manifest = save_artifact(filename, self.best_model, self.scaler, FEATURE_COLS,
+                                     ev_l_bounds=self.ev_l_bounds,
+                                     model_name=self.best_model_name,
+                                     background=self.background,
+                                     parent_version=self.parent_version)
+            self.model_version = manifest['model_version']
+            if self.prediction_cache is not None:
+                self.prediction_cache.bind(self.model_version)
         print(f"Model saved as {filename}")
     
+    @classmethod
+    @instrument('load_model')
+    def load_model(cls, filename='best_multibagger_model', mmap=True):
+        """Create a predictor from a saved artifact bundle (or legacy .pkl)"""
+        predictor = cls()
+        if filename.endswith('.pkl'):
+            with open(filename, 'rb') as f:
+                model_data = pickle.load(f)
+        else:
+            model_data = load_artifact(filename, mmap=mmap)
+            predictor.best_model_name = model_data['manifest']['model_name']
+            predictor.model_version = model_data['manifest']['model_version']
+            predictor.parent_version = model_data['manifest'].get('parent_version')
+        
+        predictor.best_model = model_data['model']
+        predictor.scaler = model_data['scaler']
+        predictor.ev_l_bounds = model_data.get('ev_l_bounds')
+        predictor.background = model_data.get('background')
+        return predictor
+    
+    def refresh(self, df, n_estimators=None, epochs=5, batch_size=32):
+        """Incrementally update the best model with new labelled fundamentals
+        
+        See multibagger_refresh: the scaler is updated with partial_fit and
+        the model keeps training on the new rows only. Call save_model to
+        write the result as a new artifact version.
+        """
+        from multibagger_refresh import refresh_predictor
+        return refresh_predictor(self, df, n_estimators=n_estimators, epochs=epochs,
+                                 batch_size=batch_size)
+    
     def predict_new_stock(self, input_data):
         """Predict multibagger probability for new stock data"""
+        if isinstance(input_data, dict):
+            input_data = pd.DataFrame([input_data])
+        
+        return self.predict_batch(input_data)['probability'].iloc[0]
+    
+    def enable_prediction_cache(self, maxsize=10000, ttl=None, path=None):
+        """Cache predictions per model version and feature vector (see multibagger_cache)"""
+        from multibagger_cache import PredictionCache
+        self.prediction_cache = PredictionCache(maxsize=maxsize, ttl=ttl, path=path)
+        self.prediction_cache.bind(self.model_version)
+        return self.prediction_cache
+    
+    def predict_batch(self, data, chunk_size=100000, use_cache=True):
+        """Score many stocks in one vectorized pass
+        
+        `data` is a DataFrame with the raw fundamentals in BASE_FEATURE_COLS
+        or a 2-D array with those columns in that order. Returns a DataFrame
+        with EV_Score, L_Score and probability, one row per input row.
+        Scoring runs in chunks of `chunk_size` rows so the scaled feature
+        matrix never exceeds one chunk in memory; EV/L use the frozen bounds
+        from training, so each row's scores do not depend on its batch.
+        When a prediction cache is enabled (and `use_cache`), only rows
+        missing from it are scored; batches larger than the cache bypass it,
+        since they would only evict their own entries.
+        """
         if self.best_model is None:
             raise ValueError("No trained model available. Train models first.")
         
-        # Convert to DataFrame if needed
-        if isinstance(input_data, dict):
-            input_df = pd.DataFrame([input_data])
-        else:
-            input_df = input_data.copy()
+        base, index = self._base_array(data)
         
-        # Compute EV and L scores
-        input_df = self.compute_ev_l_scores(input_df)
+        with stage('predict', rows=len(base), model=self.best_model_name) as record:
+            # Cached results are only valid for a saved model with frozen EV/L bounds
+            cache = self.prediction_cache
+            if use_cache and cache is not None and self.model_version is not None \
+                    and self.ev_l_bounds is not None and len(base) <= cache.maxsize:
+                cache.bind(self.model_version)
+                keys = cache.make_keys(self.model_version, base)
+                scores, hit = cache.get_many(keys, 3)
+                missing = np.flatnonzero(~hit)
+                if len(missing):
+                    scores[missing] = np.column_stack(self._score_array(base[missing], chunk_size))
+                    cache.put_many([keys[i] for i in missing], scores[missing])
+                record['cached_rows'] = len(base) - len(missing)
+                ev_score, l_score, probability = scores.T
+            else:
+                ev_score, l_score, probability = self._score_array(base, chunk_size)
         
-        # Prepare features
-        feature_cols = ['PE_Ratio', 'EPS', 'ROE', 'ROA', 'Market_Cap', 
-                       'Revenue_Growth', 'Profit_Margin', 'Debt_Equity', 
-                       'Volatility', 'SectorGrowth', 'EV_Score', 'L_Score']
+        return pd.DataFrame({
+            'EV_Score': ev_score,
+            'L_Score': l_score,
+            'probability': probability
+        }, index=index)
+    
+    @staticmethod
+    def _base_array(data):
+        """Raw fundamentals as a float64 array in BASE_FEATURE_COLS order, plus a row index"""
+        if isinstance(data, pd.DataFrame):
+            return data[BASE_FEATURE_COLS].to_numpy(dtype=np.float64), data.index
+        base = np.asarray(data, dtype=np.float64)
+        if base.ndim != 2 or base.shape[1] != len(BASE_FEATURE_COLS):
+            raise ValueError(f"Expected an array of shape (n, {len(BASE_FEATURE_COLS)}) "
+                             f"with columns {BASE_FEATURE_COLS}")
+        return base, pd.RangeIndex(len(base))
+    
+    def _score_array(self, base, chunk_size):
+        """EV, L and probability arrays for raw fundamentals in BASE_FEATURE_COLS order"""
+        base_df = pd.DataFrame(base, columns=BASE_FEATURE_COLS, copy=False)
+        bounds = self._scoring_bounds(base_df)
         
-        X_new = input_df[feature_cols]
-        X_new_scaled = self.scaler.transform(X_new)
+        ev_score = np.empty(len(base), dtype=np.float64)
+        l_score = np.empty(len(base), dtype=np.float64)
+        probability = np.empty(len(base), dtype=np.float64)
+        features = np.empty((min(chunk_size, len(base)), len(FEATURE_COLS)), dtype=np.float64)
+        n_base = len(BASE_FEATURE_COLS)
+        for start in range(0, len(base), chunk_size):
+            stop = min(start + chunk_size, len(base))
+            ev_score[start:stop], l_score[start:stop] = self._ev_l_arrays(base_df.iloc[start:stop], bounds)
+            chunk = features[:stop - start]
+            chunk[:, :n_base] = base[start:stop]
+            chunk[:, n_base] = ev_score[start:stop]
+            chunk[:, n_base + 1] = l_score[start:stop]
+            probability[start:stop] = self._predict_proba(self._model_input(chunk))
         
-        # Make prediction
-        if hasattr(self.best_model, 'predict_proba'):
-            probability = self.best_model.predict_proba(X_new_scaled)[0, 1]
-        else:  # Neural Network
-            probability = self.best_model.predict(X_new_scaled)[0, 0]
+        return ev_score, l_score, probability
+    
+    def _raw_features(self, base):
+        """Unscaled FEATURE_COLS matrix (fundamentals + EV/L) for raw fundamentals"""
+        base_df = pd.DataFrame(base, columns=BASE_FEATURE_COLS, copy=False)
+        ev_score, l_score = self._ev_l_arrays(base_df, self._scoring_bounds(base_df))
+        return np.column_stack([base, ev_score, l_score])
+    
+    def _scoring_bounds(self, base_df):
+        """Frozen EV/L bounds for scoring raw fundamentals
         
-        return probability
+        The only implicit fit: models saved before bounds were frozen fall
+        back to normalizing over the input being scored.
+        """
+        if self.ev_l_bounds is not None:
+            return self.ev_l_bounds
+        return self._compute_ev_l_bounds(base_df)
+    
+    def _model_input(self, X):
+        """Scale an unscaled feature matrix unless the model folds the scaler in"""
+        if getattr(self.best_model, 'folds_scaler', False):
+            return np.asarray(X, dtype=np.float64)
+        return self.scaler.transform(X)
+    
+    def set_background(self, X, size=200, seed=0):
+        """Keep a random sample of unscaled training features for SHAP explainers
+        
+        Saved with the model artifact; linear and kernel explainers integrate
+        over it (tree explainers do not need it).
+        """
+        X = np.asarray(X, dtype=np.float64)
+        if len(X) > size:
+            X = X[np.random.default_rng(seed).choice(len(X), size, replace=False)]
+        self.background = X
+        return X
+    
+    def explain_batch(self, data, chunk_size=1000, n_jobs=1, use_cache=True):
+        """SHAP feature attributions for many stocks (see multibagger_explain)
+        
+        Takes the same input as predict_batch. Returns one contribution column
+        per FEATURE_COLS entry plus base_value and output, the units in which
+        base_value + contributions equals the model output. The explainer is
+        built once per model artifact; per-stock attributions are cached and
+        uncached rows are explained in `chunk_size` chunks over `n_jobs` workers.
+        """
+        from multibagger_explain import explain_batch
+        if self.best_model is None:
+            raise ValueError("No trained model available. Train models first.")
+        base, index = self._base_array(data)
+        with stage('explain', rows=len(base), model=self.best_model_name):
+            return explain_batch(self, base, index=index, chunk_size=chunk_size,
+                                 n_jobs=n_jobs, use_cache=use_cache)
+    
+    def explain_new_stock(self, input_data):
+        """SHAP feature attributions for one stock as a Series"""
+        if isinstance(input_data, dict):
+            input_data = pd.DataFrame([input_data])
+        
+        return self.explain_batch(input_data).iloc[0]
+    
+    def predict_frame(self, df, chunk_size=100000):
+        """Score a DataFrame of fundamentals and return it with score columns added"""
+        scores = self.predict_batch(df, chunk_size=chunk_size)
+        return df.assign(**{col: scores[col] for col in scores.columns})
+    
+    def export_runtime(self, X_check, atol=1e-5):
+        """Compile the best model into a NumPy-only runtime (see multibagger_runtime)
+        
+        `X_check` is a raw (unscaled) FEATURE_COLS matrix used to verify the
+        runtime matches the original model within `atol` before returning.
+        """
+        from multibagger_runtime import export_model, check_parity
+        runtime = export_model(self.best_model, self.scaler)
+        runtime.meta['parity_max_diff'] = check_parity(self.best_model, self.scaler, runtime,
+                                                       X_check, atol=atol)
+        runtime.meta['source_model'] = self.best_model_name
+        return runtime
+    
+    def _predict_proba(self, X_scaled):
+        """Positive-class probabilities from the best model as a 1-D array"""
+        return _positive_proba(self.best_model, X_scaled)
 
 def main():
     """Main execution pipeline"""
+    configure_from_env()
     print("🚀 Multibagger Stock Prediction Pipeline")
     print("=" * 50)
     
@@ -310,12 +954,14 @@ def main():
     print("\n📊 Loading and preprocessing data...")
     df = predictor.load_data(generate_synthetic=True)
     df = predictor.preprocess_data(df)
+    report = predictor.preprocess_report
+    print(f"Outliers removed: {report['rows_in'] - report['rows_out']} rows")
     print(f"Dataset shape: {df.shape}")
     print(f"Multibagger ratio: {df['multibagger'].mean():.2%}")
     
     # Step 2: Compute EV and L scores
     print("\n🔍 Computing EV and L scores...")
-    df = predictor.compute_ev_l_scores(df)
+    df = predictor.compute_ev_l_scores(df, fit=True)
     
     # Step 3: Filter candidates
     print("\n🎯 Filtering candidates using EV × L framework...")
@@ -335,6 +981,7 @@ def main():
     
     # Scale features
     X_train_scaled = predictor.scaler.fit_transform(X_train)
+    predictor.set_background(X_train)
     X_val_scaled = predictor.scaler.transform(X_val)
     X_test_scaled = predictor.scaler.transform(X_test)
     
@@ -343,14 +990,15 @@ def main():
     # Step 5: Train models
     print("\n🤖 Training ML models...")
     models = predictor.train_models(X_train_scaled, y_train, X_val_scaled, y_val)
+    predictor.build_ensemble(X_val_scaled, y_val)
     
     # Step 6: Evaluate models
     print("\n📈 Evaluating models...")
-    results = predictor.evaluate_models(X_test_scaled, y_test)
+    results = predictor.evaluate_models(X_test_scaled, y_test, n_jobs=-1)
     
-    # Step 7: Generate visualizations
+    # Step 7: Generate visualizations (rendered in the background)
     print("\n📊 Generating visualizations...")
-    predictor.plot_results(filtered_df, X_test_scaled, y_test)
+    plot_future = predictor.plot_results(filtered_df, X_test_scaled, y_test, background=True)
     
     # Step 8: Save best model
     print("\n💾 Saving best model...")
@@ -374,6 +1022,8 @@ def main():
     probability = predictor.predict_new_stock(sample_stock)
     print(f"Multibagger Probability: {probability:.2%}")
     
+    print(f"Analysis plots saved to {plot_future.result()}")
+    
     print("\n✅ Pipeline completed successfully!")
 
 if __name__ == "__main__":
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Incremental refresh of a saved multibagger model with a new slice of data
+
+Instead of retraining on the full history, a refresh:
+    1. updates the StandardScaler statistics with partial_fit on the new
+       rows (the artifact keeps the variance and n_samples_seen for this)
+    2. re-expresses the previous model in the updated scaler's coordinates
+       (sklearn tree thresholds, linear weights and the first Keras layer
+       are remapped up to float rounding; XGBoost cuts are float32, so rows
+       within float32 rounding of a cut may fall on the other side), so
+       earlier training stays valid
+    3. continues training on the new rows only:
+           Random Forest     adds trees (warm_start)
+           XGBoost           adds boosting rounds (xgb_model=)
+           Neural Network    more epochs from the current weights
+           SGD logistic      partial_fit
+       Logistic Regression, Decision Tree and compiled runtimes/ensembles
+       cannot be updated incrementally and raise ValueError.
+    4. saves a new artifact version that records its parent version
+
+The EV/L bounds stay frozen, so refresh time depends only on the size of
+the new slice:
+
+    python multibagger_refresh.py best_multibagger_model new_quarter.parquet
+"""
+
+import argparse
+import copy
+import time
+
+import numpy as np
+
+from multibagger_metrics import configure_from_env
+from multibagger_prediction import MultibaggerPredictor, _model_params
+
+INCREMENTAL_MODELS = ('RandomForestClassifier', 'XGBClassifier', 'SGDClassifier')
+
+
+def standard_scaler(scaler):
+    """StandardScaler that can partial_fit, rebuilt from a (loaded) fitted scaler"""
+    from sklearn.preprocessing import StandardScaler
+    if isinstance(scaler, StandardScaler):
+        return scaler
+    if getattr(scaler, 'var_', None) is None or getattr(scaler, 'n_samples_seen_', None) is None:
+        raise ValueError("The artifact has no scaler variance / sample count; retrain to refresh it")
+    updated = StandardScaler()
+    updated.mean_ = np.asarray(scaler.mean_, dtype=np.float64)
+    updated.var_ = np.asarray(scaler.var_, dtype=np.float64)
+    updated.scale_ = np.asarray(scaler.scale_, dtype=np.float64)
+    updated.n_samples_seen_ = np.int64(scaler.n_samples_seen_)
+    updated.n_features_in_ = len(updated.mean_)
+    return updated
+
+
+def _keras_model(model):
+    return type(model).__module__.startswith(('keras', 'tensorflow', 'tf_keras'))
+
+
+def rescale_model(model, old_scaler, new_scaler):
+    """Rewrite `model` in place so it gives the same output on features scaled by `new_scaler`
+
+    A feature scaled by the old scaler is z_old = z_new * ratio + shift with
+    ratio = new_scale / old_scale and shift = (new_mean - old_mean) / old_scale.
+    For XGBoost the remap is approximate: cuts and inputs are compared in
+    float32, so a row within rounding of a cut can change side.
+    """
+    ratio = new_scaler.scale_ / old_scaler.scale_
+    shift = (new_scaler.mean_ - old_scaler.mean_) / old_scaler.scale_
+    name = type(model).__name__
+
+    if name in ('RandomForestClassifier', 'DecisionTreeClassifier'):
+        for estimator in getattr(model, 'estimators_', [model]):
+            tree = estimator.tree_
+            internal = tree.children_left >= 0
+            feature = tree.feature[internal]
+            # z_old <= t  <=>  z_new <= (t - shift) / ratio
+            tree.threshold[internal] = (tree.threshold[internal] - shift[feature]) / ratio[feature]
+    elif name == 'XGBClassifier':
+        import json
+        booster = model.get_booster()
+        raw = json.loads(booster.save_raw('json'))
+        for tree in raw['learner']['gradient_booster']['model']['trees']:
+            left = np.asarray(tree['left_children'])
+            feature = np.asarray(tree['split_indices'])
+            conditions = np.asarray(tree['split_conditions'], dtype=np.float64)
+            internal = left >= 0
+            # Leaves store their value in split_conditions
+            old_cut = conditions[internal]
+            ratio_f = ratio[feature[internal]]
+            # Histogram cuts are data values, so rows sit exactly on them and must stay
+            # on the right (x >= cut): move the cut down by the float32 rounding error
+            # of the old cut carried through the remap, plus one ulp of the new one
+            margin = 2 * np.spacing(np.abs(old_cut).astype(np.float32)) / ratio_f
+            cut = ((old_cut - shift[feature[internal]]) / ratio_f - margin).astype(np.float32)
+            cut = np.nextafter(cut, np.float32(-np.inf))
+            conditions[internal] = cut
+            tree['split_conditions'] = conditions.tolist()
+        booster.load_model(bytearray(json.dumps(raw).encode()))
+    elif name in ('LogisticRegression', 'SGDClassifier'):
+        # w . z_old + b = (w * ratio) . z_new + (w . shift + b)
+        model.intercept_ = model.intercept_ + model.coef_ @ shift
+        model.coef_ = model.coef_ * ratio
+    elif _keras_model(model):
+        first = next(layer for layer in model.layers if layer.get_weights())
+        W, b = first.get_weights()
+        first.set_weights([W * ratio[:, None], b + shift @ W])
+    else:
+        raise ValueError(f"Cannot rescale {type(model).__module__}.{name}")
+    return model
+
+
+def check_refreshable(model):
+    """Raise ValueError unless `model` can continue training on new rows"""
+    name = type(model).__name__
+    if name in ('LogisticRegression', 'DecisionTreeClassifier'):
+        raise ValueError(f"{name} cannot be updated incrementally; retrain it with train_models")
+    if name not in INCREMENTAL_MODELS and not _keras_model(model):
+        raise ValueError(f"{type(model).__module__}.{name} cannot be refreshed; "
+                         "refresh its source model and re-export it")
+
+
+def _added_rounds(n_existing, n_new, n_seen):
+    """New trees / rounds in proportion to the new slice's share of the data"""
+    return max(1, round(n_existing * n_new / max(n_seen, 1)))
+
+
+def refresh_model(model, X_new, y_new, n_seen, n_estimators=None, epochs=5, batch_size=32):
+    """Continue training `model` on the scaled new rows only; returns the model
+
+    `n_estimators` is the number of trees / boosting rounds to add
+    (default: proportional to len(X_new) / n_seen).
+    """
+    check_refreshable(model)
+    name = type(model).__name__
+    y_new = np.asarray(y_new)
+    if name == 'RandomForestClassifier':
+        added = n_estimators or _added_rounds(len(model.estimators_), len(X_new), n_seen)
+        model.set_params(warm_start=True, n_estimators=len(model.estimators_) + added)
+        model.fit(X_new, y_new)
+    elif name == 'XGBClassifier':
+        import xgboost as xgb
+        booster = model.get_booster()
+        added = n_estimators or _added_rounds(booster.num_boosted_rounds(), len(X_new), n_seen)
+        params = {key: value for key, value in model.get_params().items() if value is not None}
+        params.update(n_estimators=added)
+        model = xgb.XGBClassifier(**params).fit(X_new, y_new, xgb_model=booster)
+    elif name == 'SGDClassifier':
+        model.partial_fit(X_new, y_new, classes=np.array([0, 1]))
+    else:
+        from tensorflow import keras
+        if getattr(model, 'optimizer', None) is None:
+            # Artifacts are loaded uncompiled
+            params = _model_params('Neural Network')
+            model.compile(optimizer=keras.optimizers.Adam(learning_rate=params['learning_rate']),
+                          loss='binary_crossentropy', metrics=['accuracy'])
+        model.fit(X_new, y_new, epochs=epochs, batch_size=batch_size, verbose=0)
+    return model
+
+
+def refresh_predictor(predictor, df, n_estimators=None, epochs=5, batch_size=32):
+    """Refresh `predictor`'s best model with the labelled fundamentals in `df`
+
+    `df` is preprocessed, scored with the frozen EV/L bounds and filtered
+    like the training data. Returns the number of new training rows.
+    """
+    model = predictor.best_model
+    if model is None:
+        raise ValueError("No trained model available. Train or load a model first.")
+    check_refreshable(model)
+    if predictor.ev_l_bounds is None:
+        raise ValueError("Model has no frozen EV/L bounds; retrain to refresh it")
+
+    df = predictor.preprocess_data(df)
+    df = predictor.filter_candidates(predictor.compute_ev_l_scores(df))
+    X, y = predictor.prepare_features(df)
+    if not len(X):
+        raise ValueError("No new stocks pass the EV × L filter")
+    X = X.to_numpy(dtype=np.float64)
+
+    old_scaler = standard_scaler(predictor.scaler)
+    n_seen = old_scaler.n_samples_seen_
+    new_scaler = copy.deepcopy(old_scaler).partial_fit(X)
+
+    model = rescale_model(model, old_scaler, new_scaler)
+    model = refresh_model(model, new_scaler.transform(X), y, n_seen, n_estimators=n_estimators,
+                          epochs=epochs, batch_size=batch_size)
+
+    predictor.scaler = new_scaler
+    predictor.best_model = model
+    if predictor.best_model_name:
+        predictor.models[predictor.best_model_name] = model
+    predictor.parent_version = predictor.model_version
+    predictor.model_version = None  # not saved yet
+    predictor.test_probabilities, predictor.roc_curves = {}, {}
+    return len(X)
+
+
+def main():
+    from multibagger_data import fundamentals_source
+    import pandas as pd
+
+    parser = argparse.ArgumentParser(description="Incrementally refresh a saved multibagger model")
+    parser.add_argument('model', help='artifact bundle to refresh')
+    parser.add_argument('paths', nargs='+', help='new labelled CSV/Parquet files, directories or globs')
+    parser.add_argument('--output', help='where to write the new version (default: replace `model`)')
+    parser.add_argument('--n-estimators', type=int, help='trees / boosting rounds to add')
+    parser.add_argument('--epochs', type=int, default=5)
+    args = parser.parse_args()
+    configure_from_env()
+
+    predictor = MultibaggerPredictor.load_model(args.model, mmap=False)
+    df = pd.concat(fundamentals_source(args.paths)(), ignore_index=True)
+    start = time.perf_counter()
+    rows = refresh_predictor(predictor, df, n_estimators=args.n_estimators, epochs=args.epochs)
+    print(f"Refreshed {predictor.best_model_name} on {rows} new rows in "
+          f"{time.perf_counter() - start:.2f}s")
+    predictor.save_model(args.output or args.model)
+    print(f"Version {predictor.parent_version} -> {predictor.model_version}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+"""
+Export trained models to a self-contained NumPy inference runtime
+
+The exported NumpyModel needs only NumPy at prediction time:
+    - linear models (LogisticRegression, SGD log-loss): the StandardScaler is
+      folded into the weights, so scoring is one matrix-vector product
+    - decision trees, random forests and XGBoost: every tree is flattened
+      into shared node arrays and walked one tree at a time over all rows
+    - Keras dense networks: the scaler is folded into the first layer and
+      each Dense layer becomes a matmul plus activation (dropout is a no-op)
+
+A NumpyModel takes the raw (unscaled) 12-feature matrix and exposes
+`predict_proba`, so it drops into MultibaggerPredictor as `best_model`.
+Export checks parity against the original model before returning.
+
+    python multibagger_runtime.py best_multibagger_model best_multibagger_runtime
+"""
+
+import argparse
+
+import numpy as np
+
+
+def _sigmoid(z):
+    return 0.5 * (1.0 + np.tanh(0.5 * z))
+
+
+ACTIVATIONS = {
+    'linear': lambda z: z,
+    'relu': lambda z: np.maximum(z, 0.0),
+    'sigmoid': _sigmoid,
+    'tanh': np.tanh
+}
+
+
+def compile_trees(a, strict):
+    """Walker arrays for flattened trees `a` (see _flatten_trees)
+
+    `strict` selects `x < threshold` splits (XGBoost) over `x <= threshold`
+    (sklearn); it may also be a per-node boolean array for forests mixing
+    both. Every split becomes `x < threshold` on float32 inputs, the two
+    children sit at `children[2 * node + go_right]` and leaves point back
+    at themselves, so a finished walker can keep stepping harmlessly.
+    """
+    left, right = a['left'], a['right']
+    leaf = left < 0
+    node = np.arange(len(left))
+    threshold = np.asarray(a['threshold'], dtype=np.float64)
+    # Largest float32 <= threshold, so float32 x <= threshold iff x <= below
+    below = threshold.astype(np.float32)
+    below = np.where(below > threshold, np.nextafter(below, np.float32(-np.inf)), below)
+    strict = np.broadcast_to(np.asarray(strict, dtype=bool), leaf.shape)
+    threshold = np.where(strict, below, np.nextafter(below, np.float32(np.inf)))
+    return {
+        'children': np.column_stack([np.where(leaf, node, left),
+                                     np.where(leaf, node, right)]).reshape(-1),
+        'feature': np.where(leaf, 0, a['feature']),
+        'threshold': threshold.astype(np.float32),
+        'default_right': ~np.asarray(a['default_left'], dtype=bool),
+        'leaf': leaf,
+        'leaf_value': a['leaf_value'],
+        'roots': a['roots']
+    }
+
+
+def walk_trees(walker, X, ranges):
+    """Leaf values every row of float32 `X` reaches, summed per tree range
+
+    `walker` comes from compile_trees and `ranges` is a list of
+    (first, stop) tree indices; returns shape (n_rows, len(ranges)).
+    Trees are walked one at a time over all rows, so memory stays a few
+    arrays of n_rows whatever the forest size.
+    """
+    X = np.ascontiguousarray(X, dtype=np.float32)
+    n_rows, n_features = X.shape
+    flat = X.reshape(-1)
+    has_nan = bool(np.isnan(flat).any())
+    children, feature, threshold, leaf = (walker[key] for key in ('children', 'feature', 'threshold', 'leaf'))
+    row_offset = np.arange(n_rows, dtype=np.int64) * n_features
+    sums = np.zeros((n_rows, len(ranges)))
+    if not n_rows:
+        return sums
+
+    for j, (first, stop) in enumerate(ranges):
+        for root in walker['roots'][first:stop]:
+            node = np.full(n_rows, root, dtype=np.int64)
+            offset, position, reached = row_offset, None, node
+            depth = 0
+            while True:
+                values = flat[offset + feature[node]]
+                go_right = values >= threshold[node]
+                if has_nan:
+                    go_right = np.where(np.isnan(values), walker['default_right'][node], go_right)
+                node = children[2 * node + go_right]
+                depth += 1
+                if depth % 2:
+                    continue
+                done = leaf[node]
+                n_done = np.count_nonzero(done)
+                if n_done == len(node):
+                    break
+                # Drop finished walkers once they are a sizeable share
+                if 4 * n_done > len(node):
+                    if position is None:
+                        position, reached = np.arange(n_rows), np.empty(n_rows, dtype=np.int64)
+                    reached[position[done]] = node[done]
+                    keep = ~done
+                    node, offset, position = node[keep], offset[keep], position[keep]
+            if position is None:
+                reached = node
+            else:
+                reached[position] = node
+            sums[:, j] += walker['leaf_value'][reached]
+    return sums
+
+
+class NumpyModel:
+    """NumPy-only binary classifier over raw (unscaled) features"""
+
+    # The scaler is part of the model; MultibaggerPredictor skips its own
+    folds_scaler = True
+
+    def __init__(self, kind, arrays, meta=None):
+        self.kind = kind
+        self.arrays = arrays
+        self.meta = meta or {}
+        self._walker = None
+
+    def predict_proba(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        if self.kind == 'linear':
+            p = _sigmoid(X @ self.arrays['coef'] + self.arrays['intercept'])
+        elif self.kind == 'trees':
+            p = self._predict_trees(X)
+        elif self.kind == 'dense':
+            p = self._predict_dense(X)
+        else:
+            raise ValueError(f"Unknown runtime kind: {self.kind}")
+        return np.column_stack([1.0 - p, p])
+
+    def predict(self, X):
+        return (self.predict_proba(X)[:, 1] > 0.5).astype(int)
+
+    def _predict_trees(self, X):
+        a = self.arrays
+        # Trees compare in float32 like sklearn and XGBoost do
+        X = ((X - a['mean']) / a['scale']).astype(np.float32)
+        if self._walker is None:
+            self._walker = compile_trees(a, self.meta['comparison'] == 'lt')
+        n_trees = len(a['roots'])
+        total = walk_trees(self._walker, X, [(0, n_trees)])[:, 0]
+        if self.meta['aggregation'] == 'mean':
+            return total / n_trees
+        return _sigmoid(self.meta['base_margin'] + total)
+
+    def _predict_dense(self, X):
+        z = X
+        for i, activation in enumerate(self.meta['activations']):
+            z = ACTIVATIONS[activation](z @ self.arrays[f'W{i}'] + self.arrays[f'b{i}'])
+        return z.reshape(-1)
+
+    def save(self, path):
+        """Write the runtime as a single .npz file"""
+        import json
+        np.savez(path, __kind__=np.array(self.kind), __meta__=np.array(json.dumps(self.meta)),
+                 **self.arrays)
+
+    @classmethod
+    def load(cls, path):
+        import json
+        with np.load(path, allow_pickle=False) as data:
+            arrays = {key: data[key] for key in data.files if not key.startswith('__')}
+            return cls(str(data['__kind__']), arrays, json.loads(str(data['__meta__'])))
+
+
+def _export_linear(model, mean, scale):
+    """Fold (x - mean) / scale into the linear weights"""
+    coef = np.asarray(model.coef_, dtype=np.float64).reshape(-1) / scale
+    intercept = float(np.asarray(model.intercept_).reshape(-1)[0]) - float(coef @ mean)
+    return NumpyModel('linear', {'coef': coef, 'intercept': np.array(intercept)})
+
+
+def _flatten_trees(trees, mean, scale, meta):
+    """Concatenate per-tree node arrays, offsetting child indices"""
+    arrays = {key: [] for key in ('feature', 'threshold', 'left', 'right', 'default_left', 'leaf_value')}
+    roots, offset = [], 0
+    for tree in trees:
+        roots.append(offset)
+        for key in ('left', 'right'):
+            children = np.asarray(tree[key], dtype=np.int64)
+            arrays[key].append(np.where(children >= 0, children + offset, -1))
+        arrays['feature'].append(np.maximum(np.asarray(tree['feature'], dtype=np.int64), 0))
+        arrays['threshold'].append(np.asarray(tree['threshold']))
+        arrays['default_left'].append(np.asarray(tree['default_left'], dtype=bool))
+        arrays['leaf_value'].append(np.asarray(tree['leaf_value'], dtype=np.float64))
+        offset += len(tree['left'])
+
+    flat = {key: np.concatenate(values) for key, values in arrays.items()}
+    flat.update(roots=np.asarray(roots, dtype=np.int64), mean=mean, scale=scale)
+    return NumpyModel('trees', flat, meta)
+
+
+def _export_sklearn_trees(estimators, mean, scale):
+    """DecisionTree / RandomForest: leaf value is the positive-class fraction"""
+    trees = []
+    for estimator in estimators:
+        t = estimator.tree_
+        value = t.value[:, 0, :]
+        trees.append({
+            'feature': t.feature, 'threshold': t.threshold,
+            'left': t.children_left, 'right': t.children_right,
+            # sklearn trees have no missing-value routing in this pipeline
+            'default_left': np.ones(t.node_count, dtype=bool),
+            'leaf_value': value[:, 1] / value.sum(axis=1)
+        })
+    return _flatten_trees(trees, mean, scale, {'comparison': 'le', 'aggregation': 'mean'})
+
+
+def _export_xgboost(model, mean, scale):
+    """XGBoost binary:logistic: leaf values are summed onto the base margin"""
+    import json
+    booster = model.get_booster()
+    learner = json.loads(booster.save_raw('json'))['learner']
+    if learner['objective']['name'] != 'binary:logistic':
+        raise ValueError(f"Unsupported XGBoost objective: {learner['objective']['name']}")
+    base_score = float(learner['learner_model_param']['base_score'].strip('[]'))
+    trees = []
+    for tree in learner['gradient_booster']['model']['trees']:
+        left = np.asarray(tree['left_children'])
+        conditions = np.asarray(tree['split_conditions'], dtype=np.float32)
+        trees.append({
+            'feature': tree['split_indices'], 'threshold': conditions,
+            'left': left, 'right': tree['right_children'],
+            'default_left': np.asarray(tree['default_left'], dtype=bool),
+            # Leaves store their value in split_conditions
+            'leaf_value': np.where(left < 0, conditions, 0.0)
+        })
+    meta = {'comparison': 'lt', 'aggregation': 'logit_sum',
+            'base_margin': float(np.log(base_score / (1.0 - base_score)))}
+    return _flatten_trees(trees, mean, scale, meta)
+
+
+def _export_keras(model, mean, scale):
+    """Dense layers as matmuls; the scaler is folded into the first layer"""
+    arrays, activations = {}, []
+    for layer in model.layers:
+        config = layer.get_config()
+        if type(layer).__name__ == 'Dropout':
+            continue
+        if type(layer).__name__ != 'Dense':
+            raise ValueError(f"Unsupported Keras layer: {type(layer).__name__}")
+        W, b = [np.asarray(w, dtype=np.float64) for w in layer.get_weights()]
+        i = len(activations)
+        if i == 0:
+            b = b - (mean / scale) @ W
+            W = W / scale[:, None]
+        arrays[f'W{i}'], arrays[f'b{i}'] = W, b
+        activations.append(config['activation'])
+    return NumpyModel('dense', arrays, {'activations': activations})
+
+
+def export_model(model, scaler):
+    """Compile a fitted model plus its StandardScaler into a NumpyModel"""
+    mean = np.asarray(scaler.mean_, dtype=np.float64)
+    scale = np.asarray(scaler.scale_, dtype=np.float64)
+    module = type(model).__module__
+    name = type(model).__name__
+
+    if module.startswith('xgboost'):
+        return _export_xgboost(model, mean, scale)
+    if module.startswith(('keras', 'tensorflow', 'tf_keras')):
+        return _export_keras(model, mean, scale)
+    if name in ('LogisticRegression', 'SGDClassifier'):
+        return _export_linear(model, mean, scale)
+    if name == 'DecisionTreeClassifier':
+        return _export_sklearn_trees([model], mean, scale)
+    if name == 'RandomForestClassifier':
+        return _export_sklearn_trees(model.estimators_, mean, scale)
+    raise ValueError(f"Cannot export {module}.{name} to the NumPy runtime")
+
+
+def check_parity(model, scaler, runtime, X, atol=1e-5):
+    """Largest probability difference between `model` and `runtime` on raw X
+
+    Raises ValueError when it exceeds `atol`.
+    """
+    X = np.asarray(X, dtype=np.float64)
+    X_scaled = scaler.transform(X)
+    if hasattr(model, 'predict_proba'):
+        expected = model.predict_proba(X_scaled)[:, 1]
+    else:
+        expected = np.asarray(model.predict(X_scaled, verbose=0)).reshape(-1)
+    max_diff = float(np.max(np.abs(runtime.predict_proba(X)[:, 1] - expected))) if len(X) else 0.0
+    if max_diff > atol:
+        raise ValueError(f"NumPy runtime differs from the original model by {max_diff:.3g} (> {atol})")
+    return max_diff
+
+
+def main():
+    from multibagger_prediction import MultibaggerPredictor, BASE_FEATURE_COLS
+
+    parser = argparse.ArgumentParser(description="Export the saved model to the NumPy runtime")
+    parser.add_argument('model', nargs='?', default='best_multibagger_model')
+    parser.add_argument('output', nargs='?', default='best_multibagger_runtime')
+    parser.add_argument('--check-samples', type=int, default=5000)
+    args = parser.parse_args()
+
+    predictor = MultibaggerPredictor.load_model(args.model)
+    df = predictor.preprocess_data(predictor.load_data(n_samples=args.check_samples))
+    # Scored like predict_batch, including the legacy bounds fallback
+    X_check = predictor._raw_features(df[BASE_FEATURE_COLS].to_numpy(dtype=np.float64))
+
+    runtime = predictor.export_runtime(X_check)
+    print(f"Parity check passed (max |Δp| = {runtime.meta['parity_max_diff']:.2e})")
+    predictor.best_model = runtime
+    predictor.save_model(args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,265 @@
+"""
+Incremental EV × L screener over a scored universe
+
+EV_Score, L_Score and (optionally) probability are computed once, then
+indexed on a fixed n_buckets × n_buckets grid over [0, 1]²:
+    - rows are stored sorted by (EV bucket, L bucket), so every grid cell
+      is a contiguous slice
+    - a 2-D suffix sum of the cell counts gives the number of rows in all
+      cells strictly above a threshold pair in O(1)
+    - only the boundary cells containing the thresholds are checked row by
+      row, so a query touches a small fraction of the universe
+    - a probability-descending order answers top-k by scanning from the
+      best stock down, or by partitioning the matches when they are few
+
+Updating one ticker tombstones its indexed row and records the new scores
+in a small overlay that every query also checks; the index is rebuilt
+once the overlay exceeds `max_overlay` entries.
+
+    screener = UniverseScreener.from_predictor(predictor, universe_df)
+    screener.count(0.6, 0.5)
+    screener.top_k(20, ev_threshold=0.7, l_threshold=0.4)
+    screener.update_stock('TICKER', new_fundamentals)
+"""
+
+import numpy as np
+import pandas as pd
+
+from multibagger_prediction import EV_THRESHOLD, L_THRESHOLD
+
+def _ranges(starts, stops):
+    """Concatenation of np.arange(start, stop) over paired bounds, without a Python loop"""
+    lengths = stops - starts
+    total = int(lengths.sum())
+    if not total:
+        return np.empty(0, dtype=np.int64)
+    offsets = np.repeat(starts - np.concatenate([[0], np.cumsum(lengths)[:-1]]), lengths)
+    return np.arange(total, dtype=np.int64) + offsets
+
+
+class UniverseScreener:
+    """Bucketed EV × L index answering threshold counts, selections and top-k"""
+
+    def __init__(self, ev_score, l_score, probability=None, index=None, n_buckets=128,
+                 max_overlay=4096, predictor=None):
+        ev_score = np.asarray(ev_score, dtype=np.float64)
+        l_score = np.asarray(l_score, dtype=np.float64)
+        if probability is None:
+            probability = np.full(len(ev_score), np.nan)
+        self.index = pd.RangeIndex(len(ev_score)) if index is None else pd.Index(index)
+        if not self.index.is_unique:
+            raise ValueError("Screener index must be unique (one row per ticker)")
+        self.n_buckets = n_buckets
+        self.max_overlay = max_overlay
+        self.predictor = predictor
+        self._build(ev_score, l_score, np.asarray(probability, dtype=np.float64))
+
+    def __len__(self):
+        return len(self.index)
+
+    @classmethod
+    def from_frame(cls, df, **kwargs):
+        """Index a frame that already has EV_Score, L_Score (and optionally probability)"""
+        probability = df['probability'] if 'probability' in df.columns else None
+        return cls(df['EV_Score'], df['L_Score'], probability, index=df.index, **kwargs)
+
+    @classmethod
+    def from_predictor(cls, predictor, df, chunk_size=100000, **kwargs):
+        """Score raw fundamentals once with predict_batch and index the result"""
+        scores = predictor.predict_batch(df, chunk_size=chunk_size)
+        return cls.from_frame(scores, predictor=predictor, **kwargs)
+
+    def _bucket(self, values):
+        return np.clip((values * self.n_buckets).astype(np.int64), 0, self.n_buckets - 1)
+
+    def _cell(self, value):
+        """Grid coordinate of a threshold (values outside [0, 1] land on the edges)"""
+        return int(np.clip(np.floor(value * self.n_buckets), 0, self.n_buckets - 1))
+
+    def _build(self, ev_score, l_score, probability):
+        """Sort rows into grid cells and precompute counts and probability order"""
+        nb = self.n_buckets
+        valid = ~(np.isnan(ev_score) | np.isnan(l_score))
+        # Rows with missing scores go to a trailing cell that no query reaches
+        cell = np.where(valid, self._bucket(np.nan_to_num(ev_score)) * nb
+                        + self._bucket(np.nan_to_num(l_score)), nb * nb)
+        self._rows = np.argsort(cell, kind='stable')
+        self._slot = np.empty_like(self._rows)
+        self._slot[self._rows] = np.arange(len(self._rows))
+        self._cell_of = cell[self._rows]
+        self._starts = np.searchsorted(self._cell_of, np.arange(nb * nb + 2))
+        self._ev = ev_score[self._rows]
+        self._l = l_score[self._rows]
+        self._prob = probability[self._rows]
+        self._alive = np.ones(len(self._rows), dtype=bool)
+        self._n_dead = 0
+
+        self._counts = np.diff(self._starts[:nb * nb + 1]).reshape(nb, nb)
+        self._suffix = None
+        # Slots by descending probability (missing probabilities last)
+        self._by_prob = np.argsort(np.where(np.isnan(self._prob), np.inf, -self._prob), kind='stable')
+        self._overlay = {}
+        self._overlay_arrays = None
+
+    def _suffix_counts(self):
+        """suffix[i, j] = live indexed rows with EV bucket >= i and L bucket >= j"""
+        if self._suffix is None:
+            nb = self.n_buckets
+            suffix = np.zeros((nb + 1, nb + 1), dtype=np.int64)
+            suffix[:nb, :nb] = self._counts[::-1, ::-1].cumsum(0).cumsum(1)[::-1, ::-1]
+            self._suffix = suffix
+        return self._suffix
+
+    def _overlay_view(self):
+        """Overlay rows as (keys, EV, L, probability) arrays"""
+        if self._overlay_arrays is None:
+            keys = list(self._overlay)
+            values = np.array([self._overlay[key] for key in keys], dtype=np.float64).reshape(-1, 3)
+            self._overlay_arrays = (keys, values[:, 0], values[:, 1], values[:, 2])
+        return self._overlay_arrays
+
+    def _boundary_slots(self, ev_threshold, l_threshold, bi, bj):
+        """Matching live slots inside the cells that straddle the thresholds
+
+        The cells of EV bucket `bi` (L bucket >= bj) are checked on both
+        scores; the cells of L bucket `bj` above EV bucket `bi` only on L.
+        """
+        nb = self.n_buckets
+        lo, hi = self._starts[bi * nb + bj], self._starts[bi * nb + nb]
+        keep = (self._ev[lo:hi] >= ev_threshold) & (self._l[lo:hi] >= l_threshold)
+        cells = np.arange(bi + 1, nb) * nb + bj
+        l_only = _ranges(self._starts[cells], self._starts[cells + 1])
+        slots = np.concatenate([np.flatnonzero(keep) + lo, l_only[self._l[l_only] >= l_threshold]])
+        return slots[self._alive[slots]] if self._n_dead else slots
+
+    def _match_slots(self, ev_threshold, l_threshold):
+        """All matching live slots: interior cells plus checked boundary cells"""
+        nb = self.n_buckets
+        bi, bj = self._cell(ev_threshold), self._cell(l_threshold)
+        rows = np.arange(bi + 1, nb) * nb
+        slots = _ranges(self._starts[rows + bj + 1], self._starts[rows + nb])
+        if self._n_dead:
+            slots = slots[self._alive[slots]]
+        return np.concatenate([slots, self._boundary_slots(ev_threshold, l_threshold, bi, bj)])
+
+    def _overlay_mask(self, ev_threshold, l_threshold):
+        keys, ev, l, prob = self._overlay_view()
+        return (ev >= ev_threshold) & (l >= l_threshold)
+
+    def count(self, ev_threshold=EV_THRESHOLD, l_threshold=L_THRESHOLD):
+        """Number of stocks with EV_Score >= ev_threshold and L_Score >= l_threshold"""
+        bi, bj = self._cell(ev_threshold), self._cell(l_threshold)
+        interior = int(self._suffix_counts()[bi + 1, bj + 1])
+        boundary = len(self._boundary_slots(ev_threshold, l_threshold, bi, bj))
+        return interior + boundary + int(self._overlay_mask(ev_threshold, l_threshold).sum())
+
+    def select(self, ev_threshold=EV_THRESHOLD, l_threshold=L_THRESHOLD):
+        """Index labels of the stocks passing both thresholds (in no particular order)"""
+        labels = self.index[self._rows[self._match_slots(ev_threshold, l_threshold)]]
+        if self._overlay:
+            keys = self._overlay_view()[0]
+            mask = self._overlay_mask(ev_threshold, l_threshold)
+            labels = labels.append(pd.Index([key for key, keep in zip(keys, mask) if keep]))
+        return labels
+
+    def screen(self, ev_threshold=EV_THRESHOLD, l_threshold=L_THRESHOLD):
+        """Scores of the stocks passing both thresholds as a DataFrame"""
+        slots = self._match_slots(ev_threshold, l_threshold)
+        frame = pd.DataFrame({'EV_Score': self._ev[slots], 'L_Score': self._l[slots],
+                              'probability': self._prob[slots]},
+                             index=self.index[self._rows[slots]])
+        return pd.concat([frame, self._overlay_frame(ev_threshold, l_threshold)])
+
+    def _overlay_frame(self, ev_threshold, l_threshold):
+        keys, ev, l, prob = self._overlay_view()
+        mask = self._overlay_mask(ev_threshold, l_threshold)
+        return pd.DataFrame({'EV_Score': ev[mask], 'L_Score': l[mask], 'probability': prob[mask]},
+                            index=pd.Index([key for key, keep in zip(keys, mask) if keep]))
+
+    def top_k(self, k=20, ev_threshold=EV_THRESHOLD, l_threshold=L_THRESHOLD):
+        """The `k` most probable multibaggers passing both thresholds, best first"""
+        if k <= 0:
+            empty = np.empty(0)
+            return pd.DataFrame({'EV_Score': empty, 'L_Score': empty, 'probability': empty},
+                                index=self.index[:0])
+        n_match = self.count(ev_threshold, l_threshold)
+        if n_match * n_match <= k * len(self._rows):
+            # Few matches: gathering them beats scanning the probability order
+            slots = self._match_slots(ev_threshold, l_threshold)
+        else:
+            # Many matches: walk the probability order until k are found
+            found, n_found, start = [], 0, 0
+            block = max(4 * k * len(self._rows) // n_match, 256)
+            while start < len(self._by_prob) and n_found < k:
+                slots = self._by_prob[start:start + block]
+                keep = (self._ev[slots] >= ev_threshold) & (self._l[slots] >= l_threshold)
+                if self._n_dead:
+                    keep &= self._alive[slots]
+                found.append(slots[keep])
+                n_found += len(found[-1])
+                start += block
+                block *= 2
+            # Nothing scanned when every match is in the overlay (empty index)
+            slots = np.concatenate(found)[:k] if found else np.empty(0, dtype=np.int64)
+
+        labels = self.index[self._rows[slots]]
+        ev, l, prob = self._ev[slots], self._l[slots], self._prob[slots]
+        if self._overlay:
+            keys, ov_ev, ov_l, ov_prob = self._overlay_view()
+            mask = self._overlay_mask(ev_threshold, l_threshold)
+            labels = labels.append(pd.Index([key for key, keep in zip(keys, mask) if keep]))
+            ev, l, prob = (np.concatenate([ev, ov_ev[mask]]), np.concatenate([l, ov_l[mask]]),
+                           np.concatenate([prob, ov_prob[mask]]))
+        sort_key = np.where(np.isnan(prob), np.inf, -prob)
+        if len(sort_key) > k:
+            top = np.argpartition(sort_key, k - 1)[:k]
+            order = top[np.argsort(sort_key[top], kind='stable')]
+        else:
+            order = np.argsort(sort_key, kind='stable')
+        return pd.DataFrame({'EV_Score': ev[order], 'L_Score': l[order], 'probability': prob[order]},
+                            index=labels[order])
+
+    def update(self, key, ev_score, l_score, probability=np.nan):
+        """Replace one ticker's scores (adds the ticker if it is new)"""
+        if key not in self._overlay:
+            position = self.index.get_indexer([key])[0]
+            if position >= 0:
+                slot = self._slot[position]
+                if self._alive[slot]:
+                    self._alive[slot] = False
+                    self._n_dead += 1
+                    cell = self._cell_of[slot]
+                    if cell < self.n_buckets ** 2:
+                        self._counts.flat[cell] -= 1
+                        self._suffix = None
+        self._overlay[key] = (float(ev_score), float(l_score), float(probability))
+        self._overlay_arrays = None
+        if len(self._overlay) > self.max_overlay:
+            self.rebuild()
+
+    def update_stock(self, key, fundamentals):
+        """Rescore one ticker's raw fundamentals with the bound predictor and update it"""
+        if self.predictor is None:
+            raise ValueError("No predictor bound; build with from_predictor or use update()")
+        if isinstance(fundamentals, dict):
+            fundamentals = pd.DataFrame([fundamentals])
+        scores = self.predictor.predict_batch(fundamentals).iloc[0]
+        self.update(key, scores['EV_Score'], scores['L_Score'], scores['probability'])
+        return scores
+
+    def scores(self):
+        """Current scores of every stock as a DataFrame (indexed rows plus updates)"""
+        frame = pd.DataFrame({'EV_Score': self._ev, 'L_Score': self._l, 'probability': self._prob},
+                             index=self.index[self._rows])[self._alive]
+        if self._overlay:
+            keys, ev, l, prob = self._overlay_view()
+            frame = pd.concat([frame, pd.DataFrame({'EV_Score': ev, 'L_Score': l, 'probability': prob},
+                                                   index=pd.Index(keys))])
+        return frame
+
+    def rebuild(self):
+        """Fold the overlay into a fresh index"""
+        frame = self.scores()
+        self.index = frame.index
+        self._build(frame['EV_Score'].to_numpy(), frame['L_Score'].to_numpy(),
+                    frame['probability'].to_numpy())
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Async HTTP/JSON inference endpoint for the multibagger model
+
+Routes:
+    GET  /health          liveness
+    GET  /ready           readiness, model name and version
+    POST /predict         one stock: {"PE_Ratio": ..., ..., "SectorGrowth": ...}
+    POST /predict/batch   many stocks: {"stocks": [{...}, ...]} (or a bare list)
+
+The event loop only reads HTTP framing; decoding, validating and scoring
+request bodies runs in a process pool whose workers each load the model
+once at startup, so large or CPU-bound requests never block other
+connections. Uses only the standard library on top of the
+inference dependencies.
+
+    python multibagger_server.py --model best_multibagger_model --port 8000 --workers 4
+    curl -s localhost:8000/predict -d '{"PE_Ratio": 12.5, "EPS": 8.2, ...}'
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import multiprocessing
+import os
+import signal
+from concurrent.futures import ProcessPoolExecutor
+from http import HTTPStatus
+
+from multibagger_metrics import configure_from_env
+from multibagger_prediction import BASE_FEATURE_COLS
+
+MAX_BODY_BYTES = 64 * 1024 * 1024
+# Seconds every worker gets to load the model before start() gives up
+WORKER_START_TIMEOUT = 600
+
+_worker_predictor = None
+
+
+class BadRequest(Exception):
+    """Client error reported as HTTP 400"""
+
+
+def _init_worker(model_path, started=None):
+    """Process pool initializer: load the model once per worker
+
+    With a `started` barrier, each worker then waits until every worker has
+    loaded, so none goes idle (and takes all of start()'s priming tasks)
+    before the whole pool is up.
+    """
+    global _worker_predictor
+    from multibagger_inference import load_predictor
+    try:
+        _worker_predictor = load_predictor(model_path)
+    except BaseException:
+        if started is not None:
+            started.abort()
+        raise
+    if started is not None:
+        started.wait()
+
+
+def _worker_info():
+    """Model details from a worker (also forces the pool to start)"""
+    return {'model_name': _worker_predictor.best_model_name,
+            'model_version': _worker_predictor.model_version}
+
+
+def _worker_predict(stocks):
+    """Score a list of stock dicts in a worker process"""
+    import pandas as pd
+    frame = pd.DataFrame(stocks, columns=BASE_FEATURE_COLS)
+    return _worker_predictor.predict_batch(frame).to_dict('records')
+
+
+def _validate_stock(stock):
+    """Fundamentals of one stock as floats, or BadRequest"""
+    if not isinstance(stock, dict):
+        raise BadRequest("Each stock must be a JSON object")
+    missing = [col for col in BASE_FEATURE_COLS if col not in stock]
+    if missing:
+        raise BadRequest(f"Missing fundamentals: {', '.join(missing)}")
+    try:
+        values = {col: float(stock[col]) for col in BASE_FEATURE_COLS}
+    except (TypeError, ValueError):
+        raise BadRequest("Fundamentals must be numbers")
+    # json.loads accepts NaN and Infinity literals
+    invalid = [col for col, value in values.items() if not math.isfinite(value)]
+    if invalid:
+        raise BadRequest(f"Fundamentals must be finite numbers: {', '.join(invalid)}")
+    return values
+
+
+def _parse_stocks(path, body, max_batch_rows):
+    """Decode and validate a /predict or /predict/batch body into stock dicts"""
+    try:
+        payload = json.loads(body or b'null')
+    except json.JSONDecodeError as e:
+        raise BadRequest(f"Invalid JSON: {e}")
+    if path == '/predict':
+        return [_validate_stock(payload)]
+
+    stocks = payload.get('stocks') if isinstance(payload, dict) else payload
+    if not isinstance(stocks, list):
+        raise BadRequest("Expected {\"stocks\": [...]} or a list of stocks")
+    if len(stocks) > max_batch_rows:
+        raise BadRequest(f"At most {max_batch_rows} stocks per request")
+    return [_validate_stock(stock) for stock in stocks]
+
+
+def _worker_handle(path, body, max_batch_rows):
+    """Decode, validate and score one request body in a worker; returns the JSON response body"""
+    results = _worker_predict(_parse_stocks(path, body, max_batch_rows))
+    version = _worker_predictor.model_version
+    if path == '/predict':
+        payload = dict(results[0], model_version=version)
+    else:
+        payload = {'predictions': results, 'model_version': version}
+    return json.dumps(payload).encode()
+
+
+class InferenceServer:
+    """asyncio HTTP server delegating predictions to a process pool"""
+
+    def __init__(self, model_path='best_multibagger_model', host='127.0.0.1', port=8000,
+                 workers=None, max_batch_rows=100000):
+        self.model_path = model_path
+        self.host = host
+        self.port = port
+        self.workers = workers or os.cpu_count() or 1
+        self.max_batch_rows = max_batch_rows
+        self.model_info = None
+        self._pool = None
+        self._server = None
+
+    async def start(self):
+        """Start the worker pool, preload the model in every worker and listen"""
+        loop = asyncio.get_running_loop()
+        context = multiprocessing.get_context()
+        started = context.Barrier(self.workers, timeout=WORKER_START_TIMEOUT)
+        self._pool = ProcessPoolExecutor(self.workers, mp_context=context, initializer=_init_worker,
+                                         initargs=(self.model_path, started))
+        # No worker is idle before all have loaded, so each task spawns one
+        infos = await asyncio.gather(*[loop.run_in_executor(self._pool, _worker_info)
+                                       for _ in range(self.workers)])
+        self.model_info = infos[0]
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        print(f"Serving {self.model_info['model_name']} ({self.model_info['model_version']}) "
+              f"on http://{self.host}:{self.port} with {self.workers} workers")
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+        self.model_info = None
+
+    async def serve_forever(self):
+        await self.start()
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, stop.set)
+            except NotImplementedError:
+                pass
+        await stop.wait()
+        await self.stop()
+
+    async def _dispatch(self, method, path, body):
+        """Route one request; returns (status, JSON-serializable payload or encoded JSON)"""
+        if path == '/health':
+            return HTTPStatus.OK, {'status': 'ok'}
+        if path == '/ready':
+            ready = self.model_info is not None
+            status = HTTPStatus.OK if ready else HTTPStatus.SERVICE_UNAVAILABLE
+            return status, dict({'ready': ready}, **(self.model_info or {}))
+        if path not in ('/predict', '/predict/batch'):
+            return HTTPStatus.NOT_FOUND, {'error': f"Unknown route {path}"}
+        if method != 'POST':
+            return HTTPStatus.METHOD_NOT_ALLOWED, {'error': 'Use POST'}
+
+        # Bodies of up to MAX_BODY_BYTES are decoded and validated off the event loop
+        loop = asyncio.get_running_loop()
+        data = await loop.run_in_executor(self._pool, _worker_handle, path, body, self.max_batch_rows)
+        return HTTPStatus.OK, data
+
+    async def _handle(self, reader, writer):
+        """Serve HTTP/1.1 requests on one connection (keep-alive aware)"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                method, target, version = request_line.decode('latin-1').split()
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                length = int(headers.get('content-length', 0))
+                if length > MAX_BODY_BYTES:
+                    status, payload = HTTPStatus.REQUEST_ENTITY_TOO_LARGE, {'error': 'Body too large'}
+                    keep_alive = False
+                else:
+                    body = await reader.readexactly(length)
+                    try:
+                        status, payload = await self._dispatch(method, target.split('?')[0], body)
+                    except BadRequest as e:
+                        status, payload = HTTPStatus.BAD_REQUEST, {'error': str(e)}
+                    except Exception as e:
+                        status, payload = HTTPStatus.INTERNAL_SERVER_ERROR, {'error': str(e)}
+                    keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+
+                data = payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+                writer.write(f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+                             f"Content-Type: application/json\r\n"
+                             f"Content-Length: {len(data)}\r\n"
+                             f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode() + data)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Multibagger HTTP inference server")
+    parser.add_argument('--model', default='best_multibagger_model')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+    configure_from_env()
+
+    server = InferenceServer(args.model, host=args.host, port=args.port, workers=args.workers)
+    asyncio.run(server.serve_forever())
+
+
+if __name__ == '__main__':
+    main()
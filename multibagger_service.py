@@ -0,0 +1,123 @@
+"""
+Long-lived, micro-batching prediction service
+
+One predictor is shared by every caller in the process. Requests are
+queued and a single worker thread merges them into micro-batches: it
+waits at most `max_wait_ms` after the first queued request (or until
+`max_batch_size` requests are waiting), runs one vectorized
+`predict_batch`, and resolves each caller's future with its own row.
+Under concurrent load this replaces many tiny sklearn/XGBoost/Keras calls
+with a few larger ones.
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+from multibagger_prediction import BASE_FEATURE_COLS
+
+_STOP = object()
+
+
+class PredictorService:
+    """Queue single-stock requests and score them in micro-batches"""
+
+    def __init__(self, predictor, max_batch_size=256, max_wait_ms=5.0):
+        self.predictor = predictor
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.requests = 0
+        self.batches = 0
+        self._queue = queue.Queue()
+        self._thread = None
+
+    def start(self):
+        """Start the worker thread (idempotent); returns self"""
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name='predictor-service', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        """Finish queued requests and stop the worker thread"""
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join(timeout)
+
+    def submit(self, input_data):
+        """Queue one stock (dict or Series of fundamentals); returns a Future
+
+        The future resolves to a dict with EV_Score, L_Score and probability.
+        Invalid input fails this request's future only, never its batch.
+        """
+        future = Future()
+        try:
+            row = np.array([float(input_data[col]) for col in BASE_FEATURE_COLS])
+        except KeyError as e:
+            future.set_exception(KeyError(f"Missing fundamental: {e.args[0]}"))
+            return future
+        except (TypeError, ValueError):
+            future.set_exception(ValueError("Fundamentals must be numbers"))
+            return future
+        invalid = [col for col, value in zip(BASE_FEATURE_COLS, row) if not np.isfinite(value)]
+        if invalid:
+            future.set_exception(ValueError(f"Fundamentals must be finite numbers: {', '.join(invalid)}"))
+            return future
+        self.start()
+        self._queue.put((row, future))
+        return future
+
+    def predict(self, input_data, timeout=None):
+        """Score one stock through the service and wait for the result"""
+        return self.submit(input_data).result(timeout)
+
+    def stats(self):
+        """Request and batch counters"""
+        return {
+            'requests': self.requests,
+            'batches': self.batches,
+            'mean_batch_size': self.requests / self.batches if self.batches else 0.0,
+            'queued': self._queue.qsize()
+        }
+
+    def _collect(self, first):
+        """Gather up to max_batch_size requests within max_wait of the first"""
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                self._queue.put(_STOP)  # handle after this batch
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+            # Skip requests their callers cancelled; the rest can no longer be cancelled
+            batch = [(row, future) for row, future in self._collect(item)
+                     if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            rows = np.stack([row for row, _ in batch])
+            futures = [future for _, future in batch]
+            try:
+                scores = self.predictor.predict_batch(rows)
+            except Exception as e:
+                for future in futures:
+                    future.set_exception(e)
+            else:
+                for future, record in zip(futures, scores.to_dict('records')):
+                    future.set_result(record)
+            self.requests += len(batch)
+            self.batches += 1
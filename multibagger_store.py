@@ -0,0 +1,116 @@
+"""
+Memory-mapped float32 feature store for the multibagger features
+
+The store is a directory holding the FEATURE_COLS matrix as a row-major
+float32 memmap, the labels (and optional dates) as .npy files, and a small
+JSON header. Splits are row-range views of the memmap, scaling is done in
+place chunk by chunk, and any number of processes can open the same store
+read-only and share its pages through the OS cache.
+"""
+
+import json
+import os
+
+import numpy as np
+
+from multibagger_prediction import FEATURE_COLS
+
+HEADER_FILE = 'store.json'
+FEATURES_FILE = 'features.f32'
+LABELS_FILE = 'labels.npy'
+DATES_FILE = 'dates.npy'
+
+
+class FeatureStore:
+    """Row-major (n_rows, n_features) float32 feature matrix backed by a memory-mapped file"""
+
+    def __init__(self, path, mode='r'):
+        self.path = path
+        with open(os.path.join(path, HEADER_FILE)) as f:
+            self.header = json.load(f)
+        self.feature_names = self.header['feature_names']
+        shape = (self.header['n_rows'], len(self.feature_names))
+        self.X = np.memmap(os.path.join(path, FEATURES_FILE), dtype=np.float32,
+                           mode=mode, shape=shape) if shape[0] else np.empty(shape, np.float32)
+        self.y = np.load(os.path.join(path, LABELS_FILE), mmap_mode='r')
+        dates_path = os.path.join(path, DATES_FILE)
+        self.dates = np.load(dates_path, mmap_mode='r') if os.path.exists(dates_path) else None
+
+    def __len__(self):
+        return len(self.X)
+
+    @classmethod
+    def open(cls, path, writable=False):
+        """Open an existing store (read-only unless `writable`)"""
+        return cls(path, mode='r+' if writable else 'r')
+
+    @classmethod
+    def from_chunks(cls, path, chunks, date_col=None, feature_names=FEATURE_COLS):
+        """Build a store from an iterable of DataFrames with the feature columns
+
+        Rows are appended to the memmap file chunk by chunk, so the full
+        float64 frame never has to exist in memory.
+        """
+        os.makedirs(path, exist_ok=True)
+        n_rows = 0
+        labels, dates = [], []
+        with open(os.path.join(path, FEATURES_FILE), 'wb') as f:
+            for chunk in chunks:
+                chunk[feature_names].to_numpy(dtype=np.float32).tofile(f)
+                labels.append(chunk['multibagger'].to_numpy(dtype=np.int8))
+                if date_col is not None:
+                    dates.append(chunk[date_col].to_numpy(dtype='datetime64[ns]'))
+                n_rows += len(chunk)
+
+        np.save(os.path.join(path, LABELS_FILE),
+                np.concatenate(labels) if labels else np.empty(0, np.int8))
+        if date_col is not None:
+            np.save(os.path.join(path, DATES_FILE),
+                    np.concatenate(dates) if dates else np.empty(0, 'datetime64[ns]'))
+        with open(os.path.join(path, HEADER_FILE), 'w') as f:
+            json.dump({'n_rows': n_rows, 'feature_names': list(feature_names),
+                       'scaled': False}, f, indent=2)
+        return cls.open(path)
+
+    @classmethod
+    def from_frame(cls, path, df, chunksize=1000000, date_col=None, feature_names=FEATURE_COLS):
+        """Build a store from an in-memory DataFrame"""
+        chunks = (df.iloc[start:start + chunksize] for start in range(0, len(df), chunksize))
+        return cls.from_chunks(path, chunks, date_col=date_col, feature_names=feature_names)
+
+    def split(self, fractions=(0.7, 0.85)):
+        """Positional (X, y) views split at the given cumulative fractions
+
+        The default reproduces main()'s 70/15/15 time-ordered split. Views
+        share the store's memory; nothing is copied.
+        """
+        bounds = [0] + [int(fraction * len(self)) for fraction in fractions] + [len(self)]
+        return [(self.X[start:stop], self.y[start:stop])
+                for start, stop in zip(bounds[:-1], bounds[1:])]
+
+    def fit_scaler(self, scaler, rows=None, chunksize=1000000):
+        """Fit `scaler` (e.g. StandardScaler) with partial_fit over a row range"""
+        start, stop = rows if rows is not None else (0, len(self))
+        for chunk_start in range(start, stop, chunksize):
+            chunk = self.X[chunk_start:min(chunk_start + chunksize, stop)]
+            scaler.partial_fit(np.asarray(chunk, dtype=np.float64))
+        return scaler
+
+    def scale_(self, scaler, chunksize=1000000):
+        """Standardize the whole store in place with a fitted scaler"""
+        if getattr(self.X, 'mode', 'r+') == 'r':
+            raise ValueError("Store is read-only; open it with writable=True to scale in place")
+        if self.header['scaled']:
+            raise ValueError("Store is already scaled")
+        mean = np.asarray(scaler.mean_, dtype=np.float32)
+        scale = np.asarray(scaler.scale_, dtype=np.float32)
+        for start in range(0, len(self), chunksize):
+            chunk = self.X[start:start + chunksize]
+            chunk -= mean
+            chunk /= scale
+        if len(self):
+            self.X.flush()
+
+        self.header['scaled'] = True
+        with open(os.path.join(self.path, HEADER_FILE), 'w') as f:
+            json.dump(self.header, f, indent=2)
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Out-of-core training pipeline for the multibagger model
+
+Streams chunked CSV/Parquet fundamentals through preprocessing, EV/L
+scoring and the EV × L filter into incremental learners, so memory stays
+flat as the history grows. Every stage is a pass over the source:
+
+    1. preprocessing statistics (fill medians, outlier mean/std)
+    2. EV/L normalization bounds
+    3. StandardScaler statistics (partial_fit)
+    4. training epochs: SGD logistic regression (partial_fit), XGBoost
+       external memory, or a Keras model fed from a batch generator
+
+    python multibagger_streaming.py "history/*.parquet" --learner xgboost
+"""
+
+import argparse
+import math
+import os
+import tempfile
+
+import numpy as np
+
+from multibagger_prediction import (MultibaggerPredictor, EV_L_COLS, FEATURE_COLS,
+                                    EV_THRESHOLD, L_THRESHOLD)
+from multibagger_data import fundamentals_source
+from multibagger_metrics import configure_from_env
+
+LEARNERS = ('sgd', 'xgboost', 'keras')
+
+
+class StreamingTrainer:
+    """Train a MultibaggerPredictor from a chunked data source"""
+
+    def __init__(self, predictor=None, ev_threshold=EV_THRESHOLD, l_threshold=L_THRESHOLD):
+        self.predictor = predictor or MultibaggerPredictor()
+        self.ev_threshold = ev_threshold
+        self.l_threshold = l_threshold
+        self.preprocess_stats = None
+        self.chunk_rows = []
+
+    def preprocessed_chunks(self, source):
+        """Preprocessed chunks using the statistics from the first pass"""
+        return self.predictor.preprocess_chunks(source, stats=self.preprocess_stats)
+
+    def filtered_chunks(self, source):
+        """Scored and EV × L filtered chunks"""
+        for chunk in self.preprocessed_chunks(source):
+            chunk = self.predictor.compute_ev_l_scores(chunk)
+            keep = (chunk['EV_Score'] >= self.ev_threshold) & (chunk['L_Score'] >= self.l_threshold)
+            if keep.any():
+                yield chunk[keep]
+
+    def feature_chunks(self, source, scaled=True):
+        """(X, y) arrays per filtered chunk"""
+        for chunk in self.filtered_chunks(source):
+            X = chunk[FEATURE_COLS].to_numpy(dtype=np.float64)
+            if scaled:
+                X = self.predictor.scaler.transform(X)
+            yield X, chunk['multibagger'].to_numpy()
+
+    def fit_statistics(self, source):
+        """Passes 1-3: preprocessing stats, EV/L bounds and the scaler"""
+        print("Pass 1: preprocessing statistics...")
+        self.preprocess_stats = self.predictor.fit_chunk_stats(source)
+        if self.preprocess_stats is None:
+            raise ValueError("Data source is empty")
+
+        print("Pass 2: EV/L bounds...")
+        low = np.full(len(EV_L_COLS), np.inf)
+        high = np.full(len(EV_L_COLS), -np.inf)
+        for chunk in self.preprocessed_chunks(source):
+            if len(chunk):
+                values = chunk[EV_L_COLS].to_numpy(dtype=np.float64)
+                low = np.minimum(low, values.min(axis=0))
+                high = np.maximum(high, values.max(axis=0))
+        self.predictor.ev_l_bounds = {col: (float(lo), float(hi))
+                                      for col, lo, hi in zip(EV_L_COLS, low, high)}
+
+        print("Pass 3: scaler statistics...")
+        self.chunk_rows = []
+        for X, _ in self.feature_chunks(source, scaled=False):
+            self.predictor.scaler.partial_fit(X)
+            self.chunk_rows.append(len(X))
+        if not self.chunk_rows:
+            raise ValueError("No stocks pass the EV × L filter")
+        print(f"Training rows after filtering: {sum(self.chunk_rows)}")
+
+    def fit(self, source, learner='sgd', epochs=5, batch_size=32, cache_dir=None):
+        """Train `learner` on `source` and install it as the predictor's best model"""
+        if learner not in LEARNERS:
+            raise ValueError(f"Unknown learner: {learner} (choose from {LEARNERS})")
+        self.fit_statistics(source)
+
+        print(f"Pass 4: training {learner}...")
+        if learner == 'sgd':
+            model = self._fit_sgd(source, epochs)
+            name = 'SGD Logistic Regression'
+        elif learner == 'xgboost':
+            model = self._fit_xgboost(source, cache_dir)
+            name = 'XGBoost'
+        else:
+            model = self._fit_keras(source, epochs, batch_size)
+            name = 'Neural Network'
+
+        self.predictor.best_model = model
+        self.predictor.best_model_name = name
+        self.predictor.models[name] = model
+        return self.predictor
+
+    def _fit_sgd(self, source, epochs):
+        """Logistic regression trained by SGD, one partial_fit per chunk"""
+        from sklearn.linear_model import SGDClassifier
+        model = SGDClassifier(loss='log_loss', random_state=42)
+        for _ in range(epochs):
+            for X, y in self.feature_chunks(source):
+                model.partial_fit(X, y, classes=np.array([0, 1]))
+        return model
+
+    def _fit_xgboost(self, source, cache_dir=None, num_boost_round=100):
+        """XGBoost with external memory: chunks are paged through an on-disk cache"""
+        import xgboost as xgb
+
+        trainer = self
+
+        class ChunkIter(xgb.DataIter):
+            def __init__(self, cache_prefix):
+                self._chunks = None
+                super().__init__(cache_prefix=cache_prefix)
+
+            def next(self, input_data):
+                if self._chunks is None:
+                    self._chunks = trainer.feature_chunks(source)
+                try:
+                    X, y = next(self._chunks)
+                except StopIteration:
+                    return 0
+                input_data(data=X, label=y)
+                return 1
+
+            def reset(self):
+                self._chunks = None
+
+        with tempfile.TemporaryDirectory(dir=cache_dir) as tmp_dir:
+            dtrain = xgb.DMatrix(ChunkIter(os.path.join(tmp_dir, 'cache')))
+            booster = xgb.train({'objective': 'binary:logistic', 'eval_metric': 'logloss',
+                                 'tree_method': 'hist', 'seed': 42},
+                                dtrain, num_boost_round=num_boost_round)
+
+        model = xgb.XGBClassifier()
+        model.load_model(bytearray(booster.save_raw('ubj')))
+        return model
+
+    def _fit_keras(self, source, epochs, batch_size):
+        """Keras network fed from a generator of mini-batches"""
+        from multibagger_prediction import _build_model
+
+        def batches():
+            while True:
+                for X, y in self.feature_chunks(source):
+                    for start in range(0, len(X), batch_size):
+                        yield X[start:start + batch_size], y[start:start + batch_size]
+
+        steps = sum(math.ceil(rows / batch_size) for rows in self.chunk_rows)
+        model = _build_model('Neural Network', len(FEATURE_COLS), os.cpu_count() or 1)
+        model.fit(batches(), steps_per_epoch=steps, epochs=epochs, verbose=0)
+        return model
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Out-of-core multibagger training")
+    parser.add_argument('paths', nargs='+', help='CSV/Parquet files, directories or glob patterns')
+    parser.add_argument('--learner', choices=LEARNERS, default='sgd')
+    parser.add_argument('--chunksize', type=int, default=250000)
+    parser.add_argument('--epochs', type=int, default=5)
+    parser.add_argument('--output', default='best_multibagger_model')
+    args = parser.parse_args()
+    configure_from_env()
+
+    source = fundamentals_source(args.paths, chunksize=args.chunksize)
+    trainer = StreamingTrainer()
+    predictor = trainer.fit(source, learner=args.learner, epochs=args.epochs)
+    predictor.save_model(args.output)
+
+
+if __name__ == '__main__':
+    main()
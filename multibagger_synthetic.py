@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Scalable synthetic fundamentals for load and stress testing
+
+SyntheticUniverse draws the same columns as `load_data`'s generator, but
+in independent, deterministic chunks:
+    - chunk i uses its own np.random.Generator seeded from
+      SeedSequence(seed, spawn_key=(i,)), so any chunk can be regenerated
+      alone and the output does not depend on the number of workers
+    - the columns are coupled through a Gaussian copula with a
+      configurable correlation structure; each column keeps its normal or
+      lognormal marginal exactly
+    - the label is Price_3yr_Return >= 2, then overridden by the same
+      ROE / Revenue_Growth rules as load_data
+
+Chunks are written in parallel straight to Parquet part files or to a
+memory-mapped FeatureStore, so no process ever holds more than one chunk:
+
+    python multibagger_synthetic.py universe/ --rows 100000000 --format parquet --n-jobs 8
+    python multibagger_synthetic.py universe_store/ --rows 50000000 --format memmap
+"""
+
+import argparse
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from multibagger_prediction import BASE_FEATURE_COLS
+
+# Marginal distribution of each generated column: (kind, mean, sigma)
+MARGINALS = {
+    'PE_Ratio': ('normal', 15, 8),
+    'EPS': ('normal', 5, 3),
+    'ROE': ('normal', 15, 10),
+    'ROA': ('normal', 8, 5),
+    'Market_Cap': ('lognormal', 10, 2),
+    'Revenue_Growth': ('normal', 12, 15),
+    'Profit_Margin': ('normal', 8, 6),
+    'Debt_Equity': ('normal', 0.5, 0.4),
+    'Volatility': ('normal', 0.3, 0.2),
+    'SectorGrowth': ('normal', 10, 8),
+    'Price_3yr_Return': ('lognormal', 0.5, 0.8)
+}
+COLUMNS = BASE_FEATURE_COLS + ['Price_3yr_Return']
+
+# Pairwise correlations of the underlying normals (unlisted pairs are independent)
+DEFAULT_CORRELATIONS = {
+    ('ROE', 'ROA'): 0.7,
+    ('ROE', 'Profit_Margin'): 0.5,
+    ('ROA', 'Profit_Margin'): 0.5,
+    ('Revenue_Growth', 'SectorGrowth'): 0.4,
+    ('Debt_Equity', 'Volatility'): 0.3,
+    ('Revenue_Growth', 'Price_3yr_Return'): 0.2,
+    ('ROE', 'Price_3yr_Return'): 0.2
+}
+
+# Label overrides applied in order: (column, threshold, P(multibagger) above it)
+DEFAULT_LABEL_RULES = [('ROE', 20, 0.7), ('Revenue_Growth', 25, 0.6)]
+
+
+def correlation_matrix(correlations, columns=COLUMNS):
+    """Full correlation matrix from {(col_a, col_b): rho} pairs"""
+    matrix = np.eye(len(columns))
+    for (a, b), rho in correlations.items():
+        i, j = columns.index(a), columns.index(b)
+        matrix[i, j] = matrix[j, i] = rho
+    return matrix
+
+
+class SyntheticUniverse:
+    """Deterministic, chunked generator of synthetic stock fundamentals"""
+
+    def __init__(self, n_rows, chunk_size=1000000, seed=42, correlations=None, label_rules=None):
+        self.n_rows = n_rows
+        self.chunk_size = chunk_size
+        self.seed = seed
+        self.correlations = DEFAULT_CORRELATIONS if correlations is None else correlations
+        self.label_rules = DEFAULT_LABEL_RULES if label_rules is None else label_rules
+
+        matrix = (correlation_matrix(self.correlations) if isinstance(self.correlations, dict)
+                  else np.asarray(self.correlations, dtype=np.float64))
+        try:
+            self._cholesky = np.linalg.cholesky(matrix)
+        except np.linalg.LinAlgError:
+            raise ValueError("Correlation structure is not positive definite")
+        self._mean = np.array([MARGINALS[col][1] for col in COLUMNS], dtype=np.float64)
+        self._sigma = np.array([MARGINALS[col][2] for col in COLUMNS], dtype=np.float64)
+        self._lognormal = np.array([MARGINALS[col][0] == 'lognormal' for col in COLUMNS])
+
+    @property
+    def n_chunks(self):
+        return -(-self.n_rows // self.chunk_size)
+
+    def chunk_bounds(self, i):
+        start = i * self.chunk_size
+        return start, min(start + self.chunk_size, self.n_rows)
+
+    def generate_chunk(self, i):
+        """Chunk `i` as (float32 values in COLUMNS order, int8 labels)"""
+        start, stop = self.chunk_bounds(i)
+        rng = np.random.default_rng(np.random.SeedSequence(self.seed, spawn_key=(i,)))
+        z = rng.standard_normal((stop - start, len(COLUMNS))) @ self._cholesky.T
+        values = self._mean + self._sigma * z
+        values[:, self._lognormal] = np.exp(values[:, self._lognormal])
+
+        labels = (values[:, COLUMNS.index('Price_3yr_Return')] >= 2.0).astype(np.int8)
+        for col, threshold, probability in self.label_rules:
+            above = values[:, COLUMNS.index(col)] > threshold
+            labels[above] = rng.random(np.count_nonzero(above)) < probability
+        return values.astype(np.float32), labels
+
+    def chunk_frame(self, i):
+        """Chunk `i` as a DataFrame with the load_data columns (float32 / int8)"""
+        values, labels = self.generate_chunk(i)
+        start, stop = self.chunk_bounds(i)
+        df = pd.DataFrame(values, columns=COLUMNS, index=pd.RangeIndex(start, stop))
+        df['multibagger'] = labels
+        return df
+
+    def iter_chunks(self):
+        """Yield every chunk in order as a DataFrame"""
+        for i in range(self.n_chunks):
+            yield self.chunk_frame(i)
+
+    def _write_parquet_chunk(self, path, i, compression):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        table = pa.Table.from_pandas(self.chunk_frame(i), preserve_index=False)
+        pq.write_table(table, os.path.join(path, f"part-{i:06d}.parquet"), compression=compression)
+
+    def to_parquet(self, path, n_jobs=-1, compression='snappy'):
+        """Write one Parquet part file per chunk into directory `path`
+
+        The directory can be read back with multibagger_data.fundamentals_source.
+        """
+        from joblib import Parallel, delayed
+        os.makedirs(path, exist_ok=True)
+        Parallel(n_jobs=n_jobs)(delayed(self._write_parquet_chunk)(path, i, compression)
+                                for i in range(self.n_chunks))
+        return path
+
+    def _write_memmap_chunk(self, path, i):
+        from multibagger_store import FEATURES_FILE, LABELS_FILE
+        start, stop = self.chunk_bounds(i)
+        values, labels = self.generate_chunk(i)
+        X = np.memmap(os.path.join(path, FEATURES_FILE), dtype=np.float32, mode='r+',
+                      shape=(self.n_rows, len(COLUMNS)))
+        X[start:stop] = values
+        X.flush()
+        y = np.load(os.path.join(path, LABELS_FILE), mmap_mode='r+')
+        y[start:stop] = labels
+        y.flush()
+
+    def to_memmap(self, path, n_jobs=-1):
+        """Write all rows into a FeatureStore at `path`, chunks filled in parallel
+
+        The store's feature columns are the raw fundamentals plus
+        Price_3yr_Return (not the scored FEATURE_COLS).
+        """
+        from joblib import Parallel, delayed
+        from multibagger_store import FeatureStore, HEADER_FILE, FEATURES_FILE, LABELS_FILE
+        os.makedirs(path, exist_ok=True)
+        with open(os.path.join(path, FEATURES_FILE), 'wb') as f:
+            f.truncate(self.n_rows * len(COLUMNS) * np.dtype(np.float32).itemsize)
+        np.lib.format.open_memmap(os.path.join(path, LABELS_FILE), mode='w+', dtype=np.int8,
+                                  shape=(self.n_rows,)).flush()
+
+        Parallel(n_jobs=n_jobs)(delayed(self._write_memmap_chunk)(path, i)
+                                for i in range(self.n_chunks))
+
+        with open(os.path.join(path, HEADER_FILE), 'w') as f:
+            json.dump({'n_rows': self.n_rows, 'feature_names': COLUMNS, 'scaled': False,
+                       'synthetic': {'seed': self.seed, 'chunk_size': self.chunk_size}}, f, indent=2)
+        return FeatureStore.open(path)
+
+
+def store_source(path, chunksize=250000):
+    """Callable re-reading a FeatureStore as DataFrame chunks (like fundamentals_source)"""
+    from multibagger_store import FeatureStore
+
+    def chunks():
+        store = FeatureStore.open(path)
+        for start in range(0, len(store), chunksize):
+            df = pd.DataFrame(np.asarray(store.X[start:start + chunksize]),
+                              columns=store.feature_names,
+                              index=pd.RangeIndex(start, min(start + chunksize, len(store))))
+            df['multibagger'] = np.asarray(store.y[start:start + chunksize])
+            yield df
+
+    return chunks
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic fundamentals universe")
+    parser.add_argument('output', help='output directory')
+    parser.add_argument('--rows', type=int, default=10000000)
+    parser.add_argument('--chunk-size', type=int, default=1000000)
+    parser.add_argument('--format', choices=('parquet', 'memmap'), default='parquet')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--n-jobs', type=int, default=-1)
+    parser.add_argument('--independent', action='store_true',
+                        help='draw columns independently (no correlation structure)')
+    args = parser.parse_args()
+
+    universe = SyntheticUniverse(args.rows, chunk_size=args.chunk_size, seed=args.seed,
+                                 correlations={} if args.independent else None)
+    if args.format == 'parquet':
+        universe.to_parquet(args.output, n_jobs=args.n_jobs)
+    else:
+        universe.to_memmap(args.output, n_jobs=args.n_jobs)
+    print(f"Wrote {args.rows} rows in {universe.n_chunks} chunks to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Hyperparameter search for the multibagger candidate models
+
+Successive halving: every candidate in a model's search space is scored
+with a small budget (trees, epochs or training rows), the best
+1/`factor` are promoted to a `factor`× larger budget, and so on until one
+candidate or the full budget remains. Candidates are scored on
+TimeSeriesSplit folds in parallel worker processes, and every
+(data, model, params, budget, fold) score is cached as a JSON file, so an
+interrupted or repeated search resumes instead of recomputing.
+
+    tuner = HyperparameterTuner(n_jobs=8)
+    best_params = tuner.tune(X_train_scaled, y_train)
+    predictor.train_models(X_train_scaled, y_train, X_val_scaled, y_val, model_params=best_params)
+"""
+
+import hashlib
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from multibagger_prediction import MODEL_NAMES, _fit_model
+
+# Candidate hyperparameters per model (grids are expanded with ParameterGrid)
+SEARCH_SPACES = {
+    'Logistic Regression': {'C': [0.01, 0.1, 1.0, 10.0], 'class_weight': [None, 'balanced']},
+    'Decision Tree': {'max_depth': [4, 6, 10, 14], 'min_samples_leaf': [1, 5, 20]},
+    'Random Forest': {'max_depth': [None, 8, 14], 'min_samples_leaf': [1, 5],
+                      'max_features': ['sqrt', 0.5]},
+    'XGBoost': {'max_depth': [3, 5, 7], 'learning_rate': [0.03, 0.1, 0.3],
+                'subsample': [0.8, 1.0]},
+    'Neural Network': {'units': [(32, 16), (64, 32), (128, 64)], 'dropout': [0.1, 0.3],
+                       'learning_rate': [0.001, 0.003]}
+}
+
+# Budget that successive halving grows, as (parameter, min, max);
+# 'n_samples' means the most recent training rows of each fold
+RESOURCES = {
+    'Logistic Regression': ('n_samples', 250, None),
+    'Decision Tree': ('n_samples', 250, None),
+    'Random Forest': ('n_estimators', 25, 400),
+    'XGBoost': ('n_estimators', 25, 400),
+    'Neural Network': ('epochs', 10, 90)
+}
+
+
+def _data_hash(X, y):
+    """Content hash of the training data, part of every cache key"""
+    digest = hashlib.sha256()
+    digest.update(np.ascontiguousarray(X, dtype=np.float64).tobytes())
+    digest.update(np.ascontiguousarray(y, dtype=np.int64).tobytes())
+    return digest.hexdigest()[:16]
+
+
+def _score(y_true, probability, scoring):
+    """Score one fold's predictions (higher is better)"""
+    from sklearn.metrics import roc_auc_score, f1_score, log_loss
+    if scoring == 'roc_auc':
+        return roc_auc_score(y_true, probability) if len(np.unique(y_true)) > 1 else 0.5
+    if scoring == 'f1':
+        return f1_score(y_true, (probability > 0.5).astype(int), zero_division=0)
+    if scoring == 'neg_log_loss':
+        return -log_loss(y_true, probability, labels=[0, 1])
+    raise ValueError(f"Unknown scoring: {scoring}")
+
+
+def _evaluate(name, params, resource, X, y, fold, scoring, n_threads=1):
+    """Fit one candidate with one budget on one fold and score it"""
+    train_idx, test_idx = fold
+    resource_param = RESOURCES[name][0]
+    params = dict(params)
+    if resource_param == 'n_samples':
+        train_idx = train_idx[-resource:]
+    else:
+        params[resource_param] = resource
+
+    X_train, y_train = X[train_idx], y[train_idx]
+    X_test, y_test = X[test_idx], y[test_idx]
+    model, seconds = _fit_model(name, X_train, y_train, X_test, y_test,
+                                n_threads=n_threads, params=params)
+    if hasattr(model, 'predict_proba'):
+        probability = model.predict_proba(X_test)[:, 1]
+    else:
+        probability = np.asarray(model.predict(X_test, verbose=0)).reshape(-1)
+    return {'score': float(_score(y_test, probability, scoring)), 'seconds': seconds}
+
+
+class HyperparameterTuner:
+    """Parallel successive-halving search with an on-disk result cache"""
+
+    def __init__(self, search_spaces=None, n_splits=3, factor=3, scoring='roc_auc',
+                 max_candidates=None, n_jobs=-1, threads_per_job=1,
+                 cache_dir='.tuning_cache', random_state=42):
+        self.search_spaces = search_spaces or SEARCH_SPACES
+        self.n_splits = n_splits
+        self.factor = factor
+        self.scoring = scoring
+        self.max_candidates = max_candidates
+        self.n_jobs = n_jobs
+        self.threads_per_job = threads_per_job
+        self.cache_dir = cache_dir
+        self.random_state = random_state
+        self.history = []
+
+    def _candidates(self, name):
+        """Parameter dicts to search for `name` (randomly subsampled if capped)"""
+        from sklearn.model_selection import ParameterGrid, ParameterSampler
+        space = self.search_spaces[name]
+        grid = ParameterGrid(space)
+        if self.max_candidates is not None and len(grid) > self.max_candidates:
+            return list(ParameterSampler(space, self.max_candidates, random_state=self.random_state))
+        return list(grid)
+
+    def _cache_path(self, data_hash, name, params, resource, fold_index):
+        key = json.dumps({'data': data_hash, 'model': name, 'params': params,
+                          'resource': resource, 'fold': fold_index, 'n_splits': self.n_splits,
+                          'scoring': self.scoring}, sort_keys=True, default=str)
+        digest = hashlib.sha256(key.encode()).hexdigest()[:24]
+        return os.path.join(self.cache_dir, name.replace(' ', '_'), f"{digest}.json")
+
+    @staticmethod
+    def _read_cache(path):
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    @staticmethod
+    def _write_cache(path, result):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp-{os.getpid()}"
+        with open(tmp_path, 'w') as f:
+            json.dump(result, f)
+        os.replace(tmp_path, path)
+
+    def _run_rung(self, name, candidates, resource, X, y, folds, data_hash):
+        """Mean fold score of every candidate at one budget, using the cache"""
+        from joblib import Parallel, delayed
+        jobs, scores = [], {}
+        for c, params in enumerate(candidates):
+            for f in range(len(folds)):
+                path = self._cache_path(data_hash, name, params, resource, f)
+                cached = self._read_cache(path)
+                if cached is None:
+                    jobs.append((c, f, path))
+                else:
+                    scores[c, f] = cached['score']
+
+        if jobs:
+            results = Parallel(n_jobs=self.n_jobs, backend='loky')(
+                delayed(_evaluate)(name, candidates[c], resource, X, y, folds[f],
+                                   self.scoring, self.threads_per_job)
+                for c, f, _ in jobs)
+            for (c, f, path), result in zip(jobs, results):
+                self._write_cache(path, result)
+                scores[c, f] = result['score']
+
+        print(f"  {name}: {len(candidates)} candidates at {RESOURCES[name][0]}={resource} "
+              f"({len(jobs)} fits, {len(candidates) * len(folds) - len(jobs)} cached)")
+        return [float(np.mean([scores[c, f] for f in range(len(folds))]))
+                for c in range(len(candidates))]
+
+    def tune_model(self, name, X, y, folds=None, data_hash=None):
+        """Successive halving for one model; returns (best params, best score)"""
+        from sklearn.model_selection import TimeSeriesSplit
+        X, y = np.asarray(X), np.asarray(y)
+        if folds is None:
+            folds = list(TimeSeriesSplit(n_splits=self.n_splits).split(X))
+        data_hash = data_hash or _data_hash(X, y)
+
+        resource_param, resource, max_resource = RESOURCES[name]
+        if max_resource is None:
+            max_resource = min(len(train_idx) for train_idx, _ in folds)
+        resource = min(resource, max_resource)
+
+        candidates = self._candidates(name)
+        while True:
+            scores = self._run_rung(name, candidates, resource, X, y, folds, data_hash)
+            for params, score in zip(candidates, scores):
+                self.history.append({'Model': name, 'Params': params, resource_param: resource,
+                                     'Score': score})
+            if len(candidates) == 1 or resource >= max_resource:
+                break
+            n_keep = max(1, len(candidates) // self.factor)
+            order = np.argsort(scores)[::-1][:n_keep]
+            candidates = [candidates[i] for i in order]
+            resource = min(resource * self.factor, max_resource)
+
+        best = int(np.argmax(scores))
+        best_params = dict(candidates[best])
+        if resource_param != 'n_samples':
+            best_params[resource_param] = resource
+        return best_params, scores[best]
+
+    def tune(self, X, y, models=MODEL_NAMES):
+        """Tune every model in `models`; returns {model name: best params}"""
+        from sklearn.model_selection import TimeSeriesSplit
+        X, y = np.asarray(X), np.asarray(y)
+        folds = list(TimeSeriesSplit(n_splits=self.n_splits).split(X))
+        data_hash = _data_hash(X, y)
+
+        best_params = {}
+        for name in models:
+            start = time.perf_counter()
+            params, score = self.tune_model(name, X, y, folds, data_hash)
+            best_params[name] = params
+            print(f"Best {name}: {params} ({self.scoring}={score:.4f}, "
+                  f"{time.perf_counter() - start:.1f}s)")
+        return best_params
+
+    def history_frame(self):
+        """Every evaluated (model, params, budget) with its mean score"""
+        return pd.DataFrame(self.history)
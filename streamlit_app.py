@@ -1,8 +1,10 @@
 import streamlit as st
-import pandas as pd
-import numpy as np
-import pickle
-from multibagger_prediction import MultibaggerPredictor
+import os
+from multibagger_bulk import BulkScoringJob
+from multibagger_inference import load_predictor
+from multibagger_metrics import configure_from_env
+from multibagger_prediction import BASE_FEATURE_COLS, EV_THRESHOLD, L_THRESHOLD
+from multibagger_service import PredictorService
 
 st.set_page_config(
     page_title="Multibagger Stock Predictor",
@@ -10,15 +12,94 @@ st.set_page_config(
     layout="wide"
 )
 
+MODEL_PATH = 'best_multibagger_model'
+LEGACY_MODEL_PATH = 'best_multibagger_model.pkl'
+# Rows shown while a bulk job is still scoring (all rows once it finishes)
+LIVE_TABLE_ROWS = 1000
+
 @st.cache_resource
 def load_trained_model():
-    """Load the trained model"""
-    try:
-        with open('best_multibagger_model.pkl', 'rb') as f:
-            model_data = pickle.load(f)
-        return model_data
-    except FileNotFoundError:
+    """Load the trained model (artifact bundle, falling back to the legacy pickle)"""
+    configure_from_env()  # once per server process, like the model
+    for path in (MODEL_PATH, LEGACY_MODEL_PATH):
+        if os.path.exists(path):
+            predictor = load_predictor(path)
+            predictor.enable_prediction_cache(maxsize=10000, ttl=24 * 3600)
+            return predictor
+    return None
+
+@st.cache_resource
+def get_prediction_service():
+    """Process-wide micro-batching service shared by all sessions"""
+    predictor = load_trained_model()
+    if predictor is None:
         return None
+    return PredictorService(predictor, max_batch_size=256, max_wait_ms=5).start()
+
+def bulk_results(job, ev_threshold, l_threshold, polling):
+    """Progress, summary and table of a bulk scoring job
+    
+    Runs as a fragment re-executed every second while the job scores, so
+    only this panel refreshes and the rest of the page stays interactive.
+    """
+    if job.error is not None:
+        st.error(f"Scoring failed: {job.error}")
+        return
+    if polling and job.done:
+        st.rerun()  # full rerun stops the polling
+    
+    status = "Cancelled" if job.cancelled else "Finished" if job.done else "Scoring"
+    st.progress(job.progress, text=f"{status}: {job.rows_done:,} / {job.total_rows:,} rows")
+    if job.running and st.button("⏹️ Cancel"):
+        job.cancel()
+    
+    if job.invalid_rows:
+        st.warning(f"{job.invalid_rows:,} rows have missing or non-numeric fundamentals and were not scored")
+    summary = job.summary(ev_threshold, l_threshold, high_probability=0.7)
+    
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Scored Stocks", f"{summary['scored']:,}")
+    col2.metric("Pass EV × L Filter", f"{summary['candidates']:,}")
+    col3.metric("High Potential (≥ 70%)", f"{summary['high_potential']:,}")
+    
+    # Only the finished job sorts every row; while scoring it keeps a running top-k
+    results = job.results() if job.done else job.top()
+    if st.checkbox("Show only EV × L candidates"):
+        results = results[(results['EV_Score'] >= ev_threshold) & (results['L_Score'] >= l_threshold)]
+    if not job.done:
+        st.caption(f"Showing the top {LIVE_TABLE_ROWS:,} rows scored so far")
+    # Click a column header to sort
+    st.dataframe(results, use_container_width=True, hide_index=True)
+    
+    if job.done:
+        st.download_button("💾 Download Scored File (CSV)", job.to_csv(),
+                           file_name=f"{job.name.rsplit('.', 1)[0]}_scored.csv", mime='text/csv')
+
+def bulk_screening(predictor, ev_threshold, l_threshold):
+    """Upload a CSV/Parquet file of fundamentals and score it in the background"""
+    st.header("📂 Bulk Screening")
+    st.markdown(f"""
+    Upload a CSV or Parquet file with one stock per row and the columns
+    `{'`, `'.join(BASE_FEATURE_COLS)}` (Market_Cap in currency units, not billions).
+    Other columns such as tickers are kept in the results.
+    """)
+    
+    uploaded = st.file_uploader("Fundamentals file", type=['csv', 'parquet', 'pq'])
+    job = st.session_state.get('bulk_job')
+    if uploaded is not None and st.button("📥 Score File"):
+        if job is not None:
+            job.cancel()
+        try:
+            job = BulkScoringJob(predictor, uploaded.getvalue(), uploaded.name,
+                                 top_rows=LIVE_TABLE_ROWS).start()
+        except Exception as e:
+            st.error(f"Invalid file: {e}")
+            job = None
+        st.session_state['bulk_job'] = job
+    
+    if job is not None:
+        st.fragment(bulk_results, run_every=1.0 if job.running else None)(
+            job, ev_threshold, l_threshold, polling=job.running)
 
 def main():
     st.title("📈 Multibagger Stock Predictor")
@@ -33,16 +114,26 @@ def main():
     - **ML Models**: Advanced algorithms trained on filtered data
     """)
     
+    # Screening thresholds
+    st.sidebar.header("EV × L Thresholds")
+    ev_threshold = st.sidebar.slider("Minimum EV Score", 0.0, 1.0, EV_THRESHOLD, 0.05)
+    l_threshold = st.sidebar.slider("Minimum L Score", 0.0, 1.0, L_THRESHOLD, 0.05)
+    
     # Load model
-    model_data = load_trained_model()
+    predictor = load_trained_model()
     
-    if model_data is None:
+    if predictor is None:
         st.error("❌ No trained model found. Please run the training pipeline first.")
         st.code("python multibagger_prediction.py")
         return
     
     st.success("✅ Model loaded successfully!")
     
+    if predictor.prediction_cache is not None:
+        cache_stats = predictor.prediction_cache.stats()
+        st.sidebar.caption(f"Prediction cache: {cache_stats['hits']} hits / "
+                           f"{cache_stats['misses']} misses ({cache_stats['size']} entries)")
+    
     # Input form
     st.header("📊 Enter Stock Fundamentals")
     
@@ -84,14 +175,10 @@ def main():
             'SectorGrowth': sector_growth
         }
         
-        # Create predictor instance and set loaded model
-        predictor = MultibaggerPredictor()
-        predictor.best_model = model_data['model']
-        predictor.scaler = model_data['scaler']
-        
         try:
-            # Make prediction
-            probability = predictor.predict_new_stock(input_data)
+            # Make prediction (EV and L scores come from the same pass)
+            scores = get_prediction_service().predict(input_data, timeout=30)
+            probability = scores['probability']
             
             # Display results
             st.header("🎯 Prediction Results")
@@ -113,12 +200,9 @@ def main():
                 risk_level = "Low" if volatility < 0.3 else "Medium" if volatility < 0.6 else "High"
                 st.info(f"Risk Level: {risk_level}")
             
-            # Compute and display EV and L scores
-            input_df = pd.DataFrame([input_data])
-            input_df = predictor.compute_ev_l_scores(input_df)
-            
-            ev_score = input_df['EV_Score'].iloc[0]
-            l_score = input_df['L_Score'].iloc[0]
+            # Display EV and L scores
+            ev_score = scores['EV_Score']
+            l_score = scores['L_Score']
             
             st.subheader("📊 EV × L Framework Scores")
             
@@ -126,22 +210,36 @@ def main():
             
             with col1:
                 st.metric("EV Score (Earnings Visibility)", f"{ev_score:.3f}")
-                if ev_score >= 0.6:
+                if ev_score >= ev_threshold:
                     st.success("✅ Passes EV filter")
                 else:
-                    st.warning("⚠️ Below EV threshold (0.6)")
+                    st.warning(f"⚠️ Below EV threshold ({ev_threshold:.2f})")
             
             with col2:
                 st.metric("L Score (Longevity)", f"{l_score:.3f}")
-                if l_score >= 0.5:
+                if l_score >= l_threshold:
                     st.success("✅ Passes L filter")
                 else:
-                    st.warning("⚠️ Below L threshold (0.5)")
+                    st.warning(f"⚠️ Below L threshold ({l_threshold:.2f})")
+            
+            # Feature attributions (explainer built once per model, cached per input)
+            st.subheader("🧠 Why This Prediction?")
+            try:
+                explanation = predictor.explain_new_stock(input_data)
+            except (ImportError, ValueError) as e:
+                st.info(f"Explanations unavailable: {e}")
+            else:
+                from multibagger_explain import top_contributions
+                top = top_contributions(explanation, n=6)
+                st.bar_chart(top.rename('Contribution'))
+                drivers = ", ".join(f"{name} ({value:+.3f})" for name, value in top.items())
+                st.caption(f"Largest SHAP contributions in {explanation['output']} units "
+                           f"(baseline {explanation['base_value']:.3f}): {drivers}")
             
             # Investment recommendation
             st.subheader("💡 Investment Recommendation")
             
-            if probability >= 0.7 and ev_score >= 0.6 and l_score >= 0.5:
+            if probability >= 0.7 and ev_score >= ev_threshold and l_score >= l_threshold:
                 st.success("""
                 🎯 **STRONG BUY**: This stock shows excellent multibagger potential with:
                 - High ML prediction probability
@@ -166,11 +264,13 @@ def main():
         except Exception as e:
             st.error(f"Error making prediction: {str(e)}")
     
+    bulk_screening(predictor, ev_threshold, l_threshold)
+    
     # Additional information
     st.header("📚 How It Works")
     
     with st.expander("EV × L Framework Explained"):
-        st.markdown("""
+        st.markdown(f"""
         **Earnings Visibility (EV) Score:**
         - Revenue Growth (40%): Higher growth indicates better earnings potential
         - Low Volatility (30%): Stable stocks are more predictable
@@ -182,7 +282,7 @@ def main():
         - Low Debt/Equity (30%): Lower debt reduces financial risk
         
         **ML Prediction:**
-        - Trained on stocks filtered by EV ≥ 0.6 and L ≥ 0.5
+        - Trained on stocks filtered by EV ≥ {EV_THRESHOLD} and L ≥ {L_THRESHOLD}
         - Uses ensemble of models: Random Forest, XGBoost, Neural Networks
         - Predicts probability of 2x+ returns in 3 years
         """)
@@ -0,0 +1,74 @@
+import importlib.util
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from multibagger_prediction import MODEL_NAMES, MultibaggerPredictor, _fit_model  # noqa: E402
+
+# Small but representative settings so the whole suite trains in seconds
+TEST_MODEL_PARAMS = {
+    'Random Forest': {'n_estimators': 20},
+    'XGBoost': {'n_estimators': 30},
+    'Neural Network': {'units': (16, 8), 'epochs': 3}
+}
+
+HAS_TENSORFLOW = importlib.util.find_spec('tensorflow') is not None
+
+
+def available_models():
+    """Candidate model names whose backend is installed"""
+    return [name for name in MODEL_NAMES if name != 'Neural Network' or HAS_TENSORFLOW]
+
+
+def model_params():
+    """Every candidate model name as a pytest param, skipped when its backend is missing"""
+    return [pytest.param(name, marks=pytest.mark.skipif(name not in available_models(),
+                                                        reason='TensorFlow is not installed'))
+            for name in MODEL_NAMES]
+
+
+@pytest.fixture(scope='session')
+def dataset():
+    """Synthetic fundamentals with frozen EV/L bounds, split and scaled like train_models expects"""
+    from sklearn.preprocessing import StandardScaler
+
+    predictor = MultibaggerPredictor()
+    df = predictor.preprocess_data(predictor.load_data(n_samples=3000, seed=7))
+    df = predictor.compute_ev_l_scores(df, fit=True)
+    X, y = predictor.prepare_features(df)
+    X, y = X.to_numpy(dtype=np.float64), y.to_numpy()
+    n_train = int(len(X) * 0.7)
+    scaler = StandardScaler().fit(X[:n_train])
+    return {
+        'df': df,
+        'X_train': X[:n_train], 'y_train': y[:n_train],
+        'X_test': X[n_train:], 'y_test': y[n_train:],
+        'scaler': scaler,
+        'ev_l_bounds': predictor.ev_l_bounds
+    }
+
+
+@pytest.fixture(scope='session')
+def fitted_models(dataset):
+    """{name: fitted model} for every available candidate, trained on scaled features"""
+    X_train = dataset['scaler'].transform(dataset['X_train'])
+    X_test = dataset['scaler'].transform(dataset['X_test'])
+    return {name: _fit_model(name, X_train, dataset['y_train'], X_test, dataset['y_test'],
+                             params=TEST_MODEL_PARAMS.get(name))[0]
+            for name in available_models()}
+
+
+@pytest.fixture
+def trained_predictor(dataset, fitted_models):
+    """Predictor whose best model is the Random Forest, not yet saved"""
+    predictor = MultibaggerPredictor()
+    predictor.scaler = dataset['scaler']
+    predictor.ev_l_bounds = dataset['ev_l_bounds']
+    predictor.models = dict(fitted_models)
+    predictor.best_model_name = 'Random Forest'
+    predictor.best_model = fitted_models['Random Forest']
+    return predictor
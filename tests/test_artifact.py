@@ -0,0 +1,104 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+from conftest import model_params
+from multibagger_artifact import MANIFEST_FILE, load_artifact, read_manifest, save_artifact
+from multibagger_prediction import BASE_FEATURE_COLS, FEATURE_COLS, MultibaggerPredictor, _positive_proba
+
+
+def _round_trip(path, model, dataset, **kwargs):
+    manifest = save_artifact(str(path), model, dataset['scaler'], FEATURE_COLS,
+                             ev_l_bounds=dataset['ev_l_bounds'], **kwargs)
+    return manifest, load_artifact(str(path))
+
+
+@pytest.mark.parametrize('name', model_params())
+def test_model_round_trip(name, dataset, fitted_models, tmp_path):
+    model = fitted_models[name]
+    background = dataset['X_train'][:20]
+    manifest, loaded = _round_trip(tmp_path / 'model', model, dataset, model_name=name,
+                                   background=background)
+
+    assert loaded['manifest'] == manifest == read_manifest(str(tmp_path / 'model'))
+    assert manifest['model_name'] == name and loaded['feature_names'] == FEATURE_COLS
+    assert loaded['ev_l_bounds'] == dataset['ev_l_bounds']
+    assert np.array_equal(loaded['background'], background)
+
+    scaler = dataset['scaler']
+    for attr in ('mean_', 'scale_', 'var_'):
+        assert np.array_equal(getattr(loaded['scaler'], attr), getattr(scaler, attr))
+    assert loaded['scaler'].n_samples_seen_ == scaler.n_samples_seen_
+
+    X = dataset['X_test']
+    assert np.allclose(_positive_proba(loaded['model'], loaded['scaler'].transform(X)),
+                       _positive_proba(model, scaler.transform(X)))
+
+
+def test_compiled_models_round_trip(trained_predictor, dataset, tmp_path):
+    runtime = trained_predictor.export_runtime(dataset['X_test'])
+    _, loaded = _round_trip(tmp_path / 'runtime', runtime, dataset)
+    assert loaded['manifest']['backend'] == 'numpy'
+    assert np.allclose(loaded['model'].predict_proba(dataset['X_test']),
+                       runtime.predict_proba(dataset['X_test']))
+
+    X_val = dataset['scaler'].transform(dataset['X_test'])
+    ensemble = trained_predictor.build_ensemble(X_val, dataset['y_test'])
+    _, loaded = _round_trip(tmp_path / 'ensemble', ensemble, dataset)
+    assert loaded['manifest']['backend'] == 'ensemble'
+    assert np.allclose(loaded['model'].predict_proba(X_val), ensemble.predict_proba(X_val))
+
+
+def test_version_is_a_content_hash(fitted_models, dataset, tmp_path):
+    first, _ = _round_trip(tmp_path / 'a', fitted_models['Logistic Regression'], dataset)
+    again, _ = _round_trip(tmp_path / 'b', fitted_models['Logistic Regression'], dataset)
+    other, _ = _round_trip(tmp_path / 'c', fitted_models['Decision Tree'], dataset)
+    assert first['model_version'] == again['model_version'] != other['model_version']
+
+
+def test_version_covers_scoring_manifest_fields(fitted_models, dataset, tmp_path):
+    model, scaler = fitted_models['Logistic Regression'], dataset['scaler']
+    bounds = dataset['ev_l_bounds']
+    base = save_artifact(str(tmp_path / 'a'), model, scaler, FEATURE_COLS, ev_l_bounds=bounds)
+    # Re-saving the same model with new bounds must not reuse cached predictions
+    shifted = {col: [low, high * 2] for col, (low, high) in bounds.items()}
+    changed = [
+        save_artifact(str(tmp_path / 'b'), model, scaler, FEATURE_COLS, ev_l_bounds=shifted),
+        save_artifact(str(tmp_path / 'c'), model, scaler, FEATURE_COLS[::-1], ev_l_bounds=bounds),
+        save_artifact(str(tmp_path / 'd'), model, scaler, FEATURE_COLS, ev_l_bounds=bounds,
+                      model_name='Logistic Regression')
+    ]
+    versions = {manifest['model_version'] for manifest in changed}
+    assert len(versions) == 3 and base['model_version'] not in versions
+    # Lineage and timestamps do not change what the bundle predicts
+    again = save_artifact(str(tmp_path / 'e'), model, scaler, FEATURE_COLS, ev_l_bounds=bounds,
+                          parent_version='abc')
+    assert again['model_version'] == base['model_version']
+
+
+def test_newer_format_is_rejected(fitted_models, dataset, tmp_path):
+    _round_trip(tmp_path / 'model', fitted_models['Logistic Regression'], dataset)
+    manifest_path = os.path.join(tmp_path / 'model', MANIFEST_FILE)
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    manifest['format_version'] += 1
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f)
+    with pytest.raises(ValueError, match='newer'):
+        read_manifest(str(tmp_path / 'model'))
+
+
+@pytest.mark.parametrize('filename', ['model', 'model.pkl'])
+def test_predictor_save_load_round_trip(filename, trained_predictor, dataset, tmp_path):
+    path = str(tmp_path / filename)
+    trained_predictor.save_model(path)
+    loaded = MultibaggerPredictor.load_model(path)
+
+    stocks = dataset['df'][BASE_FEATURE_COLS].head(50)
+    assert np.allclose(loaded.predict_batch(stocks).to_numpy(),
+                       trained_predictor.predict_batch(stocks).to_numpy())
+    if not filename.endswith('.pkl'):
+        assert loaded.model_version == trained_predictor.model_version is not None
+        assert loaded.best_model_name == 'Random Forest'
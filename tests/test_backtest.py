@@ -0,0 +1,89 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from multibagger_backtest import LABEL_HORIZON, WalkForwardBacktest, _prepare_fold, add_synthetic_dates
+from multibagger_prediction import BASE_FEATURE_COLS, EV_THRESHOLD, L_THRESHOLD, MultibaggerPredictor
+
+
+@pytest.fixture(scope='module')
+def dated():
+    return add_synthetic_dates(MultibaggerPredictor().load_data(n_samples=2000, seed=3), years=5)
+
+
+def test_store_key_depends_on_data_and_date_column(dated, tmp_path):
+    backtest = WalkForwardBacktest(cache_dir=str(tmp_path))
+    undated = backtest.store_key(dated)
+    assert undated == backtest.store_key(dated.copy())
+    assert undated != backtest.store_key(dated, 'Date')
+    assert undated != backtest.store_key(dated.head(1000))
+
+    store = backtest.build_store(dated, 'Date')
+    assert os.path.basename(store.path) == backtest.store_key(dated, 'Date')
+    assert np.all(np.diff(np.asarray(store.dates)) >= 0)
+    assert backtest.build_store(dated, 'Date').path == store.path
+    # Outcome columns never reach the folds
+    assert store.feature_names == BASE_FEATURE_COLS
+
+
+def test_undated_then_dated_runs_share_a_cache(dated, tmp_path):
+    backtest = WalkForwardBacktest('Logistic Regression', rebalance_freq='QS', min_train_rows=300,
+                                   n_jobs=1, cache_dir=str(tmp_path))
+    undated = backtest.run(dated, n_splits=3)
+    assert undated['Fold'].tolist() == ['split 1', 'split 2', 'split 3']
+
+    # Previously reused the undated store, which has no dates
+    dated_results = backtest.run(dated, date_col='Date')
+    assert len(dated_results) > 0 and dated_results['Fold'].str.match(r'\d{4}-\d{2}-\d{2}').all()
+    assert len(os.listdir(tmp_path)) == 2
+
+
+@pytest.mark.parametrize('train_periods', [None, 6])
+def test_folds_embargo_the_label_horizon(train_periods, dated, tmp_path):
+    backtest = WalkForwardBacktest(rebalance_freq='QS', train_periods=train_periods, min_train_rows=100,
+                                   cache_dir=str(tmp_path))
+    store = backtest.build_store(dated, 'Date')
+    dates = pd.DatetimeIndex(np.asarray(store.dates))
+    for folds in (backtest.walk_forward_folds(store), backtest.time_series_folds(store, n_splits=4)):
+        assert folds
+        for fold in folds:
+            train_start, train_stop, test_start, _ = fold['rows']
+            assert train_stop - train_start >= 100
+            cutoff = dates[test_start] - LABEL_HORIZON
+            assert dates[train_stop - 1] < cutoff
+            if train_periods is None:
+                assert train_start == 0
+            else:
+                # A rolling window of periods, not of rows
+                assert dates[train_start] >= cutoff - pd.DateOffset(months=3 * train_periods)
+                assert train_start == 0 or dates[train_start - 1] < cutoff - pd.DateOffset(months=3 * train_periods)
+
+
+def test_time_series_folds_respect_min_train_rows(dated, tmp_path):
+    backtest = WalkForwardBacktest(min_train_rows=900, cache_dir=str(tmp_path))
+    store = backtest.build_store(dated)
+    folds = backtest.time_series_folds(store, n_splits=4)
+    assert [fold['rows'][1] for fold in folds] == [1200, 1600]
+    with pytest.raises(ValueError, match='dated'):
+        WalkForwardBacktest(train_periods=4, cache_dir=str(tmp_path)).time_series_folds(store)
+
+
+def test_test_rows_never_shape_their_own_window(dated):
+    frame = dated[BASE_FEATURE_COLS + ['multibagger']]
+    train, test = frame.iloc[:1400].reset_index(drop=True), frame.iloc[1400:].reset_index(drop=True)
+    shifted = test.copy()
+    # An extreme (but clearly screened-in) test row, and a row with a missing value
+    shifted.loc[0, ['ROE', 'Revenue_Growth', 'SectorGrowth', 'Profit_Margin']] = 1e6
+    shifted.loc[0, ['Volatility', 'Debt_Equity']] = 0.0
+    shifted.loc[1, 'EPS'] = np.nan
+
+    (X_a, y_a), (T_a, t_a) = _prepare_fold(train, test, EV_THRESHOLD, L_THRESHOLD)
+    (X_b, y_b), (T_b, t_b) = _prepare_fold(train, shifted, EV_THRESHOLD, L_THRESHOLD)
+    assert np.array_equal(X_a, X_b) and np.array_equal(y_a, y_b)
+
+    # Test rows are never dropped as outliers, and each row is scored on its own
+    assert T_b[0, BASE_FEATURE_COLS.index('ROE')] == 1e6
+    assert np.array_equal(T_a[-10:], T_b[-10:])
+    assert not np.isnan(T_b).any()
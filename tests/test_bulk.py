@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+from multibagger_bulk import BulkScoringJob, missing_columns
+from multibagger_prediction import BASE_FEATURE_COLS
+
+
+def _upload(dataset, n=500):
+    frame = dataset['df'][BASE_FEATURE_COLS].head(n).copy()
+    frame.insert(0, 'Ticker', [f"T{i}" for i in range(len(frame))])
+    frame.loc[frame.index[3], 'ROE'] = np.nan
+    frame['EPS'] = frame['EPS'].astype(object)
+    frame.loc[frame.index[7], 'EPS'] = 'n/a'
+    return frame
+
+
+def test_running_top_and_summary_match_full_results(trained_predictor, dataset):
+    frame = _upload(dataset)
+    job = BulkScoringJob(trained_predictor, frame.to_csv(index=False).encode(), 'universe.csv',
+                         chunk_size=64, top_rows=50).start()
+    job._thread.join()
+    assert job.done and job.error is None
+    assert job.rows_done == job.total_rows == len(frame)
+    assert job.invalid_rows == 2
+
+    results = job.results()
+    assert results is job.results()  # built once when done
+    assert results['Ticker'].tolist()[:50] == job.top()['Ticker'].tolist()
+    assert results['probability'].dropna().is_monotonic_decreasing
+
+    summary = job.summary(0.6, 0.5)
+    assert summary == {
+        'scored': int(results['probability'].notna().sum()),
+        'candidates': int(((results['EV_Score'] >= 0.6) & (results['L_Score'] >= 0.5)).sum()),
+        'high_potential': int((results['probability'] >= 0.7).sum())
+    }
+    assert job.summary(0.6, 0.5) == summary
+
+    # File order is kept in the CSV download
+    scored = job.to_csv().decode().splitlines()
+    assert scored[1].startswith('T0,') and len(scored) == len(frame) + 1
+
+
+def test_missing_columns_are_rejected(trained_predictor, dataset):
+    frame = _upload(dataset).drop(columns=['ROA'])
+    assert missing_columns(frame.columns) == ['ROA']
+    with pytest.raises(ValueError, match='ROA'):
+        BulkScoringJob(trained_predictor, frame.to_csv(index=False).encode(), 'universe.csv')
@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+
+from multibagger_cache import PredictionCache
+from multibagger_prediction import BASE_FEATURE_COLS
+
+
+@pytest.fixture
+def stocks(dataset):
+    return dataset['df'][BASE_FEATURE_COLS].head(40)
+
+
+def test_save_model_invalidates_cached_predictions(trained_predictor, fitted_models, stocks, tmp_path):
+    predictor = trained_predictor
+    cache = predictor.enable_prediction_cache(maxsize=1000)
+
+    # Unsaved models are never cached
+    predictor.predict_batch(stocks)
+    assert len(cache) == 0
+
+    predictor.save_model(str(tmp_path / 'rf'))
+    first = predictor.predict_batch(stocks)
+    assert cache.stats()['misses'] == len(stocks) and len(cache) == len(stocks)
+    assert np.array_equal(predictor.predict_batch(stocks).to_numpy(), first.to_numpy())
+    assert cache.stats()['hits'] == len(stocks)
+
+    # A new artifact drops the old version's entries instead of serving them
+    predictor.best_model_name = 'Logistic Regression'
+    predictor.best_model = fitted_models['Logistic Regression']
+    predictor.save_model(str(tmp_path / 'lr'))
+    assert cache.model_version == predictor.model_version and len(cache) == 0
+    fresh = predictor.predict_batch(stocks)
+    assert np.allclose(fresh.to_numpy(), predictor.predict_batch(stocks, use_cache=False).to_numpy())
+    assert not np.allclose(fresh['probability'], first['probability'])
+
+
+def test_batches_larger_than_the_cache_bypass_it(trained_predictor, stocks, tmp_path):
+    trained_predictor.save_model(str(tmp_path / 'rf'))
+    cache = trained_predictor.enable_prediction_cache(maxsize=10)
+    trained_predictor.predict_batch(stocks)
+    assert len(cache) == 0 and cache.stats()['misses'] == 0
+    trained_predictor.predict_batch(stocks.head(10))
+    assert len(cache) == 10
+
+
+def test_keys_are_canonical():
+    cache = PredictionCache(decimals=6)
+    X = np.array([[1.0, -0.0, np.nan], [1.0000001, 0.0, -np.nan], [1.00001, 0.0, np.nan]])
+    keys = cache.make_keys('v1', X)
+    assert keys[0] == keys[1] != keys[2]
+    assert cache.make_key('v1', [1.0, 0.0, float('nan')]) == keys[0]
+    assert cache.make_key('v2', X[0]) != keys[0]
+    stock = dict(zip(BASE_FEATURE_COLS, np.arange(10.0)))
+    assert cache.make_key('v1', stock) == cache.make_keys('v1', np.arange(10.0).reshape(1, -1))[0]
+
+
+def test_lru_ttl_and_persistence(tmp_path, monkeypatch):
+    import time
+    cache = PredictionCache(maxsize=2, ttl=60, path=str(tmp_path / 'cache'))
+    cache.bind('v1')
+    keys = cache.make_keys('v1', np.arange(6.0).reshape(3, 2))
+    cache.put_many(keys[:2], np.array([[0.1, 0.2], [0.3, 0.4]]))
+    assert np.array_equal(cache.get(keys[0]), [0.1, 0.2])  # keys[0] is now most recent
+    cache.put(keys[2], [0.5, 0.6])
+    values, hit = cache.get_many(keys, 2)
+    assert hit.tolist() == [True, False, True]
+    assert np.isnan(values[1]).all() and np.array_equal(values[2], [0.5, 0.6])
+
+    cache.save()
+    reloaded = PredictionCache(maxsize=2, path=str(tmp_path / 'cache'))
+    assert len(reloaded) == 2 and np.array_equal(reloaded.get(keys[2]), [0.5, 0.6])
+
+    now = time.time()
+    monkeypatch.setattr(time, 'time', lambda: now + 61)
+    assert cache.get(keys[0]) is None and len(cache) == 1
@@ -0,0 +1,81 @@
+import tracemalloc
+
+import numpy as np
+import pytest
+
+from multibagger_ensemble import ENSEMBLE_METHODS, StackedEnsemble, _clip, build_ensemble
+from multibagger_prediction import _positive_proba
+
+
+def _log_loss(y, p):
+    p = _clip(p)
+    return float(-np.mean(y * np.log(p) + (1 - y) * np.log(1 - p)))
+
+
+@pytest.fixture(scope='module')
+def validation(dataset):
+    return dataset['scaler'].transform(dataset['X_test']), dataset['y_test']
+
+
+@pytest.mark.parametrize('method', ENSEMBLE_METHODS)
+def test_ensemble_is_calibrated_on_validation(method, fitted_models, validation):
+    X_val, y_val = validation
+    ensemble = build_ensemble(fitted_models, X_val, y_val, method=method)
+    assert ensemble.member_names == list(fitted_models)
+    assert ensemble.meta['parity_max_diff'] <= 1e-5
+
+    proba = ensemble.predict_proba(X_val)
+    assert proba.shape == (len(X_val), 2)
+    assert np.allclose(proba.sum(axis=1), 1.0)
+    # Both meta models fit an intercept, so the mean probability matches the base rate
+    assert abs(proba[:, 1].mean() - y_val.mean()) < 0.01
+    if method == 'stack':
+        best_member = min(_log_loss(y_val, _positive_proba(model, X_val)) for model in fitted_models.values())
+        assert _log_loss(y_val, proba[:, 1]) <= best_member + 1e-3
+
+
+def test_member_logits_match_members(fitted_models, validation):
+    X_val, y_val = validation
+    ensemble = build_ensemble(fitted_models, X_val, y_val)
+    expected = np.column_stack([_clip(_positive_proba(model, X_val)) for model in fitted_models.values()])
+    logits = ensemble.member_logits(X_val)
+    assert np.allclose(1.0 / (1.0 + np.exp(-logits)), expected, atol=1e-5)
+
+
+def test_ensemble_at_batch_chunk_size(fitted_models, validation):
+    # predict_batch hands the model 100000-row chunks
+    X_val, y_val = validation
+    trees = {name: fitted_models[name] for name in ('Decision Tree', 'Random Forest', 'XGBoost')}
+    ensemble = build_ensemble(trees, X_val, y_val)
+    rng = np.random.default_rng(0)
+    X = X_val[rng.integers(0, len(X_val), 100000)] + rng.normal(0.0, 0.05, (100000, X_val.shape[1]))
+
+    tracemalloc.start()
+    try:
+        logits = ensemble.member_logits(X)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    expected = np.column_stack([_clip(_positive_proba(model, X)) for model in trees.values()])
+    assert np.allclose(1.0 / (1.0 + np.exp(-logits)), expected, atol=1e-5)
+    # A few row-length arrays per member, not one walker per (row, tree) pair
+    assert peak < 64 * 2**20
+
+
+@pytest.mark.parametrize('method', ENSEMBLE_METHODS)
+def test_ensemble_save_load_round_trip(method, fitted_models, validation, tmp_path):
+    X_val, y_val = validation
+    ensemble = build_ensemble(fitted_models, X_val, y_val, method=method)
+    path = str(tmp_path / 'ensemble.npz')
+    ensemble.save(path)
+    loaded = StackedEnsemble.load(path)
+    assert loaded.meta == ensemble.meta
+    assert np.array_equal(loaded.predict_proba(X_val), ensemble.predict_proba(X_val))
+
+
+def test_invalid_ensembles_are_rejected(fitted_models, validation):
+    X_val, y_val = validation
+    with pytest.raises(ValueError, match='Unknown ensemble method'):
+        build_ensemble(fitted_models, X_val, y_val, method='median')
+    with pytest.raises(ValueError, match='at least one member'):
+        build_ensemble({}, X_val, y_val)
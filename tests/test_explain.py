@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+
+pytest.importorskip('shap')
+
+from multibagger_explain import ModelExplainer  # noqa: E402
+
+
+def _predictor(trained_predictor, dataset, name):
+    trained_predictor.best_model_name = name
+    trained_predictor.best_model = trained_predictor.models[name]
+    trained_predictor.set_background(dataset['X_train'], size=50)
+    return trained_predictor
+
+
+@pytest.mark.parametrize('name, method', [('Logistic Regression', 'linear'),
+                                          ('Decision Tree', 'tree')])
+def test_parallel_chunks_match_serial(name, method, trained_predictor, dataset, monkeypatch):
+    predictor = _predictor(trained_predictor, dataset, name)
+    explainer = ModelExplainer(predictor)
+    assert explainer.method == method
+
+    # Linear and tree chunks never start worker processes
+    import joblib
+    parallel = joblib.Parallel
+
+    def no_processes(*args, **kwargs):
+        assert kwargs.get('prefer') != 'processes'
+        return parallel(*args, **kwargs)
+
+    monkeypatch.setattr(joblib, 'Parallel', no_processes)
+    X = predictor._model_input(dataset['X_test'][:60])
+    serial = explainer.shap_values(X, chunk_size=20)
+    assert serial.shape == (60, X.shape[1])
+    assert np.allclose(explainer.shap_values(X, chunk_size=20, n_jobs=2), serial)
+
+
+def test_explainers_are_a_bounded_lru(trained_predictor, dataset, monkeypatch):
+    import multibagger_explain
+    monkeypatch.setattr(multibagger_explain, '_explainers', multibagger_explain.OrderedDict())
+    predictor = _predictor(trained_predictor, dataset, 'Decision Tree')
+
+    built = {}
+    for i in range(multibagger_explain.MAX_EXPLAINERS + 2):
+        predictor.model_version = f"v{i}"
+        built[i] = multibagger_explain.get_explainer(predictor)
+        predictor.model_version = 'v0'
+        # Reusing v0 keeps it the most recently used
+        assert multibagger_explain.get_explainer(predictor) is built[0]
+    assert len(multibagger_explain._explainers) == multibagger_explain.MAX_EXPLAINERS
+    assert 'v0' in multibagger_explain._explainers and 'v1' not in multibagger_explain._explainers
+
+
+def test_unsaved_models_are_checked_by_weak_reference(trained_predictor, dataset, monkeypatch):
+    import copy
+    import weakref
+
+    import multibagger_explain
+    monkeypatch.setattr(multibagger_explain, '_explainers', multibagger_explain.OrderedDict())
+    predictor = _predictor(trained_predictor, dataset, 'Decision Tree')
+    assert predictor.model_version is None
+    first = multibagger_explain.get_explainer(predictor)
+    assert multibagger_explain.get_explainer(predictor) is first
+
+    # A new model that reuses the old id() must not get the old explainer
+    stale_model = predictor.best_model
+    predictor.best_model = copy.deepcopy(stale_model)
+    key = ('unsaved', id(predictor.best_model))
+    multibagger_explain._explainers[key] = (weakref.ref(stale_model), first)
+    fresh = multibagger_explain.get_explainer(predictor)
+    assert fresh is not first
+    assert multibagger_explain._explainers[key][0]() is predictor.best_model
@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from multibagger_prediction import BASE_FEATURE_COLS, FEATURE_COLS, MultibaggerPredictor
+
+
+def test_prepare_features_uses_feature_cols(dataset):
+    X, y = MultibaggerPredictor().prepare_features(dataset['df'])
+    assert list(X.columns) == FEATURE_COLS
+    assert len(y) == len(X)
+
+
+def test_predict_batch_matches_predict_new_stock(trained_predictor, dataset):
+    stocks = dataset['df'][BASE_FEATURE_COLS].head(25)
+    batch = trained_predictor.predict_batch(stocks, chunk_size=7)
+    assert list(batch.columns) == ['EV_Score', 'L_Score', 'probability']
+    assert batch.index.equals(stocks.index)
+
+    single = [trained_predictor.predict_new_stock(row) for row in stocks.to_dict('records')]
+    assert np.allclose(batch['probability'], single)
+
+    # Arrays in BASE_FEATURE_COLS order score the same, and rows do not depend on their batch
+    from_array = trained_predictor.predict_batch(stocks.to_numpy())
+    assert np.allclose(from_array.to_numpy(), batch.to_numpy())
+    assert np.allclose(trained_predictor.predict_batch(stocks.tail(5)).to_numpy(),
+                       batch.tail(5).to_numpy())
+
+
+def test_predict_batch_requires_a_model():
+    with pytest.raises(ValueError, match='No trained model'):
+        MultibaggerPredictor().predict_batch(pd.DataFrame(columns=BASE_FEATURE_COLS))
+
+
+def test_ev_l_bounds_are_only_fitted_on_request(dataset):
+    predictor = MultibaggerPredictor()
+    df = dataset['df'][BASE_FEATURE_COLS].copy()
+    with pytest.raises(ValueError, match='fit=True'):
+        predictor.compute_ev_l_scores(df)
+    assert predictor.ev_l_bounds is None
+
+    train = predictor.compute_ev_l_scores(df.head(1000).copy(), fit=True)
+    bounds = predictor.ev_l_bounds
+    # Later calls reuse the frozen training bounds
+    scored = predictor.compute_ev_l_scores(df.tail(500).copy())
+    assert predictor.ev_l_bounds is bounds
+    ev, l = predictor._ev_l_arrays(df.tail(500), bounds)
+    assert np.array_equal(scored['EV_Score'], ev) and np.array_equal(scored['L_Score'], l)
+    assert np.array_equal(train['EV_Score'], predictor._ev_l_arrays(df.head(1000), bounds)[0])
+
+
+def test_legacy_models_without_bounds_score_consistently(trained_predictor, dataset):
+    trained_predictor.ev_l_bounds = None
+    base = dataset['df'][BASE_FEATURE_COLS].head(40).to_numpy(dtype=np.float64)
+    # predict_batch and the explainer input share the normalize-over-input fallback
+    ev_score, l_score, _ = trained_predictor._score_array(base, chunk_size=100)
+    features = trained_predictor._raw_features(base)
+    assert np.array_equal(features[:, -2], ev_score) and np.array_equal(features[:, -1], l_score)
+    assert trained_predictor.ev_l_bounds is None
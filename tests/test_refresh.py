@@ -0,0 +1,49 @@
+import copy
+
+import numpy as np
+import pytest
+
+from multibagger_prediction import _positive_proba
+from multibagger_refresh import check_refreshable, rescale_model, standard_scaler
+
+
+@pytest.fixture
+def scalers(dataset):
+    """The training scaler and a copy updated with a shifted, wider slice of data"""
+    old = standard_scaler(copy.deepcopy(dataset['scaler']))
+    new_rows = dataset['X_test'] * 1.5 + dataset['X_train'].std(axis=0)
+    return old, copy.deepcopy(old).partial_fit(new_rows)
+
+
+def _models(fitted_models, dataset):
+    from sklearn.linear_model import SGDClassifier
+    models = {name: fitted_models[name] for name in
+              ('Logistic Regression', 'Decision Tree', 'Random Forest', 'XGBoost')}
+    X_train = dataset['scaler'].transform(dataset['X_train'])
+    models['SGD'] = SGDClassifier(loss='log_loss', random_state=0).fit(X_train, dataset['y_train'])
+    return models
+
+
+@pytest.mark.parametrize('name', ['Logistic Regression', 'SGD', 'Decision Tree', 'Random Forest',
+                                  'XGBoost'])
+def test_rescale_only_keeps_predictions(name, dataset, fitted_models, scalers):
+    old, new = scalers
+    model = copy.deepcopy(_models(fitted_models, dataset)[name])
+    X = np.concatenate([dataset['X_train'], dataset['X_test']])
+    before = _positive_proba(model, old.transform(X))
+    after = _positive_proba(rescale_model(model, old, new), new.transform(X))
+
+    if name != 'XGBoost':
+        assert np.allclose(after, before, rtol=0, atol=1e-9)
+    else:
+        # float32 cuts: only rows within rounding of a split may change side
+        changed = np.abs(after - before) > 1e-6
+        assert changed.mean() < 0.005
+        assert np.abs(after - before).mean() < 1e-3
+
+
+def test_non_incremental_models_are_rejected(fitted_models):
+    for name in ('Logistic Regression', 'Decision Tree'):
+        with pytest.raises(ValueError, match='incrementally'):
+            check_refreshable(fitted_models[name])
+    check_refreshable(fitted_models['Random Forest'])
@@ -0,0 +1,59 @@
+import tracemalloc
+
+import numpy as np
+import pytest
+
+from conftest import model_params
+from multibagger_prediction import _positive_proba
+from multibagger_runtime import NumpyModel, check_parity, export_model
+
+
+@pytest.mark.parametrize('name', model_params())
+def test_export_matches_source_model(name, dataset, fitted_models, tmp_path):
+    model, scaler = fitted_models[name], dataset['scaler']
+    X_test = dataset['X_test']
+    runtime = export_model(model, scaler)
+
+    expected = _positive_proba(model, scaler.transform(X_test))
+    proba = runtime.predict_proba(X_test)
+    assert proba.shape == (len(X_test), 2)
+    assert np.allclose(proba[:, 1], expected, atol=1e-5)
+    assert np.allclose(proba.sum(axis=1), 1.0)
+
+    # Saved runtimes predict the same
+    path = str(tmp_path / 'runtime.npz')
+    runtime.save(path)
+    assert np.allclose(NumpyModel.load(path).predict_proba(X_test), proba)
+
+
+@pytest.mark.parametrize('name', ['Random Forest', 'XGBoost'])
+def test_tree_runtime_at_batch_chunk_size(name, dataset, fitted_models):
+    # predict_batch hands the runtime 100000-row chunks
+    model, scaler = fitted_models[name], dataset['scaler']
+    rng = np.random.default_rng(0)
+    X_test = np.asarray(dataset['X_test'])
+    X = X_test[rng.integers(0, len(X_test), 100000)] * rng.normal(1.0, 0.05, (100000, X_test.shape[1]))
+    runtime = export_model(model, scaler)
+
+    tracemalloc.start()
+    try:
+        proba = runtime.predict_proba(X)[:, 1]
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    assert np.allclose(proba, _positive_proba(model, scaler.transform(X)), atol=1e-5)
+    # A few row-length arrays, not one walker per (row, tree) pair
+    assert peak < 64 * 2**20
+
+
+def test_check_parity_reports_a_mismatch(dataset, fitted_models):
+    scaler = dataset['scaler']
+    runtime = export_model(fitted_models['Logistic Regression'], scaler)
+    assert check_parity(fitted_models['Logistic Regression'], scaler, runtime, dataset['X_test']) <= 1e-5
+    with pytest.raises(ValueError, match='differs'):
+        check_parity(fitted_models['Random Forest'], scaler, runtime, dataset['X_test'])
+
+
+def test_unsupported_model_is_rejected(dataset):
+    with pytest.raises(ValueError, match='Cannot export'):
+        export_model(object(), dataset['scaler'])
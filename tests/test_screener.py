@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from multibagger_screener import UniverseScreener
+
+
+def _universe(rng, n):
+    ev, l, prob = rng.random(n), rng.random(n), rng.random(n)
+    # Some rows without scores or probability, and some exactly on bucket edges
+    ev[rng.random(n) < 0.03] = np.nan
+    l[rng.random(n) < 0.03] = np.nan
+    prob[rng.random(n) < 0.05] = np.nan
+    edges = rng.random(n) < 0.05
+    ev[edges] = rng.integers(0, 9, edges.sum()) / 8
+    return pd.DataFrame({'EV_Score': ev, 'L_Score': l, 'probability': prob},
+                        index=[f"T{i}" for i in range(n)])
+
+
+def _thresholds(rng):
+    yield 0.6, 0.5
+    yield -0.5, -0.5
+    yield 1.5, 0.2
+    yield 0.25, 0.75  # on bucket edges of an 8-bucket grid
+    for _ in range(6):
+        yield tuple(rng.random(2))
+
+
+def _check(screener, truth, rng):
+    for ev_threshold, l_threshold in _thresholds(rng):
+        mask = (truth['EV_Score'] >= ev_threshold) & (truth['L_Score'] >= l_threshold)
+        expected = truth[mask]
+        assert screener.count(ev_threshold, l_threshold) == len(expected)
+        assert sorted(screener.select(ev_threshold, l_threshold)) == sorted(expected.index)
+        screened = screener.screen(ev_threshold, l_threshold)
+        pd.testing.assert_frame_equal(screened.sort_index(), expected.sort_index(), check_like=True,
+                                      check_index_type=False)
+
+        best = expected.sort_values('probability', ascending=False, kind='stable', na_position='last')
+        for k in (0, 1, 5, len(expected), len(expected) + 3):
+            top = screener.top_k(k, ev_threshold, l_threshold)
+            assert len(top) == min(max(k, 0), len(expected))
+            assert np.array_equal(top['probability'].to_numpy(), best['probability'].to_numpy()[:len(top)],
+                                  equal_nan=True)
+            # Labels are matches carrying their own scores
+            pd.testing.assert_frame_equal(top, expected.loc[top.index, top.columns],
+                                          check_index_type=False)
+
+
+@pytest.mark.parametrize('seed', range(4))
+def test_queries_match_a_boolean_mask_under_updates(seed):
+    rng = np.random.default_rng(seed)
+    truth = _universe(rng, 400)
+    screener = UniverseScreener.from_frame(truth, n_buckets=8, max_overlay=25)
+    _check(screener, truth, rng)
+
+    for _ in range(4):
+        # Rescore existing tickers (tombstones), add new ones (overlay) and update some twice
+        keys = list(rng.choice(truth.index, 15)) + [f"N{seed}_{rng.integers(50)}" for _ in range(8)]
+        for key in keys:
+            scores = _universe(rng, 1).iloc[0]
+            screener.update(key, scores['EV_Score'], scores['L_Score'], scores['probability'])
+            truth.loc[key] = scores
+        _check(screener, truth, rng)
+
+
+def test_empty_index_with_overlay_only():
+    screener = UniverseScreener([], [], n_buckets=8)
+    assert screener.top_k(5).empty
+    screener.update('NEW', 0.9, 0.9, 0.7)
+    screener.update('LOW', 0.1, 0.9, 0.8)
+    top = screener.top_k(5, 0.6, 0.5)
+    assert list(top.index) == ['NEW']
+    assert screener.top_k(0, 0.6, 0.5).empty
+    assert screener.count(0.6, 0.5) == 1
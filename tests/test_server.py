@@ -0,0 +1,133 @@
+import asyncio
+import json
+import os
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from multibagger_prediction import BASE_FEATURE_COLS, MultibaggerPredictor
+from multibagger_server import BadRequest, InferenceServer, _parse_stocks, _validate_stock
+
+STOCK = {'PE_Ratio': 12.5, 'EPS': 8.2, 'ROE': 22.0, 'ROA': 12.5, 'Market_Cap': 5e9,
+         'Revenue_Growth': 18.5, 'Profit_Margin': 15.2, 'Debt_Equity': 0.3,
+         'Volatility': 0.25, 'SectorGrowth': 12.0}
+
+
+async def _request(port, method, path, body=None):
+    """(status, JSON payload) of one HTTP/1.1 request"""
+    data = body if isinstance(body, bytes) else json.dumps(body).encode() if body is not None else b''
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n"
+                 f"Content-Length: {len(data)}\r\n\r\n".encode() + data)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, payload = response.partition(b'\r\n\r\n')
+    return int(head.split()[1]), json.loads(payload)
+
+
+@pytest.fixture(scope='module')
+def saved_model(tmp_path_factory, dataset, fitted_models):
+    predictor = MultibaggerPredictor()
+    predictor.scaler = dataset['scaler']
+    predictor.ev_l_bounds = dataset['ev_l_bounds']
+    predictor.best_model_name = 'Logistic Regression'
+    predictor.best_model = fitted_models['Logistic Regression']
+    path = str(tmp_path_factory.mktemp('server') / 'model')
+    predictor.save_model(path)
+    return path, predictor
+
+
+def test_server_routes(saved_model):
+    path, predictor = saved_model
+
+    async def scenario():
+        server = InferenceServer(path, port=0, workers=1)
+        await server.start()
+        try:
+            port = server.port
+            status, ready = await _request(port, 'GET', '/ready')
+            assert status == 200 and ready['ready']
+            assert ready['model_version'] == predictor.model_version
+
+            status, single = await _request(port, 'POST', '/predict', STOCK)
+            assert status == 200
+            assert single['probability'] == pytest.approx(predictor.predict_new_stock(STOCK))
+
+            stocks = [STOCK, dict(STOCK, ROE=5.0)]
+            status, batch = await _request(port, 'POST', '/predict/batch', {'stocks': stocks})
+            assert status == 200 and len(batch['predictions']) == 2
+            assert batch['predictions'][0]['probability'] == pytest.approx(single['probability'])
+
+            for bad in (dict(STOCK, ROE=float('nan')), dict(STOCK, EPS=float('inf')),
+                        dict(STOCK, PE_Ratio='high'), {'PE_Ratio': 1.0}):
+                status, error = await _request(port, 'POST', '/predict', bad)
+                assert status == 400, bad
+            status, error = await _request(port, 'POST', '/predict', b'{"EPS": NaN')
+            assert status == 400 and 'Invalid JSON' in error['error']
+            status, error = await _request(port, 'POST', '/predict/batch',
+                                           [STOCK, dict(STOCK, Volatility=float('-inf'))])
+            assert status == 400 and 'Volatility' in error['error']
+        finally:
+            await server.stop()
+
+    asyncio.run(scenario())
+
+
+def test_every_worker_is_primed_before_serving(saved_model):
+    path, predictor = saved_model
+
+    async def scenario():
+        server = InferenceServer(path, port=0, workers=2, max_batch_rows=5000)
+        await server.start()
+        try:
+            # Both workers loaded the model while start() ran
+            assert len(server._pool._processes) == 2
+            loop = asyncio.get_running_loop()
+            pids = await asyncio.gather(*[loop.run_in_executor(server._pool, os.getpid) for _ in range(8)])
+            assert set(pids) <= set(server._pool._processes)
+
+            # Large batches are decoded and validated in the workers
+            stocks = [dict(STOCK, ROE=float(i)) for i in range(3000)]
+            (status, batch), (health, _) = await asyncio.gather(
+                _request(server.port, 'POST', '/predict/batch', stocks),
+                _request(server.port, 'GET', '/health'))
+            assert status == 200 == health and len(batch['predictions']) == 3000
+            status, error = await _request(server.port, 'POST', '/predict/batch', stocks + stocks)
+            assert status == 400 and 'At most 5000' in error['error']
+        finally:
+            await server.stop()
+
+    asyncio.run(scenario())
+
+
+def test_start_fails_when_a_worker_cannot_load(tmp_path):
+    async def scenario():
+        server = InferenceServer(str(tmp_path / 'missing'), port=0, workers=2)
+        try:
+            with pytest.raises(BrokenProcessPool):
+                await server.start()
+        finally:
+            await server.stop()
+
+    asyncio.run(scenario())
+
+
+def test_validate_stock_rejects_non_finite_values():
+    assert _validate_stock(STOCK) == {col: float(STOCK[col]) for col in BASE_FEATURE_COLS}
+    with pytest.raises(BadRequest, match='finite'):
+        _validate_stock(dict(STOCK, ROE=float('inf')))
+
+
+def test_parse_stocks_accepts_both_batch_shapes():
+    body = json.dumps({'stocks': [STOCK, STOCK]}).encode()
+    assert _parse_stocks('/predict/batch', body, 10) == _parse_stocks('/predict/batch', json.dumps([STOCK] * 2), 10)
+    with pytest.raises(BadRequest, match='At most 1'):
+        _parse_stocks('/predict/batch', body, 1)
+    with pytest.raises(BadRequest, match='Expected'):
+        _parse_stocks('/predict/batch', b'{"rows": []}', 10)
+
+
+def test_not_ready_before_start():
+    status, payload = asyncio.run(InferenceServer('missing_model')._dispatch('GET', '/ready', b''))
+    assert status == 503 and payload == {'ready': False}
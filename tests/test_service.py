@@ -0,0 +1,112 @@
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from multibagger_prediction import BASE_FEATURE_COLS
+from multibagger_service import PredictorService
+
+
+class RecordingPredictor:
+    """Scores each row by its first fundamental and records the batch sizes"""
+
+    def __init__(self, gate=None):
+        self.batch_sizes = []
+        self.entered = threading.Event()
+        self.gate = gate
+
+    def predict_batch(self, rows):
+        self.entered.set()
+        if self.gate is not None:
+            self.gate.wait(5)
+        self.batch_sizes.append(len(rows))
+        return pd.DataFrame({'EV_Score': rows[:, 0], 'L_Score': rows[:, 1], 'probability': rows[:, 0]})
+
+
+def _stock(value):
+    return {col: float(value) for col in BASE_FEATURE_COLS}
+
+
+@pytest.fixture
+def service():
+    services = []
+
+    def make(predictor, **kwargs):
+        services.append(PredictorService(predictor, **kwargs).start())
+        return services[-1]
+    yield make
+    for running in services:
+        running.stop(timeout=5)
+
+
+def test_results_match_predict_batch(service, trained_predictor, dataset):
+    stocks = dataset['df'][BASE_FEATURE_COLS].iloc[:50]
+    running = service(trained_predictor, max_wait_ms=50)
+    futures = [running.submit(stock) for _, stock in stocks.iterrows()]
+    results = pd.DataFrame([future.result(10) for future in futures])
+    expected = trained_predictor.predict_batch(stocks.to_numpy())
+    assert np.allclose(results[expected.columns].to_numpy(), expected.to_numpy())
+
+
+def test_requests_are_merged_into_micro_batches(service):
+    predictor = RecordingPredictor()
+    running = service(predictor, max_batch_size=8, max_wait_ms=200)
+    futures = [running.submit(_stock(i)) for i in range(20)]
+    assert [future.result(5)['probability'] for future in futures] == list(range(20))
+    assert sum(predictor.batch_sizes) == 20
+    assert max(predictor.batch_sizes) <= 8 and len(predictor.batch_sizes) < 20
+    assert running.stats()['requests'] == 20
+
+
+def test_cancelled_requests_are_skipped(service):
+    gate = threading.Event()
+    predictor = RecordingPredictor(gate)
+    running = service(predictor, max_wait_ms=1)
+    first = running.submit(_stock(1))
+    assert predictor.entered.wait(5)
+
+    # Queued behind the running batch, then cancelled by its caller
+    cancelled, kept = running.submit(_stock(2)), running.submit(_stock(3))
+    assert cancelled.cancel()
+    gate.set()
+    assert first.result(5)['probability'] == 1.0
+    assert kept.result(5)['probability'] == 3.0
+    assert cancelled.cancelled()
+    # The worker survives and keeps serving
+    assert running.predict(_stock(4), timeout=5)['probability'] == 4.0
+    assert sum(predictor.batch_sizes) == 3
+
+
+def test_bad_input_fails_only_its_own_request(service):
+    predictor = RecordingPredictor()
+    running = service(predictor, max_wait_ms=50)
+    missing = {col: 1.0 for col in BASE_FEATURE_COLS[1:]}
+    bad = [running.submit(missing), running.submit({**_stock(1), BASE_FEATURE_COLS[0]: 'abc'}),
+           running.submit({**_stock(1), BASE_FEATURE_COLS[1]: float('nan')}),
+           running.submit({**_stock(1), BASE_FEATURE_COLS[2]: float('inf')})]
+    good = [running.submit(_stock(i)) for i in range(5)]
+
+    with pytest.raises(KeyError, match='Missing fundamental'):
+        bad[0].result(5)
+    with pytest.raises(ValueError, match='must be numbers'):
+        bad[1].result(5)
+    for future, col in zip(bad[2:], BASE_FEATURE_COLS[1:3]):
+        with pytest.raises(ValueError, match=f'finite numbers: {col}'):
+            future.result(5)
+    assert [future.result(5)['probability'] for future in good] == list(range(5))
+    assert sum(predictor.batch_sizes) == 5
+
+
+def test_failed_batch_does_not_stop_the_worker(service):
+    class FailingOnce(RecordingPredictor):
+        def predict_batch(self, rows):
+            if not self.batch_sizes:
+                self.batch_sizes.append(0)
+                raise RuntimeError('model unavailable')
+            return super().predict_batch(rows)
+
+    running = service(FailingOnce(), max_wait_ms=1)
+    with pytest.raises(RuntimeError, match='model unavailable'):
+        running.predict(_stock(1), timeout=5)
+    assert running.predict(_stock(2), timeout=5)['probability'] == 2.0
@@ -0,0 +1,69 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.preprocessing import StandardScaler
+
+from multibagger_prediction import FEATURE_COLS
+from multibagger_store import FEATURES_FILE, FeatureStore
+
+
+@pytest.fixture
+def frame(dataset):
+    df = dataset['df'].iloc[:500].copy()
+    df['date'] = pd.date_range('2015-01-01', periods=len(df), freq='D')
+    return df
+
+
+def test_round_trip_is_row_major(frame, tmp_path):
+    path = str(tmp_path / 'store')
+    store = FeatureStore.from_frame(path, frame, chunksize=128, date_col='date')
+    expected = frame[FEATURE_COLS].to_numpy(dtype=np.float32)
+
+    assert len(store) == len(frame) and store.feature_names == FEATURE_COLS
+    assert np.array_equal(store.X, expected)
+    assert np.array_equal(store.y, frame['multibagger'].to_numpy())
+    assert np.array_equal(store.dates, frame['date'].to_numpy())
+    # Each row's features are contiguous on disk
+    on_disk = np.fromfile(os.path.join(path, FEATURES_FILE), dtype=np.float32)
+    assert np.array_equal(on_disk[:len(FEATURE_COLS)], expected[0])
+    assert store.X.flags['C_CONTIGUOUS']
+
+
+def test_split_views_share_the_memmap(frame, tmp_path):
+    store = FeatureStore.from_frame(str(tmp_path / 'store'), frame)
+    parts = store.split()
+    assert [len(X) for X, _ in parts] == [350, 75, 75]
+    for X, y in parts:
+        assert np.shares_memory(X, store.X)
+    assert np.array_equal(np.concatenate([X for X, _ in parts]), store.X)
+
+
+def test_scale_in_place_matches_the_scaler(frame, tmp_path):
+    path = str(tmp_path / 'store')
+    FeatureStore.from_frame(path, frame)
+    store = FeatureStore.open(path, writable=True)
+    raw = np.array(store.X, dtype=np.float64)
+
+    scaler = store.fit_scaler(StandardScaler(), rows=(0, 300), chunksize=64)
+    reference = StandardScaler().fit(raw[:300])
+    assert np.allclose(scaler.mean_, reference.mean_) and np.allclose(scaler.scale_, reference.scale_)
+
+    store.scale_(scaler, chunksize=64)
+    assert np.allclose(store.X, reference.transform(raw), rtol=1e-4, atol=1e-4)
+    with pytest.raises(ValueError, match='already scaled'):
+        store.scale_(scaler)
+
+    # The scaled data and header persist for other readers
+    reopened = FeatureStore.open(path)
+    assert reopened.header['scaled']
+    assert np.array_equal(reopened.X, store.X)
+    with pytest.raises(ValueError, match='read-only'):
+        reopened.scale_(scaler)
+
+
+def test_empty_store(frame, tmp_path):
+    store = FeatureStore.from_frame(str(tmp_path / 'store'), frame.iloc[:0])
+    assert len(store) == 0 and store.X.shape == (0, len(FEATURE_COLS))
+    assert [len(X) for X, _ in store.split()] == [0, 0, 0]